@@ -0,0 +1 @@
+'''Модуль для ленты изменений пользователей и избранных товаров.'''
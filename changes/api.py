@@ -0,0 +1,53 @@
+'''Модуль для методов API по работе с лентой изменений.'''
+from typing import Any, Dict
+
+from django.http import HttpRequest
+from ninja import Query, Router
+
+from .models import Changes
+from .schemas import ChangesOut
+
+router = Router()
+
+# Максимальное количество изменений в одном ответе
+CHANGES_MAX_LIMIT = 1000
+
+
+@router.get('', summary='Лента изменений', response=ChangesOut)
+def list_changes(
+        request: HttpRequest,
+        since: int = Query(0, ge=0),
+        limit: int = Query(100, ge=1, le=CHANGES_MAX_LIMIT)
+) -> Dict[str, Any]:
+    '''
+    Метод получения изменений пользователей и избранных товаров после курсора.
+
+    Изменения возвращаются в порядке фиксации. Для синхронизации потребитель передает
+    в since курсор из предыдущего ответа; пустой список - новых изменений нет.
+
+    Аргументы:
+        request (HttpRequest): информация о запросе.
+        since (int): курсор (позиция последнего полученного изменения, 0 - с начала ленты).
+        limit (int): количество изменений в ответе (не более 1000).
+
+    Возвращаемый результат:
+        (ChangesOut): json изменений и курсор для следующего запроса.
+
+    Примеры:
+        >>>> list_changes(HttpRequest(), since=0, limit=2)
+        {
+          "items": [
+            {"id": 1, "entity": "customer", "entity_id": 14722, "action": "create",
+             "data": {"id": 14722, "phone": {...}, ...}, "created_at": "2024-01-09T08:38:32Z",
+             "position": 1},
+            {"id": 2, "entity": "favorite", "entity_id": 10, "action": "delete",
+             "data": {"customer_id": 14722}, "created_at": "2024-01-09T08:39:02Z",
+             "position": 2}
+          ],
+          "cursor": 2
+        }
+    '''
+    # Позиция назначается при фиксации транзакции: незафиксированные записи не видны
+    changes = list(Changes.objects.filter(position__gt=since).order_by('position')[:limit])
+    cursor = changes[-1].position if changes else since
+    return {'items': changes, 'cursor': cursor}
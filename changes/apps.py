@@ -0,0 +1,9 @@
+'''Приложение по работе с лентой изменений.'''
+from django.apps import AppConfig
+
+
+class ChangesConfig(AppConfig):
+    '''Класс конфигураций для приложения ленты изменений.'''
+
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'changes'
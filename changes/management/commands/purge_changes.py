@@ -0,0 +1,59 @@
+'''Команда очистки ленты изменений.'''
+import datetime
+import time
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import CommandParser
+from django.db import connection
+from django.utils import timezone
+from servicecustomers.loop import LoopCommand
+
+
+class Command(LoopCommand):
+    '''
+    Команда удаления из ленты изменений старше CHANGES_RETENTION_DAYS дней.
+
+    Изменения удаляются пачками, каждая в отдельной транзакции.
+
+    Примеры:
+        >>>> python manage.py purge_changes --batch-size 10000
+        >>>> python manage.py purge_changes --loop
+    '''
+
+    help = 'Удаление из ленты изменений старше CHANGES_RETENTION_DAYS дней.'
+    interval_setting = 'CHANGES_PURGE_INTERVAL'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        '''Аргументы команды.'''
+        super().add_arguments(parser)
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Количество изменений в пачке.')
+
+    def run_once(self, **options: Any) -> None:
+        '''Метод однократной очистки ленты изменений.'''
+        start = time.perf_counter()
+        count = self._purge(
+            timezone.now() - datetime.timedelta(days=settings.CHANGES_RETENTION_DAYS),
+            options['batch_size']
+        )
+        if count:
+            self.stdout.write(
+                f'Удалено изменений: {count} за {time.perf_counter() - start:.1f} с'
+            )
+
+    @staticmethod
+    def _purge(before: datetime.datetime, batch_size: int) -> int:
+        '''Метод удаления изменений, созданных раньше before, пачками.'''
+        count = 0
+        with connection.cursor() as cursor:
+            while True:
+                cursor.execute("""
+                    DELETE FROM changes
+                    WHERE id IN (
+                        SELECT id FROM changes WHERE created_at < %s LIMIT %s
+                    )
+                """, [before, batch_size])
+                count += cursor.rowcount
+                if cursor.rowcount < batch_size:
+                    return count
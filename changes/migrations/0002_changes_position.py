@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:25
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('changes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='changes',
+            options={'ordering': ['position']},
+        ),
+        migrations.AddField(
+            model_name='changes',
+            name='position',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+        # Позиция существующих записей - id (курсоры потребителей остаются верными),
+        # новые позиции назначаются при фиксации транзакции по возрастанию.
+        # Блокировка берется только на время фиксации: транзакции с изменениями выполняются
+        # параллельно, а позиции получают в порядке фиксации
+        migrations.RunSQL(
+            sql=[
+                'UPDATE changes SET position = id',
+                'CREATE SEQUENCE changes_position_seq OWNED BY changes.position',
+                "SELECT setval('changes_position_seq', coalesce(max(position), 0) + 1, false) "
+                'FROM changes',
+                """
+                CREATE FUNCTION changes_assign_position() RETURNS trigger
+                LANGUAGE plpgsql AS $$
+                BEGIN
+                    PERFORM pg_advisory_xact_lock(4021001);
+                    UPDATE changes SET position = nextval('changes_position_seq')
+                    WHERE id = NEW.id;
+                    RETURN NULL;
+                END
+                $$
+                """,
+                'CREATE CONSTRAINT TRIGGER changes_assign_position AFTER INSERT ON changes '
+                'DEFERRABLE INITIALLY DEFERRED FOR EACH ROW '
+                'EXECUTE FUNCTION changes_assign_position()',
+            ],
+            reverse_sql=[
+                'DROP TRIGGER changes_assign_position ON changes',
+                'DROP FUNCTION changes_assign_position()',
+                'DROP SEQUENCE changes_position_seq',
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='changes',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['created_at'], name='changes_created_at_brin'),
+        ),
+    ]
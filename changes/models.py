@@ -0,0 +1,36 @@
+'''Модуль для описания сущности Изменения (transactional outbox).'''
+from django.contrib.postgres.indexes import BrinIndex
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+class Changes(models.Model):
+    '''
+    Модель для изменения пользователя или избранного товара.
+
+    Запись добавляется в той же транзакции, что и само изменение, поэтому лента
+    содержит только зафиксированные изменения. position назначается при фиксации
+    транзакции и растет в порядке фиксации (см. changes.outbox.record_many),
+    на нем основан курсор ленты.
+    '''
+
+    ENTITY_CHOICES = (('customer', 'Customer'), ('favorite', 'Favorite'))
+    ACTION_CHOICES = (('create', 'Create'), ('update', 'Update'), ('delete', 'Delete'))
+
+    entity = models.CharField(max_length=8, choices=ENTITY_CHOICES)
+    entity_id = models.BigIntegerField()
+    action = models.CharField(max_length=6, choices=ACTION_CHOICES)
+    # Состояние объекта после изменения (для удаления - пусто)
+    data = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    # Позиция в ленте: назначается триггером changes_assign_position при фиксации транзакции
+    position = models.BigIntegerField(null=True, blank=True, unique=True)
+
+    class Meta:
+        db_table = 'changes'
+        ordering = ['position']
+        # Очистка ленты по дате (записи добавляются в порядке даты)
+        indexes = (
+            BrinIndex(fields=['created_at'], name='changes_created_at_brin'),
+        )
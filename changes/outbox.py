@@ -0,0 +1,56 @@
+'''Модуль для записи изменений в ленту (transactional outbox).'''
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from django.db import connection, transaction
+
+from .models import Changes
+
+
+def record(entity: str, entity_id: int, action: str, data: Optional[Dict[str, Any]]) -> None:
+    '''
+    Метод добавления изменения в ленту в текущей транзакции.
+
+    Аргументы:
+        entity (str): сущность (customer, favorite).
+        entity_id (int): id объекта.
+        action (str): действие (create, update, delete).
+        data (Dict | None): состояние объекта после изменения.
+
+    Примеры:
+        >>>> with transaction.atomic():
+        >>>>     customer.save()
+        >>>>     record('customer', customer.id, 'update', {'id': customer.id, ...})
+    '''
+    record_many(entity, action, [(entity_id, data)])
+
+
+def record_many(
+        entity: str,
+        action: str,
+        items: Iterable[Tuple[int, Optional[Dict[str, Any]]]]
+) -> None:
+    '''
+    Метод добавления пачки изменений в ленту в текущей транзакции.
+
+    Позиция записи в ленте (position) назначается триггером при фиксации транзакции
+    под транзакционной advisory-блокировкой: транзакции получают позиции в порядке
+    фиксации, и потребитель, читающий ленту по курсору позиции, не пропустит изменение
+    из транзакции, зафиксированной позже записи с большей позицией. Блокировка
+    удерживается только на время фиксации, запись изменений не упорядочивается.
+
+    Аргументы:
+        entity (str): сущность (customer, favorite).
+        action (str): действие (create, update, delete).
+        items (Iterable[Tuple]): пары (id объекта, состояние объекта после изменения).
+    '''
+    changes = [
+        Changes(entity=entity, entity_id=entity_id, action=action, data=data)
+        for entity_id, data in items
+    ]
+    if not changes:
+        return
+    if not connection.in_atomic_block:
+        raise transaction.TransactionManagementError(
+            'Изменение записывается в ленту только в транзакции изменения'
+        )
+    Changes.objects.bulk_create(changes)
@@ -0,0 +1,26 @@
+'''Модуль для описания схем представления ленты изменений.'''
+import datetime
+from typing import Any, Dict, List, Literal, Optional
+
+from ninja import Schema
+
+
+class ChangeOut(Schema):
+    '''Схема OUT для изменения.'''
+
+    id: int
+    entity: Literal['customer', 'favorite']
+    entity_id: int
+    action: Literal['create', 'update', 'delete']
+    data: Optional[Dict[str, Any]] = None
+    created_at: datetime.datetime
+    # Позиция в ленте (порядок фиксации транзакций)
+    position: int
+
+
+class ChangesOut(Schema):
+    '''Схема OUT для страницы ленты изменений.'''
+
+    items: List[ChangeOut]
+    # Курсор для следующего запроса (позиция последнего изменения страницы)
+    cursor: int
@@ -0,0 +1,112 @@
+'''Тесты ленты изменений.'''
+import datetime
+import io
+import json
+import threading
+from typing import Any, Dict, List, Tuple
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import Client, TransactionTestCase
+from django.utils import timezone
+
+from . import outbox
+from .models import Changes
+
+URL = '/rest/v1/changes/'
+
+
+class ChangesTests(TransactionTestCase):
+    '''Тесты записи и чтения ленты (позиции назначаются при фиксации транзакции).'''
+
+    def setUp(self) -> None:
+        '''Подготовка клиента API.'''
+        self.client = Client()
+
+    def feed(self, since: int = 0) -> Dict[str, Any]:
+        '''Метод получения страницы ленты через API.'''
+        response = self.client.get(URL, {'since': since})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def entries(self, since: int = 0) -> List[Tuple[str, int, str]]:
+        '''Метод получения сущности, id объекта и действия изменений ленты.'''
+        return [(item['entity'], item['entity_id'], item['action'])
+                for item in self.feed(since)['items']]
+
+    def test_api_changes(self) -> None:
+        '''Изменения API попадают в ленту в порядке фиксации с состоянием объекта.'''
+        response = self.client.post(
+            '/rest/v1/customers/', json.dumps({'phone': '79025163138', 'firstname': 'иван'}),
+            content_type='application/json'
+        )
+        customer = response.json()
+        customer_id = customer['id']
+        self.client.patch(
+            f'/rest/v1/customers/{customer_id}/phone', json.dumps({'phone': '79025163100'}),
+            content_type='application/json'
+        )
+        favorite = self.client.post(
+            '/rest/v1/favorites/', json.dumps({'customer_id': customer_id, 'item_id': 10}),
+            content_type='application/json'
+        ).json()
+        self.client.delete(
+            '/rest/v1/favorites/', json.dumps({'id': [favorite['id']]}),
+            content_type='application/json'
+        )
+        self.client.delete(f'/rest/v1/customers/{customer_id}/')
+
+        page = self.feed()
+        self.assertEqual(self.entries(), [
+            ('customer', customer_id, 'create'),
+            ('customer', customer_id, 'update'),
+            ('favorite', favorite['id'], 'create'),
+            ('favorite', favorite['id'], 'delete'),
+            ('customer', customer_id, 'delete'),
+        ])
+        items = page['items']
+        self.assertEqual(page['cursor'], items[-1]['position'])
+        self.assertEqual(items[0]['data']['firstname'], 'Иван')
+        self.assertEqual(items[0]['data']['phone'], customer['phone'])
+        self.assertEqual(items[1]['data']['phone']['number'], '9025163100')
+        self.assertEqual(items[3]['data'], {'customer_id': customer_id})
+        self.assertIsNone(items[4]['data'])
+        self.assertEqual(self.entries(items[2]['position']), self.entries()[3:])
+
+    def test_commit_order(self) -> None:
+        '''Транзакция, зафиксированная раньше, получает меньшую позицию, запись не блокируется.'''
+        def record_and_commit() -> None:
+            try:
+                with transaction.atomic():
+                    outbox.record('favorite', 2, 'create', None)
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            outbox.record('favorite', 1, 'create', None)
+            # Вторая транзакция записывает в ленту и фиксируется, пока первая открыта
+            thread = threading.Thread(target=record_and_commit)
+            thread.start()
+            thread.join(timeout=10)
+            self.assertFalse(thread.is_alive())
+            # Незафиксированное изменение не видно в ленте
+            self.assertEqual(self.entries(), [('favorite', 2, 'create')])
+
+        self.assertEqual(self.entries(), [('favorite', 2, 'create'), ('favorite', 1, 'create')])
+        ids = dict(Changes.objects.values_list('entity_id', 'id'))
+        self.assertLess(ids[1], ids[2])
+
+    def test_record_outside_transaction(self) -> None:
+        '''Запись в ленту вне транзакции изменения запрещена.'''
+        with self.assertRaises(transaction.TransactionManagementError):
+            outbox.record('favorite', 1, 'create', None)
+
+    def test_purge(self) -> None:
+        '''Очистка удаляет изменения старше срока хранения.'''
+        with transaction.atomic():
+            outbox.record_many('favorite', 'create', [(1, None), (2, None), (3, None)])
+        Changes.objects.filter(entity_id__in=[1, 2]).update(
+            created_at=timezone.now() - datetime.timedelta(days=8)
+        )
+        call_command('purge_changes', batch_size=1, stdout=io.StringIO())
+        self.assertEqual(self.entries(), [('favorite', 3, 'create')])
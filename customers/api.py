@@ -1,21 +1,44 @@
 '''Модуль для методов API по работе с сущностью Клиента.'''
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Literal, Union
 
-from django.http import HttpRequest
+from changes import outbox
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Sum
+from django.db.models.functions import Coalesce
+from django.http import Http404, HttpRequest
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from ninja import Query, Router
 from ninja.pagination import LimitOffsetPagination, paginate
 
-from .models import Customers, Firstnames, Lastnames, Phones
+from . import cache, touch, validators
+from .models import Customers, CustomerStats, Firstnames, Lastnames, Phones
 from .schemas import (
-    CustomerFilter, CustomerIn, CustomerOut, CustomerOutExtended, CustomerResponseOut,
-    CustomerUpdate, PhoneStrIn
+    CustomerBatchIn, CustomerFilter, CustomerIn, CustomerOut, CustomerOutExtended,
+    CustomerResponseOut, CustomerStatsFilter, CustomerStatsOut, CustomerUpdate, PhoneStrIn,
+    TouchIn
 )
 
 router = Router()
 
 
+def _record_customer(customer: Customers, action: str) -> None:
+    '''
+    Внутренний метод записи изменения пользователя в ленту изменений.
+
+    В ленту записывается состояние пользователя после изменения (CustomerOutExtended)
+    из сохраненного объекта, без повторного чтения из БД. Вызывается в транзакции изменения.
+
+    Аргументы:
+        customer (Customers): пользователь после изменения (с телефоном, именем и фамилией).
+        action (str): действие (create, update).
+
+    Возвращаемый результат:
+        None
+    '''
+    outbox.record('customer', customer.id, action, CustomerOutExtended.from_orm(customer).dict())
+
+
 def _filling_names(data_dict: Dict[str, Any]) -> None:
     '''
     Внутренний метод заполнения ФИО пользователя (firstname, lastname).
@@ -73,7 +96,7 @@ def list_customers(request: HttpRequest, filters: CustomerFilter = Query(...)) -
         }
     '''
     customers = filters.filter(
-        Customers.objects.all().select_related('phone', 'firstname', 'lastname')
+        Customers.objects.filter(deleted_at=None).select_related('phone', 'firstname', 'lastname')
     )
 
     return customers
@@ -125,40 +148,157 @@ def create_customer(
     '''
     data_dict = data.dict()
 
-    # Добавляем или получаем из базы номер
-    phone, phone_created = Phones.objects.get_or_create(
-        number=data_dict['phone'][-10:],
-        code=data_dict['phone'][:-10]
-    )
-    # Телефон в базе уже существует
-    if not phone_created:
-        # Такой телефон уже зарегистрирован, невозможно добавить клиента
-        # TODO переписать return на осмысленный
-        return 400, {'success': False, 'message': 'Телефон в базе уже существует'}
-
-    # Сначала обработаем поля внешних ключей (firstname, lastname)
-    _filling_names(data_dict)
-
-    # Получаем максимальный id из базы
-    max_id = Customers.objects.values('id').order_by('-id').first()
-    if not max_id:
-        max_id = {'id': 0}
-    # Устанавливаем значения атрибутам
-    data_dict['id'] = max_id.get('id', 0) + 1
-    data_dict['phone'] = phone
-    data_dict['created_at'] = timezone.now()
-
-    # Создание instance Customers
-    customer = Customers()
-    for attr, value in data_dict.items():
-        if value:
-            setattr(customer, attr, value)
-
-    customer.save()
+    with transaction.atomic():
+        # Добавляем или получаем из базы номер
+        phone, phone_created = Phones.objects.get_or_create(e164=int(data_dict['phone']))
+        # Телефон в базе уже существует
+        if not phone_created:
+            # Такой телефон уже зарегистрирован, невозможно добавить клиента
+            # TODO переписать return на осмысленный
+            return 400, {'success': False, 'message': 'Телефон в базе уже существует'}
+
+        # Сначала обработаем поля внешних ключей (firstname, lastname)
+        _filling_names(data_dict)
+
+        # Получаем максимальный id из базы
+        max_id = Customers.objects.values('id').order_by('-id').first()
+        if not max_id:
+            max_id = {'id': 0}
+        # Устанавливаем значения атрибутам
+        data_dict['id'] = max_id.get('id', 0) + 1
+        data_dict['phone'] = phone
+        data_dict['created_at'] = timezone.now()
+
+        # Создание instance Customers
+        customer = Customers()
+        for attr, value in data_dict.items():
+            if value:
+                setattr(customer, attr, value)
+
+        customer.save()
+        _record_customer(customer, 'create')
 
     return 200, customer
 
 
+@router.post(
+    'batch',
+    summary='Получение пользователей по списку id',
+    response=Dict[int, CustomerOut]
+)
+def get_customers_batch(request: HttpRequest, data: CustomerBatchIn) -> Dict[int, CustomerOut]:
+    '''
+    Метод получения данных о пользователях по списку id.
+
+    Данные пользователей берутся из кэша воркера (не старше CUSTOMERS_CACHE_SECONDS
+    секунд), отсутствующие в кэше загружаются одним запросом с основной БД. Несуществующие
+    и удаленные пользователи в ответ не попадают.
+
+    Аргументы:
+        request (HttpRequest): информация о запросе.
+
+    Тело запроса:
+        data (CustomerBatchIn): список id пользователей (не более CUSTOMERS_BATCH_MAX_IDS).
+
+    Возвращаемый результат:
+        (dict): id пользователя -> json данных о пользователе.
+
+    Примеры:
+        >>>> get_customers_batch(HttpRequest(), {'id': [14722, 1]})
+        {"14722": {"id": 14722, "phone": {"id": 1, "code": "7", "number": "9025163138"},
+        "firstname": "Виктор", "lastname": null, "email": "ving@mail.ru", "birthday": null}}
+    '''
+    return cache.get_customers(data.id)
+
+
+@router.get('stats', summary='Статистика пользователей', response=CustomerStatsOut)
+def customer_stats(
+        request: HttpRequest,
+        group_by: List[Literal['city_id', 'gender', 'signup_month', 'activity']] = Query(None),
+        filters: CustomerStatsFilter = Query(...)
+) -> Dict[str, Any]:
+    '''
+    Метод получения количества действующих пользователей по группам.
+
+    Данные берутся из материализованного представления customer_stats
+    (обновляется каждые CUSTOMERS_STATS_REFRESH_INTERVAL секунд), таблица
+    пользователей не сканируется. Активность - давность последней авторизации
+    на момент обновления: 7d, 30d, 90d, older, never.
+
+    Аргументы:
+        request (HttpRequest): информация о запросе.
+        group_by (list[str]): поля группировки (city_id, gender, signup_month, activity).
+        filters (Query): фильтры запроса из параметров.
+
+    Возвращаемый результат:
+        (dict): json с датой обновления, общим количеством и группами.
+
+    Примеры:
+        >>>> customer_stats(HttpRequest(), group_by=['gender'])
+        {
+          "refreshed_at": "2024-03-04T10:15:00+03:00",
+          "total": 3,
+          "items": [
+            {"city_id": null, "gender": "F", "signup_month": null, "activity": null, "count": 2},
+            {"city_id": null, "gender": "M", "signup_month": null, "activity": null, "count": 1}
+          ]
+        }
+    '''
+    fields = list(dict.fromkeys(group_by or []))
+    stats = filters.filter(CustomerStats.objects.all())
+    if fields:
+        items = list(stats.values(*fields).annotate(count=Sum('count')).order_by(*fields))
+    else:
+        # Без группировки - одна группа с общим количеством
+        items = [stats.aggregate(count=Coalesce(Sum('count'), 0))]
+    refreshed_at = CustomerStats.objects.aggregate(refreshed_at=Max('refreshed_at'))
+    return {
+        'refreshed_at': refreshed_at['refreshed_at'],
+        'total': sum(item['count'] for item in items),
+        'items': items,
+    }
+
+
+@router.get(
+    'by-phone/{phone}',
+    summary='Поиск пользователя по телефону',
+    response={200: CustomerOut, 400: CustomerResponseOut}
+)
+def get_customer_by_phone(
+        request: HttpRequest,
+        phone: str
+) -> Union[tuple[int, Dict[str, Any]], tuple[int, Customers]]:
+    '''
+    Метод получения данных о пользователе по номеру телефона.
+
+    Номер нормализуется так же, как при создании пользователя, и ищется по точному
+    совпадению (уникальный индекс phones (e164)) одним запросом.
+
+    Аргументы:
+        request (HttpRequest): информация о запросе.
+        phone (str): номер телефона из 11-14 цифр.
+
+    Возвращаемый результат:
+        (CustomerOut): json данных о пользователе.
+
+    Примеры:
+        >>>> get_customer_by_phone(HttpRequest(), '89025163138')
+        {"id": 14722, "phone": {"id": 1, "code": "7", "number": "9025163138"},
+        "firstname": "Виктор", "lastname": null, "email": "ving@mail.ru", "birthday": null}
+    '''
+    try:
+        phone = validators.normalize_phone(phone)
+    except ValueError as error:
+        return 400, {'success': False, 'message': str(error)}
+
+    customer = get_object_or_404(
+        Customers.objects.select_related('phone', 'firstname', 'lastname'),
+        phone__e164=int(phone),
+        deleted_at=None
+    )
+    return 200, customer
+
+
 @router.get('{customer_id}/', summary='Просмотр пользователя', response=CustomerOut)
 def get_customer(request: HttpRequest, customer_id: int) -> Customers:
     '''
@@ -178,7 +318,8 @@ def get_customer(request: HttpRequest, customer_id: int) -> Customers:
     '''
     customer = get_object_or_404(
         Customers.objects.select_related('phone', 'firstname', 'lastname'),
-        id=customer_id
+        id=customer_id,
+        deleted_at=None
     )
     return customer
 
@@ -190,7 +331,11 @@ def get_customer(request: HttpRequest, customer_id: int) -> Customers:
 )
 def delete_customer(request: HttpRequest, customer_id: int) -> Dict[str, str | bool | None]:
     '''
-    Метод безвозвратного удаления пользователя.
+    Метод удаления пользователя.
+
+    Пользователь помечается удаленным (deleted_at) и перестает возвращаться методами API.
+    Пользователь, его телефон и избранные товары удаляются из БД фоновой очисткой
+    (команда purge_customers), после чего номер телефона можно использовать повторно.
 
     Аргументы:
         request (HttpRequest): информация о запросе.
@@ -203,12 +348,59 @@ def delete_customer(request: HttpRequest, customer_id: int) -> Dict[str, str | b
         >>>> delete_customer(HttpRequest(), 14722)
         {'success': True, 'message': None}
     '''
-    customer = get_object_or_404(Customers, id=customer_id)
-    # При удалении телефона, каскадно удаляются пользователь и его избранные товары
-    customer.phone.delete()
+    with transaction.atomic():
+        deleted = Customers.objects.filter(id=customer_id, deleted_at=None).update(
+            deleted_at=timezone.now()
+        )
+        if not deleted:
+            raise Http404
+        outbox.record('customer', customer_id, 'delete', None)
+    cache.invalidate(customer_id)
     return {'success': True, 'message': None}
 
 
+@router.post(
+    '{customer_id}/touch',
+    summary='Отметка авторизации пользователя',
+    response={202: CustomerResponseOut}
+)
+def touch_customer(
+        request: HttpRequest,
+        customer_id: int,
+        data: TouchIn
+) -> tuple[int, Dict[str, str | bool | None]]:
+    '''
+    Метод отметки авторизации пользователя (last_auth_at) без запроса в БД.
+
+    Дата копится в буфере воркера и сохраняется в БД пачкой не позже чем через
+    CUSTOMERS_TOUCH_FLUSH_INTERVAL секунд (сохраняется максимальная дата).
+    При аварийном завершении воркера даты за этот интервал могут быть потеряны.
+    При заполненном буфере (CUSTOMERS_TOUCH_BUFFER_SIZE) дата сохраняется в БД сразу.
+    Несуществующие и удаленные пользователи пропускаются при сохранении.
+
+    Аргументы:
+        request (HttpRequest): информация о запросе.
+        customer_id (int): id пользователя.
+
+    Тело запроса:
+        data (TouchIn): дата авторизации (по умолчанию - текущее время).
+
+    Возвращаемый результат:
+        (CustomerResponseOut): json ответа выполнения операции.
+
+    Примеры:
+        >>>> touch_customer(HttpRequest(), 14722, {})
+        {'success': True, 'message': None}
+    '''
+    now = timezone.now()
+    last_auth_at = data.last_auth_at or now
+    if timezone.is_naive(last_auth_at):
+        last_auth_at = timezone.make_aware(last_auth_at)
+    # Дата из будущего не должна блокировать последующие отметки
+    touch.touch(customer_id, min(last_auth_at, now))
+    return 202, {'success': True, 'message': None}
+
+
 @router.patch('{customer_id}/', summary='Изменение пользователя', response=CustomerOut)
 def update_customer(request: HttpRequest, customer_id: int, data: CustomerUpdate) -> Customers:
     '''
@@ -242,17 +434,32 @@ def update_customer(request: HttpRequest, customer_id: int, data: CustomerUpdate
           "birthday": "2000-12-20"
         }
     '''
-    customer = get_object_or_404(Customers, id=customer_id, deleted_at=None)
     data_dict = data.dict()
 
-    # Сначала обработаем поля внешних ключей (firstname, lastname)
-    _filling_names(data_dict)
+    with transaction.atomic():
+        # Пользователь блокируется до фиксации: одновременное удаление или смена номера
+        # ждут изменения, а изменение удаленного после блокировки пользователя - 404
+        customer = get_object_or_404(
+            Customers.objects.select_related('phone', 'firstname', 'lastname')
+            .select_for_update(of=('self',)),
+            id=customer_id,
+            deleted_at=None
+        )
+
+        # Сначала обработаем поля внешних ключей (firstname, lastname)
+        _filling_names(data_dict)
 
-    for attr, value in data_dict.items():
-        if value:
-            setattr(customer, attr, value)
+        update_fields = []
+        for attr, value in data_dict.items():
+            if value:
+                setattr(customer, attr, value)
+                update_fields.append(attr)
 
-    customer.save()
+        # Записываются только переданные поля: deleted_at и last_auth_at
+        # не перезаписываются прочитанными ранее значениями
+        customer.save(update_fields=update_fields)
+        _record_customer(customer, 'update')
+    cache.invalidate(customer_id)
 
     return customer
 
@@ -285,36 +492,23 @@ def update_phone(
         {'success': True, 'message': 'Номер успешно изменен'}
     '''
     data_dict = data.dict()
-    # Поиск клиента
-    customer = get_object_or_404(
-        Customers.objects.select_related('phone'),
-        id=customer_id
-    )
 
-    # Проверить не используется ли новый номер
-    count_phones = Phones.objects.filter(
-        number=data_dict['phone'][-10:],
-        code=data_dict['phone'][:-10]
-    ).count()
-    # Телефон еще не используется
-    if count_phones == 0:
-        # TODO валидация нового телефона
-        # Валидация нового телефона
-        # ...
-
-        phone_new = Phones.objects.create(
-            number=data_dict['phone'][-10:],
-            code=data_dict['phone'][:-10]
-        )
-    else:
+    # Номер пользователя изменяется на месте: занятый номер отклоняется
+    # уникальным индексом e164, без отдельной проверки
+    try:
+        with transaction.atomic():
+            # Пользователь читается для ленты изменений и блокируется до смены номера
+            customer = get_object_or_404(
+                Customers.objects.select_related('phone', 'firstname', 'lastname')
+                .select_for_update(of=('self',)),
+                id=customer_id,
+                deleted_at=None
+            )
+            customer.phone.e164 = int(data_dict['phone'])
+            customer.phone.save(update_fields=['e164'])
+            _record_customer(customer, 'update')
+    except IntegrityError:
         return {'success': False, 'message': 'Номер уже занят'}
-
-    phone_old = customer.phone
-    # Назначить новый номер клиенту
-    customer.phone = phone_new
-    # Сохранить изменения
-    customer.save()
-    # Удалить старый номер из БД
-    phone_old.delete()
+    cache.invalidate(customer_id)
 
     return {'success': True, 'message': 'Номер успешно изменен'}
@@ -0,0 +1,73 @@
+'''
+Модуль для кэша данных пользователей (CustomerOut) по id.
+
+Кэш хранится в памяти воркера (CACHES['customers']) не дольше CUSTOMERS_CACHE_SECONDS
+секунд. Изменение и удаление пользователя через API сбрасывают его запись в кэше
+воркера, выполнившего изменение; другие воркеры могут возвращать прежние данные
+до истечения срока хранения. Кэш заполняется только чтением с основной БД: данные
+отстающей реплики не возвращаются в кэш после сброса.
+'''
+from typing import Dict, Iterable
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from servicecustomers import metrics
+
+from .models import Customers
+from .schemas import CustomerOut
+
+CACHE_NAME = 'customers'
+
+
+def _key(customer_id: int) -> str:
+    '''Метод получения ключа кэша пользователя.'''
+    return f'customer:{customer_id}'
+
+
+def get_customers(customer_ids: Iterable[int]) -> Dict[int, CustomerOut]:
+    '''
+    Метод получения данных пользователей по id из кэша, отсутствующих - одним запросом.
+
+    Аргументы:
+        customer_ids (Iterable[int]): id пользователей.
+
+    Возвращаемый результат:
+        (Dict[int, CustomerOut]): id -> данные пользователя (без несуществующих и удаленных).
+
+    Примеры:
+        >>>> get_customers([14722, 14738])
+        {14722: CustomerOut(id=14722, ...), 14738: CustomerOut(id=14738, ...)}
+    '''
+    cache = caches[CACHE_NAME]
+    keys = {_key(customer_id): customer_id for customer_id in customer_ids}
+    cached = cache.get_many(keys)
+    result = {keys[key]: customer for key, customer in cached.items()}
+
+    missing = [customer_id for key, customer_id in keys.items() if key not in cached]
+    metrics.CACHE_REQUESTS.labels(CACHE_NAME, 'hit').inc(len(result))
+    metrics.CACHE_REQUESTS.labels(CACHE_NAME, 'miss').inc(len(missing))
+    if not missing:
+        return result
+
+    # Отсутствующие в кэше читаются с основной БД и при чтении остальных методов с реплики
+    customers = Customers.objects.using(DEFAULT_DB_ALIAS).filter(
+        id__in=missing, deleted_at=None
+    ).select_related('phone', 'firstname', 'lastname')
+    loaded = {customer.id: CustomerOut.from_orm(customer) for customer in customers}
+    cache.set_many(
+        {_key(customer_id): customer for customer_id, customer in loaded.items()},
+        settings.CUSTOMERS_CACHE_SECONDS
+    )
+    result.update(loaded)
+    return result
+
+
+def invalidate(customer_id: int) -> None:
+    '''
+    Метод сброса записи пользователя в кэше воркера.
+
+    Аргументы:
+        customer_id (int): id пользователя.
+    '''
+    caches[CACHE_NAME].delete(_key(customer_id))
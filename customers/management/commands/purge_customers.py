@@ -0,0 +1,95 @@
+'''Команда очистки удаленных пользователей.'''
+import time
+from typing import Any, List, Tuple
+
+from customers.models import Customers
+from django.conf import settings
+from django.core.management.base import CommandParser
+from django.db import connection, transaction
+from servicecustomers.loop import LoopCommand
+
+
+class Command(LoopCommand):
+    '''
+    Команда удаления из БД пользователей, помеченных удаленными (deleted_at).
+
+    Пользователи удаляются пачками: сначала их избранные товары (пачками того же размера,
+    каждая в отдельной транзакции), затем пользователи и их телефоны в одной транзакции.
+    Каскадное удаление Django не используется, чтобы не загружать избранное в память.
+
+    Примеры:
+        >>>> python manage.py purge_customers --batch-size 1000
+        >>>> python manage.py purge_customers --loop
+    '''
+
+    help = 'Удаление из БД пользователей, помеченных удаленными, и их избранных товаров.'
+    interval_setting = 'CUSTOMERS_PURGE_INTERVAL'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        '''Аргументы команды.'''
+        super().add_arguments(parser)
+        parser.add_argument('--batch-size', type=int, default=settings.CUSTOMERS_PURGE_BATCH_SIZE,
+                            help='Количество пользователей (избранных товаров) в пачке.')
+
+    def run_once(self, **options: Any) -> None:
+        '''Метод однократной очистки удаленных пользователей.'''
+        start = time.perf_counter()
+        customers_count, favorites_count = self._purge(options['batch_size'])
+        if customers_count:
+            self.stdout.write(
+                f'Удалено пользователей: {customers_count}, избранных товаров: '
+                f'{favorites_count} за {time.perf_counter() - start:.1f} с'
+            )
+
+    def _purge(self, batch_size: int) -> Tuple[int, int]:
+        '''Метод удаления всех помеченных пользователей пачками.'''
+        customers_count = favorites_count = 0
+        while True:
+            batch = list(
+                Customers.objects.filter(deleted_at__isnull=False)
+                .order_by('deleted_at')
+                .values_list('id', 'phone_id')[:batch_size]
+            )
+            if not batch:
+                return customers_count, favorites_count
+
+            customer_ids = [customer_id for customer_id, _ in batch]
+            favorites_count += self._purge_favorites(customer_ids, batch_size)
+            customers_count += self._purge_customers(batch)
+
+    @staticmethod
+    def _purge_favorites(customer_ids: List[int], batch_size: int) -> int:
+        '''Метод удаления избранных товаров пользователей пачками.'''
+        count = 0
+        with connection.cursor() as cursor:
+            while True:
+                # Условие по customer_id ограничивает поиск секциями пользователей
+                cursor.execute("""
+                    DELETE FROM favorites
+                    WHERE customer_id = ANY(%s) AND id IN (
+                        SELECT id FROM favorites WHERE customer_id = ANY(%s) LIMIT %s
+                    )
+                """, [customer_ids, customer_ids, batch_size])
+                count += cursor.rowcount
+                if cursor.rowcount < batch_size:
+                    return count
+
+    @staticmethod
+    def _purge_customers(batch: List[Tuple[int, int]]) -> int:
+        '''Метод удаления пользователей и их телефонов.'''
+        customer_ids = [customer_id for customer_id, _ in batch]
+        phone_ids = [phone_id for _, phone_id in batch]
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Избранное, добавленное во время очистки
+            cursor.execute('DELETE FROM favorites WHERE customer_id = ANY(%s)', [customer_ids])
+            cursor.execute(
+                'DELETE FROM customers WHERE id = ANY(%s) AND deleted_at IS NOT NULL',
+                [customer_ids]
+            )
+            count = cursor.rowcount
+            cursor.execute(
+                'DELETE FROM phones WHERE id = ANY(%s) '
+                'AND NOT EXISTS (SELECT 1 FROM customers WHERE phone_id = phones.id)',
+                [phone_ids]
+            )
+        return count
@@ -0,0 +1,32 @@
+'''Команда обновления статистики пользователей.'''
+import time
+from typing import Any
+
+from django.db import connection
+from servicecustomers.loop import LoopCommand
+
+
+class Command(LoopCommand):
+    '''
+    Команда обновления материализованного представления статистики пользователей.
+
+    Представление обновляется без блокировки чтения (REFRESH ... CONCURRENTLY):
+    метод customer_stats во время обновления возвращает предыдущие данные.
+
+    Примеры:
+        >>>> python manage.py refresh_customer_stats
+        >>>> python manage.py refresh_customer_stats --loop
+    '''
+
+    help = 'Обновление статистики пользователей (материализованное представление customer_stats).'
+
+    interval_setting = 'CUSTOMERS_STATS_REFRESH_INTERVAL'
+
+    def run_once(self, **options: Any) -> None:
+        '''Метод однократного обновления статистики.'''
+        start = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute('REFRESH MATERIALIZED VIEW CONCURRENTLY customer_stats')
+        self.stdout.write(
+            f'Статистика пользователей обновлена за {time.perf_counter() - start:.1f} с'
+        )
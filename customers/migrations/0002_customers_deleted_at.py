@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:18
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('customers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customers',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        AddIndexConcurrently(
+            model_name='customers',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['id'], name='customers_live_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='customers',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', False)), fields=['deleted_at'], name='customers_deleted_idx'),
+        ),
+    ]
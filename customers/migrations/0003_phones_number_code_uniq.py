@@ -0,0 +1,110 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:40
+
+from django.contrib.postgres.operations import RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('customers', '0002_customers_deleted_at'),
+    ]
+
+    operations = [
+        # Дубликаты номеров, не назначенные пользователям (остаются после гонки при смене номера)
+        migrations.RunSQL(
+            sql="""
+                DELETE FROM phones p
+                WHERE NOT EXISTS (SELECT 1 FROM customers c WHERE c.phone_id = p.id)
+                AND EXISTS (
+                    SELECT 1 FROM phones d
+                    WHERE d.number = p.number AND d.code = p.code AND d.id <> p.id
+                )
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        # Проверка до построения индекса: номер, назначенный нескольким пользователям,
+        # не дает построить уникальный индекс. Такие номера перечисляются в ошибке
+        # с id пользователей и исправляются вручную до повтора миграции.
+        migrations.RunSQL(
+            sql="""
+                DO $$
+                DECLARE
+                    conflict_count bigint;
+                    conflicts text;
+                BEGIN
+                    SELECT count(*) INTO conflict_count
+                    FROM (
+                        SELECT 1 FROM phones GROUP BY number, code HAVING count(*) > 1
+                    ) duplicates;
+                    IF conflict_count > 0 THEN
+                        SELECT string_agg(format('%s-%s: id %s', code, number, customer_ids), '; ')
+                        INTO conflicts
+                        FROM (
+                            SELECT p.code, p.number,
+                                   string_agg(
+                                       c.id || CASE WHEN c.deleted_at IS NULL
+                                                    THEN '' ELSE ' (удален)' END,
+                                       ', ' ORDER BY c.id
+                                   ) AS customer_ids
+                            FROM phones p
+                            JOIN customers c ON c.phone_id = p.id
+                            GROUP BY p.code, p.number
+                            HAVING count(*) > 1
+                            ORDER BY p.code, p.number
+                            LIMIT 20
+                        ) duplicates;
+                        RAISE EXCEPTION 'Номера нескольких пользователей: %, первые: %',
+                            conflict_count, conflicts
+                            USING HINT = 'Оставьте номер одному пользователю '
+                                         '(остальным - другой номер) и повторите миграцию';
+                    END IF;
+                END $$
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        # Уникальный индекс строится без блокировки записи в таблицу
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                # Невалидный индекс от прерванного построения (например, на дубликатах)
+                # удаляется, чтобы повторный запуск построил индекс заново
+                migrations.RunSQL(
+                    sql="""
+                        DO $$
+                        BEGIN
+                            IF EXISTS (
+                                SELECT 1 FROM pg_index i
+                                JOIN pg_class c ON c.oid = i.indexrelid
+                                WHERE c.relname = 'phones_number_code_uniq' AND NOT i.indisvalid
+                            ) THEN
+                                DROP INDEX phones_number_code_uniq;
+                            END IF;
+                        END $$
+                    """,
+                    reverse_sql=migrations.RunSQL.noop,
+                ),
+                migrations.RunSQL(
+                    sql='CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS phones_number_code_uniq '
+                        'ON phones (number, code)',
+                    reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS phones_number_code_uniq',
+                ),
+                migrations.RunSQL(
+                    sql='ALTER TABLE phones ADD CONSTRAINT phones_number_code_uniq '
+                        'UNIQUE USING INDEX phones_number_code_uniq',
+                    reverse_sql='ALTER TABLE phones DROP CONSTRAINT phones_number_code_uniq',
+                ),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='phones',
+                    constraint=models.UniqueConstraint(fields=('number', 'code'), name='phones_number_code_uniq'),
+                ),
+            ],
+        ),
+        RemoveIndexConcurrently(
+            model_name='phones',
+            name='number_code_idx',
+        ),
+    ]
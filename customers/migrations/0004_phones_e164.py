@@ -0,0 +1,153 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:05
+
+from django.db import migrations, models
+
+# Перенос номеров в e164, этап расширения (expand): колонки code и number остаются
+# в БД и синхронизируются с e164 триггером - воркеры предыдущей версии пишут code
+# и number, новые - только e164, поэтому обе версии работают во время постепенного
+# обновления. Ограничение NOT NULL и удаление code и number - в миграции 0008
+# (этап сокращения, contract), которая применяется следующим релизом.
+SYNC_FUNCTION_SQL = """
+    CREATE OR REPLACE FUNCTION phones_sync_e164() RETURNS trigger AS $$
+    BEGIN
+        -- Предыдущая версия изменила код или номер, не изменяя e164
+        IF TG_OP = 'UPDATE' AND NEW.e164 IS NOT DISTINCT FROM OLD.e164
+                AND (NEW.code, NEW.number) IS DISTINCT FROM (OLD.code, OLD.number) THEN
+            NEW.e164 := NULL;
+        END IF;
+        IF NEW.e164 IS NULL THEN
+            NEW.e164 := (NEW.code || NEW.number)::bigint;
+        ELSE
+            NEW.code := left(NEW.e164::text, -10);
+            NEW.number := right(NEW.e164::text, 10);
+        END IF;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('customers', '0003_phones_number_code_uniq'),
+    ]
+
+    operations = [
+        # Проверка до переноса: код и номер должны образовывать номер E.164 (11-14 цифр,
+        # без 0 в начале), иначе приведение к bigint упадет или потеряет ведущий 0.
+        # Неверные номера перечисляются в ошибке и исправляются вручную до повтора миграции.
+        migrations.RunSQL(
+            sql="""
+                DO $$
+                DECLARE
+                    bad_count bigint;
+                    bad_phones text;
+                BEGIN
+                    SELECT count(*) INTO bad_count
+                    FROM phones
+                    WHERE code || number !~ '^[1-9][0-9]{10,13}$';
+                    IF bad_count > 0 THEN
+                        SELECT string_agg(format('%s: %s-%s', id, code, number), ', ')
+                        INTO bad_phones
+                        FROM (
+                            SELECT id, code, number
+                            FROM phones
+                            WHERE code || number !~ '^[1-9][0-9]{10,13}$'
+                            ORDER BY id
+                            LIMIT 20
+                        ) bad;
+                        RAISE EXCEPTION 'Номера не в формате E.164: %, первые: %',
+                            bad_count, bad_phones
+                            USING HINT = 'Исправьте или удалите эти номера и повторите миграцию';
+                    END IF;
+                END $$
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    sql='ALTER TABLE phones ADD COLUMN e164 bigint NULL',
+                    reverse_sql='ALTER TABLE phones DROP COLUMN e164',
+                ),
+                # Триггер создается до переноса: номера, записанные предыдущей версией
+                # во время переноса, тоже получают e164
+                migrations.RunSQL(
+                    sql=[
+                        SYNC_FUNCTION_SQL,
+                        'CREATE TRIGGER phones_sync_e164 BEFORE INSERT OR UPDATE ON phones '
+                        'FOR EACH ROW EXECUTE FUNCTION phones_sync_e164()',
+                    ],
+                    reverse_sql=[
+                        'DROP TRIGGER phones_sync_e164 ON phones',
+                        'DROP FUNCTION phones_sync_e164()',
+                    ],
+                ),
+                # Перенос номеров: код страны и 10 цифр номера одним числом
+                migrations.RunSQL(
+                    sql='UPDATE phones SET e164 = (code || number)::bigint WHERE e164 IS NULL',
+                    reverse_sql=migrations.RunSQL.noop,
+                ),
+                # Невалидный индекс от прерванного построения удаляется,
+                # чтобы повторный запуск построил индекс заново
+                migrations.RunSQL(
+                    sql="""
+                        DO $$
+                        BEGIN
+                            IF EXISTS (
+                                SELECT 1 FROM pg_index i
+                                JOIN pg_class c ON c.oid = i.indexrelid
+                                WHERE c.relname = 'phones_e164_uniq' AND NOT i.indisvalid
+                            ) THEN
+                                DROP INDEX phones_e164_uniq;
+                            END IF;
+                        END $$
+                    """,
+                    reverse_sql=migrations.RunSQL.noop,
+                ),
+                # Уникальный индекс строится без блокировки записи в таблицу
+                migrations.RunSQL(
+                    sql='CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS phones_e164_uniq '
+                        'ON phones (e164)',
+                    reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS phones_e164_uniq',
+                ),
+                migrations.RunSQL(
+                    sql='ALTER TABLE phones ADD CONSTRAINT phones_e164_uniq '
+                        'UNIQUE USING INDEX phones_e164_uniq',
+                    reverse_sql='ALTER TABLE phones DROP CONSTRAINT phones_e164_uniq',
+                ),
+            ],
+            # Модель работает только с e164: код и номер заполняет триггер
+            state_operations=[
+                migrations.AddField(
+                    model_name='phones',
+                    name='e164',
+                    field=models.BigIntegerField(),
+                    preserve_default=False,
+                ),
+                migrations.AddConstraint(
+                    model_name='phones',
+                    constraint=models.UniqueConstraint(fields=('e164',), name='phones_e164_uniq'),
+                ),
+                migrations.RemoveConstraint(
+                    model_name='phones',
+                    name='phones_number_code_uniq',
+                ),
+                migrations.RemoveIndex(
+                    model_name='phones',
+                    name='number_idx',
+                ),
+                migrations.RemoveField(
+                    model_name='phones',
+                    name='code',
+                ),
+                migrations.RemoveField(
+                    model_name='phones',
+                    name='number',
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:50
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('customers', '0004_phones_e164'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='customers',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['created_at'], name='customers_created_brin'),
+        ),
+        AddIndexConcurrently(
+            model_name='customers',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True), ('last_auth_at__isnull', False)), fields=['last_auth_at'], name='customers_last_auth_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='customers',
+            index=models.Index(condition=models.Q(('city_id__isnull', False), ('deleted_at__isnull', True)), fields=['city_id', 'gender'], name='customers_city_gender_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='customers',
+            index=models.Index(condition=models.Q(('birthday__isnull', False), ('deleted_at__isnull', True)), fields=['birthday'], name='customers_birthday_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:10
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+import django.db.models.expressions
+import django.db.models.functions.datetime
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('customers', '0005_customers_filter_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='customers',
+            index=models.Index(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.ExtractMonth('birthday'), '*', models.Value(100)), '+', django.db.models.functions.datetime.ExtractDay('birthday')), condition=models.Q(('birthday__isnull', False), ('deleted_at__isnull', True)), name='customers_birthday_md_idx'),
+        ),
+    ]
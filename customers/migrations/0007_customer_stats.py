@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Статистика действующих пользователей: месяц регистрации - в часовом поясе сервиса,
+# активность - давность последней авторизации на момент обновления представления.
+# Уникальный индекс нужен для REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE_CUSTOMER_STATS = f"""
+    CREATE MATERIALIZED VIEW customer_stats AS
+    SELECT
+        row_number() OVER (ORDER BY city_id, gender, signup_month, activity) AS id,
+        city_id,
+        gender,
+        signup_month,
+        activity,
+        count,
+        now() AS refreshed_at
+    FROM (
+        SELECT
+            city_id,
+            gender,
+            date_trunc('month', created_at AT TIME ZONE '{settings.TIME_ZONE}')::date AS signup_month,
+            CASE
+                WHEN last_auth_at IS NULL THEN 'never'
+                WHEN last_auth_at >= now() - interval '7 days' THEN '7d'
+                WHEN last_auth_at >= now() - interval '30 days' THEN '30d'
+                WHEN last_auth_at >= now() - interval '90 days' THEN '90d'
+                ELSE 'older'
+            END AS activity,
+            count(*) AS count
+        FROM customers
+        WHERE deleted_at IS NULL
+        GROUP BY 1, 2, 3, 4
+    ) stats;
+    CREATE UNIQUE INDEX customer_stats_id_uniq ON customer_stats (id);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0006_customers_birthday_md_idx'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_CUSTOMER_STATS, 'DROP MATERIALIZED VIEW customer_stats'),
+        migrations.CreateModel(
+            name='CustomerStats',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('city_id', models.IntegerField(null=True)),
+                ('gender', models.CharField(max_length=1, null=True)),
+                ('signup_month', models.DateField(null=True)),
+                ('activity', models.CharField(choices=[('7d', 'До 7 дней'), ('30d', 'До 30 дней'), ('90d', 'До 90 дней'), ('older', 'Более 90 дней'), ('never', 'Нет авторизаций')], max_length=5)),
+                ('count', models.BigIntegerField()),
+                ('refreshed_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'customer_stats',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:20
+
+from django.db import migrations
+
+# Перенос номеров в e164, этап сокращения (contract): применяется релизом после 0004,
+# когда воркеры предыдущей версии (пишут code и number) остановлены. Состояние моделей
+# не меняется - code и number удалены из него миграцией 0004.
+# При откате колонки восстанавливаются из e164 и снова синхронизируются триггером
+RESTORE_SYNC_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION phones_sync_e164() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' AND NEW.e164 IS NOT DISTINCT FROM OLD.e164
+                AND (NEW.code, NEW.number) IS DISTINCT FROM (OLD.code, OLD.number) THEN
+            NEW.e164 := NULL;
+        END IF;
+        IF NEW.e164 IS NULL THEN
+            NEW.e164 := (NEW.code || NEW.number)::bigint;
+        ELSE
+            NEW.code := left(NEW.e164::text, -10);
+            NEW.number := right(NEW.e164::text, 10);
+        END IF;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    'CREATE TRIGGER phones_sync_e164 BEFORE INSERT OR UPDATE ON phones '
+    'FOR EACH ROW EXECUTE FUNCTION phones_sync_e164()',
+]
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('customers', '0007_customer_stats'),
+    ]
+
+    operations = [
+        # Номера без e164 (записанные в обход триггера) переносятся до ограничения NOT NULL
+        migrations.RunSQL(
+            sql='UPDATE phones SET e164 = (code || number)::bigint WHERE e164 IS NULL',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        # NOT NULL по проверенному ограничению CHECK: таблица проверяется без блокировки
+        # записи, SET NOT NULL не сканирует ее повторно под исключительной блокировкой
+        migrations.RunSQL(
+            sql=[
+                'ALTER TABLE phones ADD CONSTRAINT phones_e164_not_null '
+                'CHECK (e164 IS NOT NULL) NOT VALID',
+                'ALTER TABLE phones VALIDATE CONSTRAINT phones_e164_not_null',
+                'ALTER TABLE phones ALTER COLUMN e164 SET NOT NULL',
+                'ALTER TABLE phones DROP CONSTRAINT phones_e164_not_null',
+            ],
+            reverse_sql='ALTER TABLE phones ALTER COLUMN e164 DROP NOT NULL',
+        ),
+        migrations.RunSQL(
+            sql=[
+                'DROP TRIGGER phones_sync_e164 ON phones',
+                'DROP FUNCTION phones_sync_e164()',
+            ],
+            reverse_sql=RESTORE_SYNC_SQL,
+        ),
+        migrations.RunSQL(
+            sql='ALTER TABLE phones DROP CONSTRAINT phones_number_code_uniq',
+            reverse_sql=[
+                'CREATE UNIQUE INDEX CONCURRENTLY phones_number_code_uniq '
+                'ON phones (number, code)',
+                'ALTER TABLE phones ADD CONSTRAINT phones_number_code_uniq '
+                'UNIQUE USING INDEX phones_number_code_uniq',
+            ],
+        ),
+        migrations.RunSQL(
+            sql='DROP INDEX CONCURRENTLY IF EXISTS number_idx',
+            reverse_sql='CREATE INDEX CONCURRENTLY number_idx ON phones USING hash (number)',
+        ),
+        migrations.RunSQL(
+            sql='ALTER TABLE phones DROP COLUMN code, DROP COLUMN number',
+            reverse_sql=[
+                'ALTER TABLE phones ADD COLUMN code varchar(4), ADD COLUMN number varchar(10)',
+                'UPDATE phones SET code = left(e164::text, -10), number = right(e164::text, 10)',
+                'ALTER TABLE phones ALTER COLUMN code SET NOT NULL, '
+                'ALTER COLUMN number SET NOT NULL',
+            ],
+        ),
+    ]
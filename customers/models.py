@@ -1,6 +1,12 @@
 '''Модуль для описания сущности Клиента и вспомогательных.'''
-from django.contrib.postgres.indexes import HashIndex
+from django.contrib.postgres.indexes import BrinIndex
 from django.db import models
+from django.db.models.functions import Cast, ExtractDay, ExtractMonth, Right
+
+# День рождения без года (месяц * 100 + день, например 1231): общий для индекса и фильтра
+BIRTHDAY_MONTH_DAY = ExtractMonth('birthday') * 100 + ExtractDay('birthday')
+# Номер телефона пользователя без кода страны (10 цифр): для поиска по части номера
+PHONE_NUMBER = Right(Cast('phone__e164', models.CharField()), 10)
 
 
 class Firstnames(models.Model):
@@ -30,23 +36,34 @@ class Lastnames(models.Model):
 
 
 class Phones(models.Model):
-    '''Модель для номеров телефонов.'''
+    '''
+    Модель для номеров телефонов.
+
+    Номер хранится в формате E.164 одним целым числом (код страны и 10 цифр номера
+    без "+"), код и номер вычисляются из него.
+    '''
 
-    code = models.CharField(max_length=4)
-    number = models.CharField(max_length=10)
+    e164 = models.BigIntegerField()
 
     class Meta:
         db_table = 'phones'
         ordering = ['id']
-        # HashIndex не используется при составных ключах
-        indexes = (
-            HashIndex(
-                fields=('number',),
-                name='number_idx',
-            ),
-            models.Index(fields=['number', 'code'], name='number_code_idx'),
+        # Номер принадлежит одному пользователю: уникальный индекс защищает от гонки
+        # при одновременной регистрации или смене номера
+        constraints = (
+            models.UniqueConstraint(fields=['e164'], name='phones_e164_uniq'),
         )
 
+    @property
+    def code(self) -> str:
+        '''Код страны.'''
+        return str(self.e164)[:-10]
+
+    @property
+    def number(self) -> str:
+        '''Номер телефона (10 цифр).'''
+        return str(self.e164)[-10:]
+
     def __str__(self) -> str:
         return f'{self.id}_{self.code}-{self.number}'
 
@@ -79,7 +96,78 @@ class Customers(models.Model):
     city_id = models.IntegerField(null=True, blank=True)
     created_at = models.DateTimeField(null=True, blank=True)
     last_auth_at = models.DateTimeField(null=True, blank=True)
+    # Дата удаления: удаленные пользователи и их избранное удаляются из БД фоновой очисткой
+    deleted_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = 'customers'
         ordering = ['id']
+        indexes = (
+            # Частичные индексы: запросы по действующим пользователям не читают удаленных,
+            # очистка находит удаленных без просмотра всей таблицы
+            models.Index(
+                fields=['id'],
+                name='customers_live_idx',
+                condition=models.Q(deleted_at__isnull=True),
+            ),
+            models.Index(
+                fields=['deleted_at'],
+                name='customers_deleted_idx',
+                condition=models.Q(deleted_at__isnull=False),
+            ),
+            # Индексы фильтров списка пользователей (CustomerFilter).
+            # Дата регистрации растет вместе с id: BRIN в сотни раз меньше btree
+            BrinIndex(fields=['created_at'], name='customers_created_brin'),
+            models.Index(
+                fields=['last_auth_at'],
+                name='customers_last_auth_idx',
+                condition=models.Q(deleted_at__isnull=True, last_auth_at__isnull=False),
+            ),
+            models.Index(
+                fields=['city_id', 'gender'],
+                name='customers_city_gender_idx',
+                condition=models.Q(deleted_at__isnull=True, city_id__isnull=False),
+            ),
+            models.Index(
+                fields=['birthday'],
+                name='customers_birthday_idx',
+                condition=models.Q(deleted_at__isnull=True, birthday__isnull=False),
+            ),
+            # Ближайшие дни рождения (фильтр birthday_next_days)
+            models.Index(
+                BIRTHDAY_MONTH_DAY,
+                name='customers_birthday_md_idx',
+                condition=models.Q(deleted_at__isnull=True, birthday__isnull=False),
+            ),
+        )
+
+
+class CustomerStats(models.Model):
+    '''
+    Модель для статистики пользователей (материализованное представление customer_stats).
+
+    Количество действующих пользователей по городу, полу, месяцу регистрации и активности
+    (давности последней авторизации на момент обновления). Представление обновляется
+    командой refresh_customer_stats.
+    '''
+
+    ACTIVITY_CHOICES = (
+        ('7d', 'До 7 дней'),
+        ('30d', 'До 30 дней'),
+        ('90d', 'До 90 дней'),
+        ('older', 'Более 90 дней'),
+        ('never', 'Нет авторизаций'),
+    )
+
+    # Номер строки в представлении (для Django, не постоянный)
+    id = models.BigIntegerField(primary_key=True)
+    city_id = models.IntegerField(null=True)
+    gender = models.CharField(max_length=1, null=True)
+    signup_month = models.DateField(null=True)
+    activity = models.CharField(max_length=5, choices=ACTIVITY_CHOICES)
+    count = models.BigIntegerField()
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'customer_stats'
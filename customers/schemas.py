@@ -1,44 +1,35 @@
 '''Модуль для описания схем представления данных клиентов.'''
 import datetime
-import re
 from typing import Dict, List, Literal, Optional
 
+from django.conf import settings
 from django.db.models import Q
-from ninja import Field, FilterSchema, ModelSchema, Schema
-from pydantic import EmailStr, validator
+from django.db.models.lookups import Contains, GreaterThanOrEqual, LessThanOrEqual
+from django.utils import timezone
+from ninja import Field, FilterSchema, Schema
+from pydantic import validator
 
-from .models import Phones
+from . import validators
+from .models import BIRTHDAY_MONTH_DAY, PHONE_NUMBER
 
 name_max_length = 50
 
 
-def _check_phone(phone_raw: str) -> str:
-    '''Метод валидации номера телефона.'''
-    if phone_raw.isdigit() and 11 <= len(phone_raw) <= 14:
-        if phone_raw[0] == '8' and len(phone_raw) == 11:
-            phone_raw = '7' + phone_raw[1:]
-        return phone_raw
-    raise ValueError('Неверный формат номера. Телефон должен состоять из 11-14 цифр')
+def _month_day_range(start: int, end: int) -> Q:
+    '''Метод получения условия дня рождения (месяц * 100 + день) в интервале.'''
+    return Q(
+        GreaterThanOrEqual(BIRTHDAY_MONTH_DAY, start),
+        LessThanOrEqual(BIRTHDAY_MONTH_DAY, end)
+    )
 
 
-def _check_name(name: str) -> str:
-    '''Метод валидации name.'''
-    # Строка не содержит цифр
-    if re.search(r'\d+', name) is None:
-        return name.title()
-    raise ValueError('В имени не может быть цифр')
-
-
-class PhoneOut(ModelSchema):
-    '''Схема OUT для телефона.'''
+class PhoneOut(Schema):
+    '''Схема OUT для телефона (код и номер вычисляются из e164).'''
 
+    id: int
     code: str = Field(pattern=r'^\d{1,4}$')
     number: str = Field(pattern=r'^\d{10}$')
 
-    class Config:
-        model = Phones
-        model_fields = ['id', 'code', 'number']
-
 
 class CustomerOut(Schema):
     '''Схема OUT для пользователя.'''
@@ -65,7 +56,7 @@ class PhoneStrIn(Schema):
 
     phone: str
 
-    _normalize_phone = validator('phone', allow_reuse=True)(_check_phone)
+    _normalize_phone = validator('phone', allow_reuse=True)(validators.normalize_phone)
 
 
 class CustomerUpdate(Schema):
@@ -73,14 +64,27 @@ class CustomerUpdate(Schema):
 
     firstname: str = Field(None, max_length=name_max_length)
     lastname: str = Field(None, max_length=name_max_length)
-    email: Optional[EmailStr] = None
+    email: Optional[str] = Field(None, format='email')
     birthday: Optional[datetime.date] = None
     gender: Optional[Literal['M', 'F']] = None
     city_id: Optional[int] = None
     last_auth_at: Optional[datetime.datetime] = None
 
-    _normalize_firstname = validator('firstname', allow_reuse=True)(_check_name)
-    _normalize_lastname = validator('lastname', allow_reuse=True)(_check_name)
+    _normalize_firstname = validator('firstname', allow_reuse=True)(validators.normalize_name)
+    _normalize_lastname = validator('lastname', allow_reuse=True)(validators.normalize_name)
+    _normalize_email = validator('email', allow_reuse=True)(validators.normalize_email)
+
+
+class CustomerBatchIn(Schema):
+    '''Схема IN для получения пользователей по списку id.'''
+
+    id: List[int] = Field(..., min_items=1, max_items=settings.CUSTOMERS_BATCH_MAX_IDS)
+
+
+class TouchIn(Schema):
+    '''Схема IN для даты авторизации пользователя.'''
+
+    last_auth_at: Optional[datetime.datetime] = None
 
 
 class CustomerIn(PhoneStrIn, CustomerUpdate):
@@ -95,17 +99,28 @@ class CustomerFilter(FilterSchema):
     id__in: List[int] = Field(None, alias='id')
     gender: Literal['M', 'F'] = Field(None, alias='gender')
     city_id__in: List[int] = Field(None, alias='city_id')
-    phone: str = Field(None, q='phone__number__icontains')
+    phone: Optional[str] = None
     firstname: str = Field(None, q='firstname__name__icontains')
     lastname: str = Field(None, q='lastname__name__icontains')
     email: str = Field(None, q='email__icontains')
     birthday_min: Optional[datetime.date] = None
     birthday_max: Optional[datetime.date] = None
+    birthday_next_days: Optional[int] = Field(None, ge=0, le=366)
     created_at_min: Optional[datetime.date] = None
     created_at_max: Optional[datetime.date] = None
     last_auth_at_min: Optional[datetime.date] = None
     last_auth_at_max: Optional[datetime.date] = None
 
+    def filter_phone(self, value: Optional[str]) -> Q:
+        '''
+        Условие фильтра по части номера телефона без кода страны (10 цифр).
+
+        Код страны не участвует в поиске: иначе "79" совпадает с каждым номером +7.
+        '''
+        if value is None:
+            return Q()
+        return Q(Contains(PHONE_NUMBER, value))
+
     def filter_birthday_min(self, value: datetime.date) -> Q:
         '''Условие фильтра для поиска.'''
         return Q(birthday__gte=value)
@@ -114,6 +129,28 @@ class CustomerFilter(FilterSchema):
         '''Условие фильтра для поиска.'''
         return Q(birthday__lte=value)
 
+    def filter_birthday_next_days(self, value: Optional[int]) -> Q:
+        '''
+        Условие фильтра дней рождения в ближайшие value дней, включая сегодня.
+
+        Сравнивается месяц и день рождения (индекс customers_birthday_md_idx),
+        окно через конец года разбивается на два интервала.
+        '''
+        # FilterSchema вызывает метод и для незаданного фильтра
+        if value is None:
+            return Q()
+        today = timezone.localdate()
+        start = today.month * 100 + today.day
+        end_date = today + datetime.timedelta(days=value)
+        end = end_date.month * 100 + end_date.day
+        if value >= 365:
+            return Q(birthday__isnull=False)
+        if start <= end:
+            return Q(birthday__isnull=False) & _month_day_range(start, end)
+        # Закрытые интервалы: планировщик объединяет два сканирования индекса (BitmapOr)
+        window = _month_day_range(start, 1231) | _month_day_range(101, end)
+        return Q(birthday__isnull=False) & window
+
     def filter_created_at_min(self, value: datetime.date) -> Q:
         '''Условие фильтра для поиска.'''
         return Q(created_at__gte=value)
@@ -131,6 +168,36 @@ class CustomerFilter(FilterSchema):
         return Q(last_auth_at__lte=value)
 
 
+class CustomerStatsFilter(FilterSchema):
+    '''Схема FILTER для статистики пользователей.'''
+
+    city_id__in: List[int] = Field(None, alias='city_id')
+    gender: Literal['M', 'F'] = Field(None, alias='gender')
+    signup_month__gte: datetime.date = Field(None, alias='signup_month_min')
+    signup_month__lte: datetime.date = Field(None, alias='signup_month_max')
+    activity__in: List[Literal['7d', '30d', '90d', 'older', 'never']] = Field(
+        None, alias='activity'
+    )
+
+
+class CustomerStatsItemOut(Schema):
+    '''Схема OUT для группы статистики пользователей (поля группировки и количество).'''
+
+    city_id: Optional[int] = None
+    gender: Optional[str] = None
+    signup_month: Optional[datetime.date] = None
+    activity: Optional[str] = None
+    count: int
+
+
+class CustomerStatsOut(Schema):
+    '''Схема OUT для статистики пользователей.'''
+
+    refreshed_at: Optional[datetime.datetime]
+    total: int
+    items: List[CustomerStatsItemOut]
+
+
 class CustomerResponseOut(Schema):
     '''Схема OUT для общих ответов пользователя.'''
 
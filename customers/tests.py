@@ -0,0 +1,448 @@
+'''Тесты методов API и команд пользователей.'''
+import datetime
+import io
+import json
+import threading
+import time
+from typing import Any, Dict, List
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, DatabaseError, transaction
+from django.test import (
+    Client, override_settings, SimpleTestCase, TestCase, TransactionTestCase
+)
+from django.utils import timezone
+from favorites.models import Favorites
+from pydantic.networks import validate_email
+from servicecustomers import db_router
+
+from . import cache, touch, validators
+from .models import Customers, Phones
+
+URL = '/rest/v1/customers/'
+
+
+class CustomersTestCase(TestCase):
+    '''Общие методы тестов пользователей.'''
+
+    def setUp(self) -> None:
+        '''Подготовка клиента API.'''
+        self.client = Client()
+
+    def create(self, phone: str = '79025163138', **data: Any) -> Dict[str, Any]:
+        '''Метод создания пользователя через API.'''
+        response = self.client.post(
+            URL, json.dumps({'phone': phone, **data}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+
+class ValidatorsTests(SimpleTestCase):
+    '''Тесты проверки и нормализации телефонов, имен и почты.'''
+
+    def test_normalize_phone(self) -> None:
+        '''Номер из 11-14 цифр без ведущего 0, 8 меняется на 7 только в номере из 11 цифр.'''
+        for phone, expected in (('89025163138', '79025163138'), ('79025163138', '79025163138'),
+                                ('890251631381', '890251631381'),
+                                ('12345678901234', '12345678901234')):
+            self.assertEqual(validators.normalize_phone(phone), expected)
+        for phone in ('9025163138', '123456789012345', '09025163138', '+79025163138',
+                      '7902516313x', '7 9025163138', ''):
+            with self.assertRaises(ValueError, msg=phone):
+                validators.normalize_phone(phone)
+
+    def test_normalize_name(self) -> None:
+        '''Имя с заглавной буквы, цифры в имени - ошибка.'''
+        self.assertEqual(validators.normalize_name('анна-мария'), 'Анна-Мария')
+        with self.assertRaises(ValueError):
+            validators.normalize_name('иван2')
+
+    def test_normalize_email(self) -> None:
+        '''Результат и ошибки совпадают с pydantic, типовые адреса - без вызова pydantic.'''
+        fast = ('Ving@Mail.RU', 'User.Name+tag@Sub.Mail.RU', 'user_1@my-mail.com')
+        fallback = ('имя@почта.рф', 'user@Пример.РФ', ' user@mail.ru', 'x' * 65 + '@mail.ru',
+                    'user@xn--80a.ru', 'user@localhost', 'user@mail.test', 'a..b@mail.ru',
+                    'user@mail', 'user@-mail.ru', 'us"er@mail.ru', 'user')
+        for emails, fast_path in ((fast, True), (fallback, False)):
+            for email in emails:
+                try:
+                    expected = validate_email(email)[1]
+                except ValueError:
+                    expected = None
+                with mock.patch.object(validators, 'validate_email',
+                                       wraps=validate_email) as validate_mock:
+                    try:
+                        result = validators.normalize_email(email)
+                    except ValueError:
+                        result = None
+                self.assertEqual(result, expected, email)
+                self.assertEqual(validate_mock.called, not fast_path, email)
+
+    def test_columns(self) -> None:
+        '''Колонка проверяется по значениям: каждое различное значение - один раз.'''
+        with mock.patch.object(validators, 'normalize_phone',
+                               wraps=validators.normalize_phone) as normalize_mock:
+            phones = validators.normalize_phones(['89025163138', '123', '89025163138'])
+        self.assertEqual(phones, ['79025163138', None, '79025163138'])
+        self.assertEqual(normalize_mock.call_count, 2)
+        self.assertEqual(validators.normalize_names(['иван', 'иван2']), ['Иван', None])
+        self.assertEqual(validators.normalize_emails(['Ving@Mail.RU', 'ving']),
+                         ['Ving@mail.ru', None])
+
+    def test_source_columns(self) -> None:
+        '''Правила источника импорта: последние 10 цифр телефона, имя без проверки, маска почты.'''
+        self.assertEqual(
+            validators.normalize_phones(['+79025163138', '89025163139', '+7902516313x'],
+                                        source=True),
+            ['79025163138', '79025163139', None]
+        )
+        # Пустые значения источника (NULL) не отбрасываются
+        names: List[Any] = ['иван2', None, 'и' * 60]
+        self.assertEqual(validators.normalize_names(names, source=True),
+                         ['Иван2', 'None', 'И' + 'и' * 49])
+        emails: List[Any] = ['Ving@Mail.ru ', 'ving', None, 'a@mail.museum']
+        self.assertEqual(validators.normalize_emails(emails, source=True),
+                         ['ving@mail.ru', None, None, None])
+
+
+class SoftDeleteTests(CustomersTestCase):
+    '''Тесты удаления пользователя (пометка deleted_at) и фоновой очистки.'''
+
+    def setUp(self) -> None:
+        '''Создание удаленного и действующего пользователей.'''
+        super().setUp()
+        self.deleted = self.create('79025163138', firstname='Иван')
+        self.alive = self.create('79025163139', firstname='Анна')
+        Favorites.objects.create(customer_id=self.deleted['id'], item_id=1)
+        response = self.client.delete(f'{URL}{self.deleted["id"]}/')
+        self.assertEqual(response.json()['success'], True)
+
+    def test_deleted_customer_hidden(self) -> None:
+        '''Удаленный пользователь не возвращается методами чтения.'''
+        self.assertEqual(self.client.get(f'{URL}{self.deleted["id"]}/').status_code, 404)
+        self.assertEqual(self.client.get(f'{URL}by-phone/79025163138').status_code, 404)
+        ids = [item['id'] for item in self.client.get(URL).json()['items']]
+        self.assertEqual(ids, [self.alive['id']])
+        response = self.client.post(
+            f'{URL}batch', json.dumps({'id': [self.deleted['id'], self.alive['id']]}),
+            content_type='application/json'
+        )
+        self.assertEqual(list(response.json()), [str(self.alive['id'])])
+        favorites = self.client.get(
+            '/rest/v1/favorites/', {'customer_id': self.deleted['id']}
+        ).json()
+        self.assertEqual(favorites['count'], 0)
+
+    def test_deleted_customer_not_modified(self) -> None:
+        '''Повторное удаление и изменение удаленного пользователя - 404.'''
+        self.assertEqual(self.client.delete(f'{URL}{self.deleted["id"]}/').status_code, 404)
+        response = self.client.patch(
+            f'{URL}{self.deleted["id"]}/', json.dumps({'firstname': 'Петр'}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_purge(self) -> None:
+        '''Очистка удаляет пользователя, его телефон и избранное, номер снова свободен.'''
+        call_command('purge_customers', batch_size=1, stdout=io.StringIO())
+        self.assertFalse(Customers.objects.filter(id=self.deleted['id']).exists())
+        self.assertFalse(Phones.objects.filter(e164=79025163138).exists())
+        self.assertFalse(Favorites.objects.filter(customer_id=self.deleted['id']).exists())
+        self.assertTrue(Customers.objects.filter(id=self.alive['id']).exists())
+        self.create('79025163138')
+
+
+class ConcurrentUpdateTests(TransactionTestCase):
+    '''Тесты изменения пользователя одновременно с его удалением.'''
+
+    def test_update_during_delete(self) -> None:
+        '''Изменение ждет удаления и возвращает 404, пометка deleted_at не сбрасывается.'''
+        client = Client()
+        customer = client.post(
+            URL, json.dumps({'phone': '79025163138', 'firstname': 'иван'}),
+            content_type='application/json'
+        ).json()
+        responses = []
+
+        def update() -> None:
+            try:
+                responses.append(client.patch(
+                    f'{URL}{customer["id"]}/', json.dumps({'firstname': 'Петр'}),
+                    content_type='application/json'
+                ))
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            Customers.objects.filter(id=customer['id']).update(deleted_at=timezone.now())
+            thread = threading.Thread(target=update)
+            thread.start()
+            # Изменение ожидает блокировку строки, пока удаление не зафиксировано
+            time.sleep(0.2)
+            self.assertTrue(thread.is_alive())
+        thread.join(timeout=10)
+
+        self.assertEqual(responses[0].status_code, 404)
+        deleted = Customers.objects.select_related('firstname').get(id=customer['id'])
+        self.assertIsNotNone(deleted.deleted_at)
+        self.assertEqual(deleted.firstname.name, 'Иван')
+
+
+class UpdatePhoneTests(CustomersTestCase):
+    '''Тесты изменения телефона пользователя.'''
+
+    def patch_phone(self, customer_id: int, phone: str) -> Any:
+        '''Метод изменения телефона через API.'''
+        return self.client.patch(
+            f'{URL}{customer_id}/phone', json.dumps({'phone': phone}),
+            content_type='application/json'
+        )
+
+    def test_change(self) -> None:
+        '''Телефон изменяется на месте, старый номер освобождается.'''
+        customer = self.create('79025163138')
+        response = self.patch_phone(customer['id'], '89025163100')
+        self.assertEqual(response.json()['success'], True)
+        phone = self.client.get(f'{URL}{customer["id"]}/').json()['phone']
+        self.assertEqual((phone['id'], phone['number']), (customer['phone']['id'], '9025163100'))
+        self.create('79025163138')
+
+    def test_taken_number(self) -> None:
+        '''Занятый номер (в том числе удаленным пользователем до очистки) отклоняется.'''
+        customer = self.create('79025163138')
+        other = self.create('79025163139')
+        self.client.delete(f'{URL}{other["id"]}/')
+        response = self.patch_phone(customer['id'], '79025163139')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'success': False, 'message': 'Номер уже занят', 'data': None
+        })
+        phone = self.client.get(f'{URL}{customer["id"]}/').json()['phone']
+        self.assertEqual(phone['number'], '9025163138')
+
+    def test_not_found(self) -> None:
+        '''Несуществующий и удаленный пользователь - 404.'''
+        customer = self.create('79025163138')
+        self.assertEqual(self.patch_phone(customer['id'] + 1, '79025163100').status_code, 404)
+        self.client.delete(f'{URL}{customer["id"]}/')
+        self.assertEqual(self.patch_phone(customer['id'], '79025163100').status_code, 404)
+
+
+class PhoneFormatTests(CustomersTestCase):
+    '''Тесты хранения телефона в формате E.164 и поиска по номеру.'''
+
+    def test_create(self) -> None:
+        '''Номер с 8 приводится к 7, код и номер вычисляются из e164.'''
+        customer = self.create('89025163138')
+        self.assertEqual(customer['phone']['code'], '7')
+        self.assertEqual(customer['phone']['number'], '9025163138')
+        self.assertTrue(Phones.objects.filter(e164=79025163138).exists())
+        response = self.client.get(f'{URL}by-phone/79025163138')
+        self.assertEqual(response.json()['id'], customer['id'])
+
+    def test_invalid_phone(self) -> None:
+        '''Номер с 0 в начале, с буквами или неверной длины отклоняется.'''
+        for phone in ('09025163138', '7902516313x', '7902516313', '790251631381234'):
+            response = self.client.post(
+                URL, json.dumps({'phone': phone}), content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 422, phone)
+        self.assertEqual(self.client.get(f'{URL}by-phone/09025163138').status_code, 400)
+
+    def test_filter_national_number(self) -> None:
+        '''Фильтр phone ищет по номеру без кода страны.'''
+        first = self.create('79025163138')
+        second = self.create('3809025160079')
+        self.create('79990000000')
+
+        def search(phone: str) -> List[int]:
+            response = self.client.get(URL, {'phone': phone})
+            return [item['id'] for item in response.json()['items']]
+
+        self.assertEqual(search('9025'), [first['id'], second['id']])
+        self.assertEqual(search('0079'), [second['id']])
+        self.assertEqual(search('79025'), [])
+        self.assertEqual(search('380'), [])
+
+
+class BirthdayFilterTests(CustomersTestCase):
+    '''Тесты фильтра ближайших дней рождения (birthday_next_days).'''
+
+    def setUp(self) -> None:
+        '''Создание пользователей с днями рождения в конце и начале года.'''
+        super().setUp()
+        birthdays = ('1990-12-27', '1985-12-28', '2000-12-31', '1970-01-03', '1995-01-05')
+        self.ids = {
+            birthday: self.create(f'7902516310{number}', birthday=birthday)['id']
+            for number, birthday in enumerate(birthdays)
+        }
+        self.create('79025163200')
+
+    def search(self, today: datetime.date, days: int) -> List[str]:
+        '''Метод поиска дней рождения в ближайшие days дней от даты today.'''
+        with mock.patch('django.utils.timezone.localdate', return_value=today):
+            response = self.client.get(URL, {'birthday_next_days': days})
+        found = {item['id'] for item in response.json()['items']}
+        return [birthday for birthday, customer_id in self.ids.items() if customer_id in found]
+
+    def test_window_in_year(self) -> None:
+        '''Окно внутри года, граничные дни включаются.'''
+        self.assertEqual(self.search(datetime.date(2024, 12, 27), 1),
+                         ['1990-12-27', '1985-12-28'])
+        self.assertEqual(self.search(datetime.date(2024, 12, 28), 0), ['1985-12-28'])
+
+    def test_window_across_year_end(self) -> None:
+        '''Окно через конец года включает конец декабря и начало января.'''
+        self.assertEqual(self.search(datetime.date(2024, 12, 28), 6),
+                         ['1985-12-28', '2000-12-31', '1970-01-03'])
+
+    def test_whole_year(self) -> None:
+        '''Окно в год и больше - все пользователи с днем рождения.'''
+        self.assertEqual(self.search(datetime.date(2024, 6, 1), 366), list(self.ids))
+
+
+@mock.patch('customers.touch._thread', mock.Mock())
+class TouchTests(CustomersTestCase):
+    '''Тесты буфера дат авторизации (touch) без фонового потока.'''
+
+    def setUp(self) -> None:
+        '''Создание пользователей, очистка буфера.'''
+        super().setUp()
+        self.ids = [self.create(f'7902516310{number}')['id'] for number in range(3)]
+        self.date = datetime.datetime(2024, 1, 9, 8, 38, tzinfo=datetime.timezone.utc)
+        touch._buffer.clear()
+
+    def last_auth_at(self, customer_id: int) -> Any:
+        '''Метод получения даты авторизации пользователя из БД.'''
+        return Customers.objects.values_list('last_auth_at', flat=True).get(id=customer_id)
+
+    def test_flush(self) -> None:
+        '''Сохраняется максимальная дата, более ранняя дата не переписывает БД.'''
+        hour = datetime.timedelta(hours=1)
+        Customers.objects.filter(id=self.ids[1]).update(last_auth_at=self.date + hour)
+        for date in (self.date, self.date + hour, self.date - hour):
+            touch.touch(self.ids[0], date)
+        touch.touch(self.ids[1], self.date)
+        touch.touch(self.ids[2] + 1, self.date)
+        self.assertIsNone(self.last_auth_at(self.ids[0]))
+
+        self.assertEqual(touch.flush(), 1)
+        self.assertEqual(self.last_auth_at(self.ids[0]), self.date + hour)
+        self.assertEqual(self.last_auth_at(self.ids[1]), self.date + hour)
+        self.assertEqual(touch._buffer, {})
+
+    def test_flush_sorted(self) -> None:
+        '''Пачки сохраняются по возрастанию id пользователя.'''
+        for customer_id in reversed(self.ids):
+            touch.touch(customer_id, self.date)
+        with mock.patch('customers.touch._update', return_value=3) as update:
+            touch.flush()
+        self.assertEqual([item[0] for item in update.call_args.args[0]], self.ids)
+
+    @override_settings(CUSTOMERS_TOUCH_BUFFER_SIZE=2)
+    def test_buffer_full(self) -> None:
+        '''При заполненном буфере дата нового пользователя сохраняется сразу.'''
+        touch.touch(self.ids[0], self.date)
+        touch.touch(self.ids[1], self.date)
+        touch.touch(self.ids[2], self.date)
+        touch.touch(self.ids[0], self.date + datetime.timedelta(hours=1))
+        self.assertEqual(set(touch._buffer), set(self.ids[:2]))
+        self.assertEqual(self.last_auth_at(self.ids[2]), self.date)
+
+    @override_settings(CUSTOMERS_TOUCH_BUFFER_SIZE=2)
+    def test_restore(self) -> None:
+        '''После ошибки БД даты возвращаются в буфер, не поместившиеся - в журнал.'''
+        touch.touch(self.ids[0], self.date)
+        touch.touch(self.ids[1], self.date)
+        with mock.patch('customers.touch._update', side_effect=DatabaseError('failover')):
+            with self.assertLogs('customers.touch', level='ERROR'):
+                touch.flush()
+        self.assertEqual(set(touch._buffer), set(self.ids[:2]))
+
+        # Пока буфер сохранялся, в него попал новый пользователь: места хватает на одну дату
+        touch._buffer.clear()
+        touch._buffer[self.ids[2]] = self.date
+        with self.assertLogs('customers.touch', level='ERROR') as logs:
+            touch._restore([(self.ids[0], self.date), (self.ids[1], self.date)])
+        self.assertIn('не сохранено дат: 1', logs.output[0])
+        self.assertEqual(set(touch._buffer), {self.ids[0], self.ids[2]})
+
+    def test_run_closes_connection(self) -> None:
+        '''Фоновый поток закрывает свое соединение после каждого сохранения.'''
+        class Stop(Exception):
+            '''Исключение для остановки фонового потока.'''
+
+        wait = mock.patch.object(touch._wakeup, 'wait', side_effect=[True, False, Stop])
+        flush = mock.patch('customers.touch.flush', return_value=0)
+        close = mock.patch('customers.touch.connection.close')
+        with wait, flush as flush_mock, close as close_mock, self.assertRaises(Stop):
+            touch._run()
+        self.assertEqual(flush_mock.call_count, 2)
+        self.assertEqual(close_mock.call_count, 2)
+
+
+class CustomersCacheTests(CustomersTestCase):
+    '''Тесты кэша данных пользователей (метод batch).'''
+
+    def setUp(self) -> None:
+        '''Создание пользователей, очистка кэша.'''
+        super().setUp()
+        caches[cache.CACHE_NAME].clear()
+        self.ids = [self.create(f'7902516310{number}')['id'] for number in range(2)]
+
+    def batch(self, ids: List[int]) -> Dict[str, Any]:
+        '''Метод получения пользователей по списку id через API.'''
+        response = self.client.post(
+            f'{URL}batch', json.dumps({'id': ids}), content_type='application/json'
+        )
+        return response.json()
+
+    def test_cached(self) -> None:
+        '''Повторное чтение - из кэша, без запроса в БД.'''
+        self.assertEqual(list(self.batch(self.ids)), [str(self.ids[0]), str(self.ids[1])])
+        with self.assertNumQueries(0):
+            cache.get_customers(self.ids)
+
+    def test_invalidate(self) -> None:
+        '''Изменение и удаление через API сбрасывают запись кэша.'''
+        self.batch(self.ids)
+        self.client.patch(
+            f'{URL}{self.ids[0]}/', json.dumps({'firstname': 'Петр'}),
+            content_type='application/json'
+        )
+        self.client.delete(f'{URL}{self.ids[1]}/')
+        result = self.batch(self.ids)
+        self.assertEqual(list(result), [str(self.ids[0])])
+        self.assertEqual(result[str(self.ids[0])]['firstname'], 'Петр')
+
+    def test_fill_from_primary(self) -> None:
+        '''Отсутствующие в кэше читаются с основной БД и при чтении с реплики.'''
+        # Реплики в тестах нет: чтение с нее завершилось бы ошибкой
+        token = db_router._use_replica.set(True)
+        try:
+            self.assertEqual(set(cache.get_customers(self.ids)), set(self.ids))
+        finally:
+            db_router._use_replica.reset(token)
+
+
+class CustomerStatsTests(CustomersTestCase):
+    '''Тесты статистики пользователей (customer_stats).'''
+
+    def test_stats(self) -> None:
+        '''Статистика отражает пользователей после обновления, удаленные не учитываются.'''
+        for number, gender in enumerate('MMF'):
+            self.create(f'7902516310{number}', gender=gender)
+        deleted = self.create('79025163200', gender='F')
+        self.client.delete(f'{URL}{deleted["id"]}/')
+        call_command('refresh_customer_stats', stdout=io.StringIO())
+
+        self.assertEqual(self.client.get(f'{URL}stats').json()['total'], 3)
+        response = self.client.get(f'{URL}stats', {'group_by': 'gender'}).json()
+        counts = {item['gender']: item['count'] for item in response['items']}
+        self.assertEqual(counts, {'M': 2, 'F': 1})
+        self.assertIsNotNone(response['refreshed_at'])
+        response = self.client.get(f'{URL}stats', {'gender': 'F'}).json()
+        self.assertEqual(response['total'], 1)
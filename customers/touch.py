@@ -0,0 +1,147 @@
+'''
+Модуль для отложенного сохранения дат авторизации пользователей (write-behind).
+
+Даты авторизации копятся в памяти воркера и сохраняются в БД фоновым потоком
+одним запросом UPDATE ... FROM (VALUES ...) на пачку пользователей.
+
+Ограничения:
+    * дата попадает в БД не позже чем через CUSTOMERS_TOUCH_FLUSH_INTERVAL секунд
+      (плюс время сохранения);
+    * в буфере не более CUSTOMERS_TOUCH_BUFFER_SIZE пользователей: при заполненном
+      буфере дата нового пользователя сохраняется в БД сразу запросом touch;
+    * при аварийном завершении воркера теряются даты не более чем за
+      CUSTOMERS_TOUCH_FLUSH_INTERVAL секунд и не более CUSTOMERS_TOUCH_BUFFER_SIZE
+      пользователей; при штатной остановке буфер сохраняется;
+    * даты, не сохраненные из-за ошибки БД, возвращаются в буфер, пока в нем есть
+      место; остальные теряются (метрика customers_touch_dropped_total);
+    * даты авторизации намеренно не записываются в ленту изменений (changes):
+      поле last_auth_at в ленте может быть устаревшим.
+'''
+import atexit
+import datetime
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, DatabaseError
+from servicecustomers import metrics
+
+logger = logging.getLogger(__name__)
+
+# Количество пользователей в одном запросе UPDATE
+FLUSH_BATCH_SIZE = 1000
+
+# Даты авторизации, ожидающие сохранения: id пользователя -> максимальная дата
+_buffer: Dict[int, datetime.datetime] = {}
+_lock = threading.Lock()
+# Сигнал досрочного сохранения (буфер заполнен)
+_wakeup = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def touch(customer_id: int, last_auth_at: datetime.datetime) -> None:
+    '''
+    Метод добавления даты авторизации пользователя в буфер.
+
+    Аргументы:
+        customer_id (int): id пользователя.
+        last_auth_at (datetime): дата авторизации (сохраняется максимальная).
+
+    Исключения:
+        DatabaseError: буфер заполнен и дату не удалось сохранить в БД.
+    '''
+    global _thread
+
+    with _lock:
+        current = _buffer.get(customer_id)
+        full = current is None and len(_buffer) >= settings.CUSTOMERS_TOUCH_BUFFER_SIZE
+        if not full and (current is None or current < last_auth_at):
+            _buffer[customer_id] = last_auth_at
+        size = len(_buffer)
+        # Поток запускается в воркере при первом обращении (после fork)
+        if _thread is None:
+            _thread = threading.Thread(target=_run, name='customers-touch', daemon=True)
+            _thread.start()
+            atexit.register(flush)
+
+    metrics.TOUCH_BUFFERED.set(size)
+    if size >= settings.CUSTOMERS_TOUCH_BUFFER_SIZE:
+        _wakeup.set()
+    if full:
+        # Сохранение не успевает за отметками (или БД недоступна): буфер не растет,
+        # дата сохраняется сразу в запросе
+        metrics.TOUCH_DIRECT.inc()
+        _update([(customer_id, last_auth_at)])
+
+
+def flush() -> int:
+    '''
+    Метод сохранения буфера в БД.
+
+    Возвращаемый результат:
+        (int): количество обновленных пользователей.
+    '''
+    with _lock:
+        # Пачки обновляют строки по возрастанию id: одновременные сохранения нескольких
+        # воркеров блокируют строки в одном порядке и не попадают во взаимоблокировку
+        items = sorted(_buffer.items())
+        _buffer.clear()
+    metrics.TOUCH_BUFFERED.set(0)
+
+    updated = 0
+    try:
+        for offset in range(0, len(items), FLUSH_BATCH_SIZE):
+            updated += _update(items[offset:offset + FLUSH_BATCH_SIZE])
+    except DatabaseError:
+        logger.exception('Не удалось сохранить даты авторизации')
+        _restore(items)
+
+    metrics.TOUCH_FLUSHED.inc(updated)
+    return updated
+
+
+def _update(items: List[Tuple[int, datetime.datetime]]) -> int:
+    '''Метод обновления дат авторизации пачки пользователей одним запросом.'''
+    values = ', '.join(['(%s, %s::timestamptz)'] * len(items))
+    params = [value for item in items for value in item]
+    with connection.cursor() as cursor:
+        # Строка не переписывается, если в БД уже более поздняя дата
+        cursor.execute(f"""
+            UPDATE customers c
+            SET last_auth_at = v.last_auth_at
+            FROM (VALUES {values}) AS v (id, last_auth_at)
+            WHERE c.id = v.id
+            AND c.deleted_at IS NULL
+            AND (c.last_auth_at IS NULL OR c.last_auth_at < v.last_auth_at)
+        """, params)
+        return cursor.rowcount
+
+
+def _restore(items: List[Tuple[int, datetime.datetime]]) -> None:
+    '''Метод возврата несохраненных дат в буфер (до следующей попытки), пока в нем есть место.'''
+    dropped = 0
+    with _lock:
+        for customer_id, last_auth_at in items:
+            current = _buffer.get(customer_id)
+            if current is None and len(_buffer) >= settings.CUSTOMERS_TOUCH_BUFFER_SIZE:
+                dropped += 1
+            elif current is None or current < last_auth_at:
+                _buffer[customer_id] = last_auth_at
+        size = len(_buffer)
+    metrics.TOUCH_BUFFERED.set(size)
+    if dropped:
+        metrics.TOUCH_DROPPED.inc(dropped)
+        logger.error('Буфер дат авторизации заполнен, не сохранено дат: %s', dropped)
+
+
+def _run() -> None:
+    '''Фоновый поток сохранения буфера.'''
+    while True:
+        _wakeup.wait(settings.CUSTOMERS_TOUCH_FLUSH_INTERVAL)
+        _wakeup.clear()
+        try:
+            flush()
+        finally:
+            # Соединение фонового потока не остается открытым между сохранениями
+            connection.close()
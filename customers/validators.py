@@ -0,0 +1,197 @@
+'''Модуль для проверки и нормализации данных пользователей (телефон, имя, почта).'''
+import re
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar
+
+from pydantic.networks import validate_email
+
+T = TypeVar('T')
+
+# Телефон E.164: 11-14 цифр, код страны не начинается с 0 (кодов с 0 в E.164 нет,
+# а номер хранится целым числом phones.e164 - ведущий 0 был бы потерян и номер изменился)
+PHONE_RE = re.compile(r'[1-9][0-9]{10,13}')
+PHONE_ERROR = 'Неверный формат номера. Телефон должен состоять из 11-14 цифр и не начинаться с 0'
+DIGIT_RE = re.compile(r'\d')
+NAME_ERROR = 'В имени не может быть цифр'
+# Почта, которую pydantic (email-validator) принимает без изменений, кроме регистра домена:
+# ASCII, локальная часть до 64 символов, метки домена без двойных дефисов, буквенный домен
+# верхнего уровня. Остальные адреса проверяются pydantic.
+EMAIL_FAST_RE = re.compile(
+    r'(?P<local>[A-Za-z0-9_+-]+(?:\.[A-Za-z0-9_+-]+)*)@'
+    r'(?P<domain>(?:(?=[A-Za-z0-9-]{1,63}\.)[A-Za-z0-9]+(?:-[A-Za-z0-9]+)*\.)+[A-Za-z]{2,63})'
+)
+# Домены специального назначения, которые pydantic (email-validator) отклоняет
+SPECIAL_USE_DOMAINS = ('arpa', 'invalid', 'local', 'localhost', 'onion', 'test')
+# Маска почты в источнике импорта (ZkzClients)
+SOURCE_EMAIL_RE = re.compile(r'.{1,100}@[a-z]{2,6}\.[a-z]{2,4}')
+
+
+def normalize_phone(phone_raw: str) -> str:
+    '''
+    Метод проверки и нормализации номера телефона (номер с 8 приводится к 7).
+
+    Аргументы:
+        phone_raw (str): номер телефона из 11-14 цифр.
+
+    Возвращаемый результат:
+        (str): номер телефона в формате E.164 без +.
+
+    Исключения:
+        ValueError: неверный формат номера.
+
+    Примеры:
+        >>>> normalize_phone('89025163138')
+        '79025163138'
+    '''
+    if PHONE_RE.fullmatch(phone_raw) is None:
+        raise ValueError(PHONE_ERROR)
+    if phone_raw[0] == '8' and len(phone_raw) == 11:
+        return '7' + phone_raw[1:]
+    return phone_raw
+
+
+def normalize_name(name: str) -> str:
+    '''
+    Метод проверки и нормализации имени (фамилии): без цифр, с заглавной буквы.
+
+    Аргументы:
+        name (str): имя.
+
+    Возвращаемый результат:
+        (str): имя с заглавной буквы.
+
+    Исключения:
+        ValueError: в имени есть цифры.
+
+    Примеры:
+        >>>> normalize_name('анна-мария')
+        'Анна-Мария'
+    '''
+    if DIGIT_RE.search(name) is None:
+        return name.title()
+    raise ValueError(NAME_ERROR)
+
+
+def normalize_email(email: str) -> str:
+    '''
+    Метод проверки и нормализации почты по правилам pydantic EmailStr.
+
+    Типовые адреса проверяются регулярным выражением, остальные - pydantic
+    (email-validator); результат и ошибки совпадают с EmailStr.
+
+    Аргументы:
+        email (str): почта.
+
+    Возвращаемый результат:
+        (str): почта с доменом в нижнем регистре.
+
+    Исключения:
+        ValueError: неверный формат почты (pydantic EmailError).
+
+    Примеры:
+        >>>> normalize_email('Ving@Mail.RU')
+        'Ving@mail.ru'
+    '''
+    match = EMAIL_FAST_RE.fullmatch(email)
+    if match is not None and len(match['local']) <= 64 and len(email) <= 254:
+        domain = match['domain'].lower()
+        if domain.rpartition('.')[2] not in SPECIAL_USE_DOMAINS:
+            return match['local'] + '@' + domain
+    return validate_email(email)[1]
+
+
+def _map_distinct(check: Callable[[str], T], values: Iterable[str]) -> List[Optional[T]]:
+    '''Внутренний метод проверки колонки значений: каждое различное значение проверяется раз.'''
+    results: Dict[str, Optional[T]] = {}
+    column = []
+    for value in values:
+        if value not in results:
+            try:
+                results[value] = check(value)
+            except ValueError:
+                results[value] = None
+        column.append(results[value])
+    return column
+
+
+def _source_phone(value: str) -> str:
+    '''Внутренний метод нормализации телефона источника импорта (последние 10 цифр, код 7).'''
+    # Маска источника пропускает не только цифры
+    if value[-10:].isdigit():
+        return '7' + value[-10:]
+    raise ValueError(PHONE_ERROR)
+
+
+def _source_name(value: object) -> str:
+    '''Внутренний метод нормализации имени источника импорта (до 50 символов, без проверки).'''
+    return str(value)[:50].title()
+
+
+def _source_email(value: object) -> str:
+    '''Внутренний метод проверки почты источника импорта по маске источника.'''
+    email = str(value).replace(' ', '').lower()
+    if SOURCE_EMAIL_RE.fullmatch(email) is None:
+        raise ValueError('Почта не соответствует маске источника')
+    return email
+
+
+def normalize_phones(values: Iterable[str], source: bool = False) -> List[Optional[str]]:
+    '''
+    Метод проверки и нормализации колонки номеров телефонов (см. normalize_phone).
+
+    Аргументы:
+        values (Iterable[str]): номера телефонов.
+        source (bool): правила источника импорта (ZkzClients): номер - последние
+            10 символов с кодом 7, если это цифры.
+
+    Возвращаемый результат:
+        (List[str | None]): нормализованные номера, None - неверный формат.
+
+    Примеры:
+        >>>> normalize_phones(['89025163138', '123'])
+        ['79025163138', None]
+        >>>> normalize_phones(['+79025163138', '+7902516313x'], source=True)
+        ['79025163138', None]
+    '''
+    return _map_distinct(_source_phone if source else normalize_phone, values)
+
+
+def normalize_names(values: Iterable[str], source: bool = False) -> List[Optional[str]]:
+    '''
+    Метод проверки и нормализации колонки имен (см. normalize_name).
+
+    Аргументы:
+        values (Iterable[str]): имена.
+        source (bool): правила источника импорта (ZkzClients): имя обрезается
+            до 50 символов, цифры допускаются.
+
+    Возвращаемый результат:
+        (List[str | None]): имена с заглавной буквы, None - в имени есть цифры.
+
+    Примеры:
+        >>>> normalize_names(['иван', 'иван2'])
+        ['Иван', None]
+        >>>> normalize_names(['иван', 'иван2'], source=True)
+        ['Иван', 'Иван2']
+    '''
+    return _map_distinct(_source_name if source else normalize_name, values)
+
+
+def normalize_emails(values: Iterable[str], source: bool = False) -> List[Optional[str]]:
+    '''
+    Метод проверки и нормализации колонки адресов почты (см. normalize_email).
+
+    Аргументы:
+        values (Iterable[str]): адреса почты.
+        source (bool): правила источника импорта (ZkzClients): пробелы удаляются,
+            почта приводится к нижнему регистру и проверяется маской источника.
+
+    Возвращаемый результат:
+        (List[str | None]): нормализованные адреса, None - неверный формат.
+
+    Примеры:
+        >>>> normalize_emails(['Ving@Mail.RU', 'ving'])
+        ['Ving@mail.ru', None]
+        >>>> normalize_emails(['Ving@Mail.ru ', 'ving'], source=True)
+        ['ving@mail.ru', None]
+    '''
+    return _map_distinct(_source_email if source else normalize_email, values)
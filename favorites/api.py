@@ -1,8 +1,11 @@
 '''Модуль для методов API по работе с сущностью Избранных товаров.'''
 from typing import Dict, List
 
+from changes import outbox
+from customers import cache
 from customers.models import Customers
 from customers.schemas import CustomerResponseOut
+from django.db import transaction
 from django.http import HttpRequest
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
@@ -58,8 +61,16 @@ def list_favorites(request: HttpRequest, filters: FavoriteFilter = Query(...)) -
           "count": 2
         }
     '''
-    favorites = filters.filter(Favorites.objects.all())
-    return favorites
+    # Избранное удаленных пользователей не возвращается до их очистки
+    if not filters.customer_id__in:
+        return filters.filter(Favorites.objects.filter(customer__deleted_at=None))
+
+    # Пользователи проверяются один раз по кэшу воркера (не старше CUSTOMERS_CACHE_SECONDS),
+    # избранное читается только по customer_id, без соединения с customers
+    active = list(cache.get_customers(filters.customer_id__in))
+    return filters.copy(update={'customer_id__in': None}).filter(
+        Favorites.objects.filter(customer_id__in=active)
+    )
 
 
 @router.post('', summary='Добавление избранного товара', response=FavoriteOut)
@@ -91,16 +102,23 @@ def add_favorite(request: HttpRequest, data: FavoriteIn) -> FavoriteOut:
     '''
     data_dict = data.dict()
 
-    # Получаем клиента
-    customer = get_object_or_404(Customers, pk=data_dict['customer_id'])
-
-    # Добавляем или получаем из базы избранное
-    favorite, _ = Favorites.objects.get_or_create(
-        customer=customer,
-        item_id=data_dict['item_id'],
-    )
-    favorite.created_at = timezone.now()
-    favorite.save(update_fields=['created_at'])
+    with transaction.atomic():
+        # Получаем клиента
+        customer = get_object_or_404(Customers, pk=data_dict['customer_id'], deleted_at=None)
+
+        # Добавляем или получаем из базы избранное
+        favorite, created = Favorites.objects.get_or_create(
+            customer=customer,
+            item_id=data_dict['item_id'],
+        )
+        favorite.created_at = timezone.now()
+        favorite.save(update_fields=['created_at'])
+        outbox.record(
+            'favorite',
+            favorite.id,
+            'create' if created else 'update',
+            FavoriteOut.from_orm(favorite).dict()
+        )
     return favorite
 
 
@@ -135,5 +153,17 @@ def delete_favorite(
           }
         }
     '''
-    count_deleted, _ = data.filter(Favorites.objects.all()).delete()
+    with transaction.atomic():
+        # Строки блокируются до удаления, чтобы в ленту попали только удаленные этим запросом
+        favorites = list(
+            data.filter(Favorites.objects.select_for_update()).values_list('id', 'customer_id')
+        )
+        # Условие по customer_id ограничивает удаление секциями пользователей
+        count_deleted, _ = Favorites.objects.filter(
+            customer_id__in={customer_id for _, customer_id in favorites},
+            id__in=[favorite_id for favorite_id, _ in favorites]
+        ).delete()
+        outbox.record_many('favorite', 'delete', [
+            (favorite_id, {'customer_id': customer_id}) for favorite_id, customer_id in favorites
+        ])
     return {'success': True, 'message': None, 'data': {'count_deleted': count_deleted}}
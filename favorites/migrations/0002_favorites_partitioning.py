@@ -0,0 +1,96 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Количество секций таблицы favorites (hash по customer_id)
+PARTITIONS = 16
+
+PARTITION_SQL = [
+    f'CREATE TABLE favorites_p{remainder} PARTITION OF favorites_partitioned '
+    f'FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder}) '
+    # Секции в основном пополняются: чаще обновляем карту видимости для index-only scan
+    f'WITH (autovacuum_vacuum_insert_scale_factor = 0.02)'
+    for remainder in range(PARTITIONS)
+]
+
+FORWARD_SQL = [
+    # Запрет записи в таблицу на время переноса данных
+    'LOCK TABLE favorites IN EXCLUSIVE MODE',
+    """
+    CREATE TABLE favorites_partitioned (
+        id bigint GENERATED BY DEFAULT AS IDENTITY,
+        item_id integer NOT NULL,
+        created_at timestamp with time zone NULL,
+        customer_id integer NOT NULL,
+        PRIMARY KEY (id, customer_id)
+    ) PARTITION BY HASH (customer_id)
+    """,
+    *PARTITION_SQL,
+    'INSERT INTO favorites_partitioned (id, item_id, created_at, customer_id) '
+    'SELECT id, item_id, created_at, customer_id FROM favorites',
+    "SELECT setval(pg_get_serial_sequence('favorites_partitioned', 'id'), "
+    'coalesce(max(id), 0) + 1, false) FROM favorites_partitioned',
+    'DROP TABLE favorites',
+    'ALTER TABLE favorites_partitioned RENAME TO favorites',
+    *(f'ALTER TABLE favorites_p{remainder} RENAME TO favorites_{remainder}'
+      for remainder in range(PARTITIONS)),
+    'ALTER TABLE favorites ADD CONSTRAINT favorites_customer_id_fk FOREIGN KEY (customer_id) '
+    'REFERENCES customers (id) DEFERRABLE INITIALLY DEFERRED',
+    # Покрывающие индексы: страница избранного пользователя и поиск по товарам
+    'CREATE INDEX favorites_customer_created_idx ON favorites '
+    '(customer_id, created_at DESC) INCLUDE (id, item_id)',
+    'CREATE INDEX favorites_item_idx ON favorites (item_id) INCLUDE (id, customer_id, created_at)',
+    'ANALYZE favorites',
+]
+
+REVERSE_SQL = [
+    'LOCK TABLE favorites IN EXCLUSIVE MODE',
+    """
+    CREATE TABLE favorites_plain (
+        id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+        item_id integer NOT NULL,
+        created_at timestamp with time zone NULL,
+        customer_id integer NOT NULL
+    )
+    """,
+    'INSERT INTO favorites_plain (id, item_id, created_at, customer_id) '
+    'SELECT id, item_id, created_at, customer_id FROM favorites',
+    "SELECT setval(pg_get_serial_sequence('favorites_plain', 'id'), "
+    'coalesce(max(id), 0) + 1, false) FROM favorites_plain',
+    'DROP TABLE favorites',
+    'ALTER TABLE favorites_plain RENAME TO favorites',
+    'ALTER TABLE favorites ADD CONSTRAINT favorites_customer_id_fk FOREIGN KEY (customer_id) '
+    'REFERENCES customers (id) DEFERRABLE INITIALLY DEFERRED',
+    'CREATE INDEX favorites_customer_id_idx ON favorites (customer_id)',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('favorites', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(sql=FORWARD_SQL, reverse_sql=REVERSE_SQL),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='favorites',
+                    name='customer',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='customers.customers'),
+                ),
+                migrations.AddIndex(
+                    model_name='favorites',
+                    index=models.Index(fields=['customer', '-created_at'], include=('id', 'item_id'), name='favorites_customer_created_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='favorites',
+                    index=models.Index(fields=['item_id'], include=('id', 'customer', 'created_at'), name='favorites_item_idx'),
+                ),
+            ],
+        ),
+    ]
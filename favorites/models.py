@@ -7,11 +7,27 @@ from django.db import models
 class Favorites(models.Model):
     '''Модель для избранных товаров.'''
 
-    # Удаляем клиента - каскадно удаляются и его избранные
-    customer = models.ForeignKey(Customers, on_delete=models.CASCADE)
+    # Удаляем клиента - каскадно удаляются и его избранные.
+    # Отдельный индекс не нужен: customer_id - первое поле индекса страницы избранного
+    customer = models.ForeignKey(Customers, on_delete=models.CASCADE, db_index=False)
     item = models.IntegerField(name='item_id')
     created_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = 'favorites'
         ordering = ['-created_at']
+        # Таблица секционирована по hash(customer_id), первичный ключ в БД - (id, customer_id).
+        # Покрывающие индексы позволяют читать страницу избранного пользователя и поиск
+        # по товарам только из индекса (index-only scan)
+        indexes = (
+            models.Index(
+                fields=['customer', '-created_at'],
+                include=['id', 'item_id'],
+                name='favorites_customer_created_idx',
+            ),
+            models.Index(
+                fields=['item_id'],
+                include=['id', 'customer', 'created_at'],
+                name='favorites_item_idx',
+            ),
+        )
@@ -0,0 +1,85 @@
+'''Тесты методов API избранных товаров.'''
+import json
+import re
+from typing import Any, Dict, List
+
+from customers.tests import CustomersTestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .models import Favorites
+
+URL = '/rest/v1/favorites/'
+
+
+class FavoritesTests(CustomersTestCase):
+    '''Тесты избранного в секционированной таблице favorites (hash по customer_id).'''
+
+    def setUp(self) -> None:
+        '''Создание пользователей.'''
+        super().setUp()
+        self.customers = [self.create(f'7902516310{number}')['id'] for number in range(8)]
+
+    def add(self, customer_id: int, item_id: int) -> Dict[str, Any]:
+        '''Метод добавления избранного через API.'''
+        response = self.client.post(
+            URL, json.dumps({'customer_id': customer_id, 'item_id': item_id}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def partitions(self, customer_id: int) -> List[str]:
+        '''Метод получения секций, которые читает запрос избранного пользователя.'''
+        plan = Favorites.objects.filter(customer_id=customer_id).explain()
+        return sorted(set(re.findall(r'\bfavorites_\d+\b', plan)))
+
+    def test_add_and_list(self) -> None:
+        '''Повторное добавление товара обновляет запись, страница - по убыванию даты.'''
+        customer_id = self.customers[0]
+        first = self.add(customer_id, 10)
+        self.add(customer_id, 20)
+        self.assertEqual(self.add(customer_id, 10)['id'], first['id'])
+        response = self.client.get(URL, {'customer_id': customer_id})
+        items = [item['item_id'] for item in response.json()['items']]
+        self.assertEqual(items, [10, 20])
+
+    def test_list_deleted_customers(self) -> None:
+        '''Избранное удаленного пользователя не возвращается, customers не соединяется.'''
+        for customer_id in self.customers[:3]:
+            self.add(customer_id, 10)
+        self.client.delete(f'/rest/v1/customers/{self.customers[1]}/')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(URL, {'customer_id': self.customers[:3]})
+        customer_ids = [item['customer_id'] for item in response.json()['items']]
+        self.assertEqual(sorted(customer_ids), [self.customers[0], self.customers[2]])
+        favorites_sql = [query['sql'] for query in queries if 'FROM "favorites"' in query['sql']]
+        self.assertTrue(favorites_sql)
+        for sql in favorites_sql:
+            self.assertNotIn('"customers"', sql)
+
+        response = self.client.get(URL, {'customer_id': self.customers[1]})
+        self.assertEqual(response.json()['count'], 0)
+
+    def test_partition_pruning(self) -> None:
+        '''Записи распределяются по секциям, запрос пользователя читает одну секцию.'''
+        for customer_id in self.customers:
+            self.add(customer_id, 1)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT customer_id, tableoid::regclass::text FROM favorites ORDER BY customer_id'
+            )
+            rows = dict(cursor.fetchall())
+        self.assertGreater(len(set(rows.values())), 1)
+        for customer_id in self.customers:
+            self.assertEqual(self.partitions(customer_id), [rows[customer_id]])
+
+    def test_delete(self) -> None:
+        '''Удаляются только переданные записи.'''
+        kept = self.add(self.customers[0], 10)
+        deleted = [self.add(customer_id, 20)['id'] for customer_id in self.customers[:3]]
+        response = self.client.delete(
+            URL, json.dumps({'id': deleted}), content_type='application/json'
+        )
+        self.assertEqual(response.json()['data'], {'count_deleted': 3})
+        self.assertEqual(list(Favorites.objects.values_list('id', flat=True)), [kept['id']])
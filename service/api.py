@@ -1,11 +1,12 @@
 '''Модуль для методов API по работе с сущностью Клиента.'''
-import re
+from typing import Any, Dict, List
 
-from customers.models import Customers, Firstnames, Phones
-from django.db import connections
 from django.http import HttpRequest, HttpResponse
 from ninja import Router
-from servicecustomers import utils
+
+from . import importer, slow_queries, sources
+from .auth import AdminTokenAuth
+from .schemas import SlowQueryOut
 
 router = Router()
 
@@ -15,6 +16,8 @@ def import_customers(request: HttpRequest) -> HttpResponse:
     '''
     Метод импорта данных зарегистрированных пользователей из MSSQL БД.
 
+    Источник данных задается настройкой IMPORT_SOURCE (mssql, sqlite или postgres).
+
     Аргументы:
         request (HttpRequest): информация о запросе.
 
@@ -25,85 +28,51 @@ def import_customers(request: HttpRequest) -> HttpResponse:
         >>>> import_customers(HttpRequest())
         ('Импорт выполнен')
     '''
-    customers = []
-    pattern_email = r'^.{1,100}@[a-z]{2,6}\.[a-z]{2,4}$'
-
     try:
-        # Запрос к MSSQL
-        with connections['mssql_db'].cursor() as cursor:
-            cursor.execute("""
-                SELECT
-                    ID,
-                    right(phone_main, 10) as phone_main,
-                    FirstFIO,
-                    email_main,
-                    created_at,
-                    DATEADD(s, created_at, '1970-01-01') as created_at_format_datetime
-                FROM ZkzClients c WITH (NOLOCK)
-                WHERE c.ID IN
-                    (SELECT max(a.ID)
-                    FROM (SELECT
-                        ID,
-                        phone_main,
-                        right(phone_main, 10) as phone_main_substring,
-                        FirstFIO,
-                        email_main,
-                        max(created_at) OVER (PARTITION BY phone_main)  AS rating_in_section
-                    FROM ZkzClients WITH (NOLOCK)
-                    WHERE phone_main LIKE '+7__________' OR
-                    phone_main LIKE '7__________' OR
-                    phone_main LIKE '8__________'
-                    ) a
-                    JOIN ZkzClients b WITH (NOLOCK)
-                    ON a.ID = b.ID
-                    GROUP BY a.phone_main_substring)
-                ORDER BY ID
-            """)
-            result = utils.fetch_named(cursor)
-
-            for row in result:
-                # Номер телефона
-                phone_raw = row.get('phone_main', 0)
-                # Добавляем или получаем из базы номер
-                phone, phone_created = Phones.objects.get_or_create(
-                    number=phone_raw[-10:],
-                    code='7'
-                )
-
-                # Имя (FirstFIO добавляем в Firstnames)
-                name = str(row.get('FirstFIO', ''))[:50].title()
-                fio, _ = Firstnames.objects.get_or_create(name=name)
-
-                # Почта (проверка email_main)
-                email = None
-                email_main = str(row.get('email_main', '')).replace(' ', '').lower()
-                # Почта соответствует маске
-                if re.fullmatch(pattern_email, email_main):
-                    # Email корректный
-                    email = email_main
-
-                # Создание instance Customers
-                customers.append(
-                    Customers(
-                        id=int(row['ID']),
-                        phone=phone,
-                        firstname=fio,
-                        email=email,
-                        created_at=row.get('created_at_format_datetime')
-                    )
-                )
-
-            try:
-                # Добавляем клиентов в бд
-                Customers.objects.bulk_create(customers, ignore_conflicts=True)
-            except Exception:
-                return HttpResponse(
-                    'Импорт не выполнен. Ошибка добавления пользователей в Postgres.'
-                )
-
+        importer.run_import(sources.get_source())
+    except importer.ImportSaveError:
+        return HttpResponse(
+            'Импорт не выполнен. Ошибка добавления пользователей в Postgres.'
+        )
     except Exception:
         return HttpResponse(
             'Импорт не выполнен. Ошибка импорта пользователей из бд MSSQL.'
         )
 
     return HttpResponse('Импорт выполнен.')
+
+
+@router.get(
+    'slow_queries/',
+    summary='Последние медленные запросы в БД',
+    response=List[SlowQueryOut],
+    auth=AdminTokenAuth()
+)
+def list_slow_queries(request: HttpRequest, limit: int = 20) -> List[Dict[str, Any]]:
+    '''
+    Метод получения последних медленных запросов в БД с планами выполнения.
+
+    Запросы хранятся в памяти воркера, обработавшего запрос (поле pid).
+    Доступен только с токеном администратора в заголовке X-Admin-Token.
+
+    Аргументы:
+        request (HttpRequest): информация о запросе.
+        limit (int): количество запросов.
+
+    Возвращаемый результат:
+        (list[dict]): список медленных запросов, начиная с последнего.
+
+    Примеры:
+        >>>> list_slow_queries(HttpRequest(), 1)
+        [
+          {
+            "sql": "SELECT ... FROM customers ...",
+            "params": "('%9041%',)",
+            "duration_ms": 1520.4,
+            "captured_at": "2024-01-09T08:38:32.923Z",
+            "pid": 12,
+            "plan": [{"Plan": {"Node Type": "Limit", ...}}]
+          }
+        ]
+    '''
+    return slow_queries.last_plans(limit)
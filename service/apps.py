@@ -1,5 +1,7 @@
 '''Приложение по работе со служебными операциями.'''
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
 
 
 class ServiceConfig(AppConfig):
@@ -7,3 +9,10 @@ class ServiceConfig(AppConfig):
 
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'service'
+
+    def ready(self) -> None:
+        '''Подключение захвата планов медленных запросов (при SLOW_QUERY_MS > 0).'''
+        if settings.SLOW_QUERY_MS > 0:
+            from . import slow_queries
+
+            connection_created.connect(slow_queries.install, dispatch_uid='slow_queries')
@@ -0,0 +1,31 @@
+'''Модуль для авторизации служебных методов API.'''
+from typing import Any, Optional
+
+from django.conf import settings
+from django.http import HttpRequest
+from django.utils.crypto import constant_time_compare
+from ninja.security import APIKeyHeader
+
+
+class AdminTokenAuth(APIKeyHeader):
+    '''Авторизация по токену администратора из заголовка X-Admin-Token.'''
+
+    param_name = 'X-Admin-Token'
+
+    def authenticate(self, request: HttpRequest, key: Optional[str]) -> Optional[Any]:
+        '''
+        Метод проверки токена администратора.
+
+        Если токен (SERVICE_ADMIN_TOKEN) не задан, доступ к методам запрещен.
+
+        Аргументы:
+            request (HttpRequest): информация о запросе.
+            key (str): токен из заголовка запроса.
+
+        Возвращаемый результат:
+            (str | None): токен при успешной проверке, иначе None.
+        '''
+        token = settings.SERVICE_ADMIN_TOKEN
+        if token and key and constant_time_compare(key, token):
+            return key
+        return None
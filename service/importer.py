@@ -0,0 +1,87 @@
+'''Модуль для импорта пользователей из внешнего источника в Postgres.'''
+import time
+
+from customers import validators
+from customers.models import Customers, Firstnames, Phones
+from servicecustomers import metrics
+
+from .sources import ImportSource
+
+# Размер пачки добавления и поиска телефонов
+BATCH_SIZE = 5000
+
+
+class ImportSaveError(Exception):
+    '''Ошибка добавления пользователей в Postgres.'''
+
+
+def run_import(source: ImportSource) -> int:
+    '''
+    Метод импорта пользователей из источника.
+
+    Сохраняет данные в таблицы Phones, Firstnames, Customers. Уже существующие
+    пользователи (по id) пропускаются.
+
+    Аргументы:
+        source (ImportSource): источник данных импорта.
+
+    Возвращаемый результат:
+        (int): количество обработанных записей источника.
+
+    Исключения:
+        ImportSaveError: ошибка добавления пользователей в Postgres.
+        Exception: ошибка получения данных из источника.
+    '''
+    start = time.perf_counter()
+    rows = source.fetch_customers()
+    # Колонки нормализуются целиком: каждое различное значение обрабатывается один раз
+    phones = validators.normalize_phones([row['phone_main'] for row in rows], source=True)
+    rows = [row for row, phone in zip(rows, phones) if phone is not None]
+    numbers = [int(phone) for phone in phones if phone is not None]
+    names = validators.normalize_names([row.get('FirstFIO', '') for row in rows], source=True)
+    emails = validators.normalize_emails([row.get('email_main', '') for row in rows],
+                                         source=True)
+
+    try:
+        # Телефоны добавляются пачкой, уже существующие пропускаются
+        Phones.objects.bulk_create(
+            [Phones(e164=e164) for e164 in numbers],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True
+        )
+    except Exception as exc:
+        raise ImportSaveError from exc
+
+    phone_ids = {}
+    for offset in range(0, len(numbers), BATCH_SIZE):
+        phone_ids.update(
+            Phones.objects.filter(e164__in=numbers[offset:offset + BATCH_SIZE])
+            .values_list('e164', 'id')
+        )
+
+    customers = []
+    for row, e164, name, email in zip(rows, numbers, names, emails):
+        # Имя (FirstFIO добавляем в Firstnames)
+        fio, _ = Firstnames.objects.get_or_create(name=name)
+
+        # Создание instance Customers
+        customers.append(
+            Customers(
+                id=int(row['ID']),
+                phone_id=phone_ids[e164],
+                firstname=fio,
+                email=email,
+                created_at=row.get('created_at_format_datetime')
+            )
+        )
+
+    try:
+        # Добавляем клиентов в бд
+        Customers.objects.bulk_create(customers, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    except Exception as exc:
+        raise ImportSaveError from exc
+
+    # Пропускная способность импорта (строк в секунду) считается по метрикам
+    metrics.IMPORT_ROWS.inc(len(customers))
+    metrics.IMPORT_DURATION.observe(time.perf_counter() - start)
+    return len(customers)
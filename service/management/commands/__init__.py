@@ -0,0 +1 @@
+'''Модуль для команд управления служебными операциями.'''
@@ -0,0 +1,149 @@
+'''Команда сравнения форматов ответа API: JSON и MessagePack.'''
+import json
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+from customers.models import Customers
+from customers.schemas import CustomerOut, CustomerOutExtended
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.test import Client
+from favorites.models import Favorites
+from favorites.schemas import FavoriteOut
+import msgpack
+from ninja.responses import NinjaJSONEncoder
+from servicecustomers.codecs import MSGPACK_MEDIA_TYPE, packb
+
+PAGE_LIMIT = 20
+BATCH_SIZE = 50
+# Заголовок Accept для каждого формата ответа
+ACCEPT = {'json': 'application/json', 'msgpack': MSGPACK_MEDIA_TYPE}
+
+
+class Command(BaseCommand):
+    '''
+    Команда сравнения JSON и MessagePack для основных методов API.
+
+    Замеряет размер, время кодирования и декодирования типовых ответов
+    (get_customer, страница list_customers, get_customers_batch, add_favorite)
+    и время полного запроса к API (тестовый клиент Django, без сети) с каждым форматом.
+
+    Примеры:
+        >>>> python manage.py bench_codecs --repeat 2000 --output bench_codecs.json
+    '''
+
+    help = 'Сравнение форматов ответа API (JSON и MessagePack): размер и время.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        '''Аргументы команды.'''
+        parser.add_argument('--repeat', type=int, default=2000,
+                            help='Количество повторов кодирования и декодирования.')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Количество запросов к API для каждого метода и формата.')
+        parser.add_argument('--output', default='bench_codecs.json', help='Файл отчета (JSON).')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        '''Запуск замера.'''
+        customers = list(
+            Customers.objects.filter(deleted_at=None).select_related(
+                'phone', 'firstname', 'lastname'
+            ).order_by('id')[:BATCH_SIZE]
+        )
+        favorite = Favorites.objects.first()
+        if not customers or favorite is None:
+            raise CommandError('Нет данных. Сгенерируйте данные: manage.py generate_data')
+
+        payloads = {
+            'get_customer': CustomerOut.from_orm(customers[0]).dict(),
+            'list_customers': {
+                'items': [
+                    CustomerOutExtended.from_orm(customer).dict()
+                    for customer in customers[:PAGE_LIMIT]
+                ],
+                'count': PAGE_LIMIT,
+            },
+            'get_customers_batch': {
+                customer.id: CustomerOut.from_orm(customer).dict() for customer in customers
+            },
+            'add_favorite': FavoriteOut.from_orm(favorite).dict(),
+        }
+        report: Dict[str, Any] = {
+            'codecs': {
+                name: self._codecs(payload, options['repeat'])
+                for name, payload in payloads.items()
+            },
+            'api': self._api(customers, options['requests']),
+        }
+        with open(options['output'], 'w') as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+
+        self._print(report)
+        self.stdout.write(self.style.SUCCESS(f'Отчет сохранен в {options["output"]}'))
+
+    def _codecs(self, payload: Any, repeat: int) -> Dict[str, Any]:
+        '''Метод замера кодирования и декодирования ответа (JSON - как в ninja).'''
+        json_body = json.dumps(payload, cls=NinjaJSONEncoder).encode()
+        msgpack_body = packb(payload)
+        return {
+            'json': {
+                'bytes': len(json_body),
+                'encode_us': self._time(
+                    lambda: json.dumps(payload, cls=NinjaJSONEncoder).encode(), repeat
+                ),
+                'decode_us': self._time(lambda: json.loads(json_body), repeat),
+            },
+            'msgpack': {
+                'bytes': len(msgpack_body),
+                'encode_us': self._time(lambda: packb(payload), repeat),
+                'decode_us': self._time(
+                    lambda: msgpack.unpackb(msgpack_body, strict_map_key=False), repeat
+                ),
+            },
+        }
+
+    def _api(self, customers: List[Customers], requests: int) -> Dict[str, Any]:
+        '''Метод замера полного запроса к API с каждым форматом.'''
+        client = Client()
+        ids = [customer.id for customer in customers]
+        calls: Dict[str, Callable[[str], Any]] = {
+            'get_customer': lambda accept: client.get(
+                f'/rest/v1/customers/{ids[0]}/', HTTP_ACCEPT=accept
+            ),
+            'get_customers_batch': lambda accept: client.post(
+                '/rest/v1/customers/batch', json.dumps({'id': ids}),
+                content_type='application/json', HTTP_ACCEPT=accept
+            ),
+        }
+        result = {}
+        for name, call in calls.items():
+            result[name] = {
+                codec: self._time(lambda: call(accept), requests)
+                for codec, accept in ACCEPT.items()
+            }
+        return result
+
+    @staticmethod
+    def _time(function: Callable[[], Any], repeat: int) -> float:
+        '''Метод замера медианного времени вызова в микросекундах.'''
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            latencies.append(time.perf_counter() - start)
+        return round(statistics.median(latencies) * 10 ** 6, 1)
+
+    def _print(self, report: Dict[str, Any]) -> None:
+        '''Метод вывода сводной таблицы.'''
+        line = '{:<22} {:>10} {:>10} {:>12} {:>12} {:>12} {:>12}'
+        self.stdout.write(line.format('ответ', 'json, Б', 'msgp, Б', 'json enc, мкс',
+                                      'msgp enc, мкс', 'json dec, мкс', 'msgp dec, мкс'))
+        for name, stats in report['codecs'].items():
+            self.stdout.write(line.format(
+                name, stats['json']['bytes'], stats['msgpack']['bytes'],
+                stats['json']['encode_us'], stats['msgpack']['encode_us'],
+                stats['json']['decode_us'], stats['msgpack']['decode_us']
+            ))
+        for name, stats in report['api'].items():
+            self.stdout.write(
+                f'API {name}: json {stats["json"]} мкс, msgpack {stats["msgpack"]} мкс'
+            )
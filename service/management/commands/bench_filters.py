@@ -0,0 +1,152 @@
+'''Команда замера фильтров списка пользователей с индексами и без них.'''
+import datetime
+import json
+import statistics
+import time
+from typing import Any, Dict, List, Set
+
+from customers.models import Customers
+from customers.schemas import CustomerFilter
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connection, transaction
+from django.db.models import QuerySet
+
+PAGE_LIMIT = 20
+# Индексы, которые не относятся к фильтрам (первичный ключ, очистка удаленных)
+SERVICE_INDEXES = ('customers_live_idx', 'customers_deleted_idx')
+
+
+def _cases() -> Dict[str, Dict[str, Any]]:
+    '''Метод получения типовых наборов фильтров (параметры запроса list_customers).'''
+    today = datetime.date.today()
+    return {
+        'gender': {'gender': 'F'},
+        'city': {'city_id': [7]},
+        'city_gender': {'city_id': [3, 4], 'gender': 'M'},
+        'birthday_range': {'birthday_min': '1990-01-01', 'birthday_max': '1990-03-31'},
+        'birthday_next_7d': {'birthday_next_days': 7},
+        'created_last_30d': {'created_at_min': today - datetime.timedelta(days=30)},
+        'created_range': {
+            'created_at_min': today - datetime.timedelta(days=400),
+            'created_at_max': today - datetime.timedelta(days=380),
+        },
+        'last_auth_7d': {'last_auth_at_min': today - datetime.timedelta(days=7)},
+        'city_last_auth_30d': {
+            'city_id': [1],
+            'last_auth_at_min': today - datetime.timedelta(days=30),
+        },
+    }
+
+
+class _WithoutIndexes(Exception):
+    '''Исключение для отката транзакции замера без индексов.'''
+
+
+class Command(BaseCommand):
+    '''
+    Команда замера типовых фильтров списка пользователей (CustomerFilter).
+
+    Для каждого набора фильтров выполняет запросы метода list_customers (count и страница
+    из 20 записей), сохраняет план выполнения (узлы и индексы) и задержки p50/p95.
+    Замер повторяется без индексов фильтров: индексы удаляются в транзакции,
+    которая затем откатывается.
+
+    Примеры:
+        >>>> python manage.py bench_filters --repeat 20 --output bench_filters.json
+    '''
+
+    help = 'Замер фильтров списка пользователей: планы и задержки с индексами и без них.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        '''Аргументы команды.'''
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Количество повторов каждого запроса.')
+        parser.add_argument('--output', default='bench_filters.json', help='Файл отчета (JSON).')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        '''Запуск замера.'''
+        cases = _cases()
+        report: Dict[str, Any] = {'indexed': self._measure(cases, options['repeat'])}
+
+        indexes = [
+            index.name for index in Customers._meta.indexes
+            if index.name not in SERVICE_INDEXES
+        ]
+        try:
+            # DROP INDEX блокирует таблицу до конца транзакции: только для локальной БД
+            with transaction.atomic(), connection.cursor() as cursor:
+                for name in indexes:
+                    cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+                report['without_indexes'] = self._measure(cases, options['repeat'])
+                raise _WithoutIndexes
+        except _WithoutIndexes:
+            pass
+
+        report['dropped_indexes'] = indexes
+        with open(options['output'], 'w') as file:
+            json.dump(report, file, indent=2, ensure_ascii=False, default=str)
+
+        self._print(report)
+        self.stdout.write(self.style.SUCCESS(f'Отчет сохранен в {options["output"]}'))
+
+    def _measure(self, cases: Dict[str, Dict[str, Any]], repeat: int) -> Dict[str, Any]:
+        '''Метод замера наборов фильтров.'''
+        result = {}
+        for name, params in cases.items():
+            queryset = CustomerFilter(**params).filter(
+                Customers.objects.filter(deleted_at=None).select_related(
+                    'phone', 'firstname', 'lastname'
+                )
+            )
+            page = queryset[:PAGE_LIMIT]
+            latencies = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                queryset.count()
+                list(page)
+                latencies.append((time.perf_counter() - start) * 1000)
+            latencies.sort()
+            result[name] = {
+                'params': params,
+                'p50_ms': round(statistics.median(latencies), 2),
+                'p95_ms': round(latencies[max(0, int(len(latencies) * 0.95) - 1)], 2),
+                'count_plan': self._plan(queryset.order_by()),
+                'page_plan': self._plan(page),
+            }
+        return result
+
+    @staticmethod
+    def _plan(queryset: QuerySet) -> Dict[str, Any]:
+        '''Метод получения узлов плана и используемых индексов.'''
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        nodes: List[str] = []
+        indexes: Set[str] = set()
+        stack = [plan[0]['Plan']]
+        while stack:
+            node = stack.pop()
+            nodes.append(node['Node Type'])
+            if 'Index Name' in node:
+                indexes.add(node['Index Name'])
+            stack.extend(node.get('Plans', []))
+        return {
+            'nodes': nodes,
+            'indexes': sorted(indexes),
+            'total_cost': plan[0]['Plan']['Total Cost'],
+        }
+
+    def _print(self, report: Dict[str, Any]) -> None:
+        '''Метод вывода сводной таблицы.'''
+        line = '{:<20} {:>12} {:>12}  {}'
+        self.stdout.write(line.format('фильтр', 'без, p50 мс', 'с, p50 мс', 'индексы'))
+        for name, stats in report['indexed'].items():
+            baseline = report['without_indexes'][name]
+            indexes = sorted(set(stats['count_plan']['indexes'] + stats['page_plan']['indexes']))
+            self.stdout.write(line.format(
+                name, baseline['p50_ms'], stats['p50_ms'], ', '.join(indexes) or '-'
+            ))
@@ -0,0 +1,150 @@
+'''Команда замера производительности импорта пользователей.'''
+from contextlib import ExitStack
+import json
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+from customers.models import Customers, Phones
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from service import importer, sources
+
+from .generate_import_source import FIRST_ID
+
+
+class Command(BaseCommand):
+    '''
+    Команда замера импорта на нескольких объемах данных локального источника.
+
+    Для каждого объема генерирует "грязные" данные ZkzClients и запускает импорт
+    в отдельном процессе. После замера удаляются только созданные им пользователи
+    и телефоны (которых не было до импорта), поэтому запуск требует подтверждения --force.
+    Отчет содержит строки в секунду, пиковый RSS и количество запросов в БД.
+
+    Примеры:
+        >>>> IMPORT_SOURCE=sqlite python manage.py bench_import --scales 10000,100000 --force
+    '''
+
+    help = 'Замер импорта пользователей (строк/с, пиковый RSS, запросы в БД) в JSON.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        '''Аргументы команды.'''
+        parser.add_argument('--scales', default='1000,10000,100000',
+                            help='Объемы источника (записей) через запятую.')
+        parser.add_argument('--duplicates', type=float, default=0.2,
+                            help='Доля записей с уже встречавшимся телефоном.')
+        parser.add_argument('--seed', type=int, default=1,
+                            help='Начальное значение генератора случайных чисел.')
+        parser.add_argument('--output', default='bench_import.json', help='Файл отчета (JSON).')
+        parser.add_argument('--force', action='store_true',
+                            help='Подтверждение удаления созданных замером пользователей '
+                                 'и пересоздания ZkzClients в БД сервиса (postgres).')
+        parser.add_argument('--run-once', action='store_true',
+                            help='Служебный режим: один импорт с выводом результата в JSON.')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        '''Запуск замеров.'''
+        if settings.IMPORT_SOURCE == 'mssql':
+            raise CommandError('Укажите локальный источник импорта: IMPORT_SOURCE=sqlite|postgres')
+
+        if options['run_once']:
+            self.stdout.write(json.dumps(self._run_once()))
+            return
+        if not options['force']:
+            raise CommandError(
+                'Замер добавляет и удаляет пользователей в БД сервиса. '
+                'Для подтверждения укажите --force'
+            )
+
+        results = []
+        for scale in [int(scale) for scale in options['scales'].split(',')]:
+            call_command(
+                'generate_import_source', rows=scale, duplicates=options['duplicates'],
+                seed=options['seed'], force=options['force'], stdout=self.stdout
+            )
+            existing, last_phone_id = self._snapshot()
+            try:
+                # Отдельный процесс - для честного замера пикового RSS
+                process = subprocess.run(
+                    [sys.executable, sys.argv[0], 'bench_import', '--run-once'],
+                    check=True, capture_output=True, text=True
+                )
+            finally:
+                # Созданные замером пользователи удаляются и при ошибке импорта
+                self._cleanup(self._created(existing), last_phone_id)
+            result = {'scale': scale, **json.loads(process.stdout.strip().splitlines()[-1])}
+            results.append(result)
+            self.stdout.write(
+                f'{scale}: {result["rows_per_s"]} строк/с, {result["peak_rss_mb"]} МБ, '
+                f'запросов: {result["queries"]}'
+            )
+
+        with open(options['output'], 'w') as file:
+            json.dump({
+                'source': settings.IMPORT_SOURCE,
+                'dedup': settings.IMPORT_DEDUP,
+                'results': results,
+            }, file, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Отчет сохранен в {options["output"]}'))
+
+    @staticmethod
+    def _snapshot() -> Tuple[Set[int], int]:
+        '''Метод получения id пользователей с id источника и последнего id телефона до импорта.'''
+        existing = set(Customers.objects.filter(id__gte=FIRST_ID).values_list('id', flat=True))
+        last_phone_id = Phones.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+        return existing, last_phone_id
+
+    @staticmethod
+    def _created(existing: Set[int]) -> List[int]:
+        '''Метод получения id пользователей, созданных импортом (которых не было в existing).'''
+        ids = Customers.objects.filter(id__gte=FIRST_ID).values_list('id', flat=True)
+        return sorted(set(ids) - existing)
+
+    @staticmethod
+    def _cleanup(customer_ids: List[int], last_phone_id: int) -> None:
+        '''Метод удаления пользователей, созданных замером, и добавленных им телефонов.'''
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute('DELETE FROM favorites WHERE customer_id = ANY(%s)', [customer_ids])
+            cursor.execute("""
+                WITH deleted AS (DELETE FROM customers WHERE id = ANY(%s) RETURNING phone_id)
+                DELETE FROM phones WHERE id > %s AND id IN (SELECT phone_id FROM deleted)
+            """, [customer_ids, last_phone_id])
+
+    @staticmethod
+    def _run_once() -> Dict[str, Any]:
+        '''Метод однократного импорта с подсчетом запросов в БД.'''
+        source_alias = sources.SOURCE_DATABASES[settings.IMPORT_SOURCE]
+        queries: Dict[str, int] = {'default': 0, 'source': 0}
+
+        def counter(key: str) -> Callable[..., Any]:
+            def wrapper(execute: Callable[..., Any], sql: str, params: Any, many: bool,
+                        context: Dict[str, Any]) -> Any:
+                queries[key] += 1
+                return execute(sql, params, many, context)
+            return wrapper
+
+        with ExitStack() as stack:
+            stack.enter_context(connections['default'].execute_wrapper(counter('default')))
+            if source_alias != 'default':
+                stack.enter_context(
+                    connections[source_alias].execute_wrapper(counter('source'))
+                )
+
+            start = time.perf_counter()
+            rows = importer.run_import(sources.get_source())
+            elapsed = time.perf_counter() - start
+
+        return {
+            'source_rows': rows,
+            'elapsed_s': round(elapsed, 3),
+            'rows_per_s': round(rows / elapsed, 1) if elapsed else None,
+            # ru_maxrss в Linux - в килобайтах
+            'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            'queries': queries,
+        }
@@ -0,0 +1,311 @@
+'''Команда нагрузочного тестирования API.'''
+from collections import Counter, defaultdict
+import datetime
+import http.client
+import json
+import math
+import random
+import threading
+import time
+from typing import Any, DefaultDict, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from customers.models import Customers
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db.models import Max, Min
+
+OPERATIONS = (
+    'list_customers', 'get_customer', 'create_customer', 'update_phone',
+    'add_favorite', 'list_favorites', 'delete_favorite',
+)
+# Доля операций по умолчанию (в процентах)
+DEFAULT_MIX = (
+    'list_customers=25,get_customer=30,create_customer=5,update_phone=5,'
+    'add_favorite=15,list_favorites=15,delete_favorite=5'
+)
+# Количество товаров в синтетических данных (generate_data)
+ITEMS_COUNT = 50000
+PAGE_LIMIT = 20
+
+# Запрос: метод, путь, тело
+Request = Tuple[str, str, Optional[Dict[str, Any]]]
+
+
+class _Worker(threading.Thread):
+    '''Поток, выполняющий случайные операции API до истечения времени теста.'''
+
+    def __init__(self, command: 'Command', seed: int) -> None:
+        '''Инициализация потока.'''
+        super().__init__(daemon=True)
+        self.command = command
+        self.rnd = random.Random(seed)
+        self.latencies: DefaultDict[str, List[float]] = defaultdict(list)
+        self.statuses: DefaultDict[str, Counter] = defaultdict(Counter)
+        # Созданные потоком объекты (для изменения телефона и удаления избранного)
+        self.customer_ids: List[int] = []
+        self.favorite_ids: List[int] = []
+        self.connection: Optional[http.client.HTTPConnection] = None
+
+    def run(self) -> None:
+        '''Выполнение операций.'''
+        command = self.command
+        operations = list(command.mix)
+        weights = list(command.mix.values())
+        while time.monotonic() < command.stop_at:
+            operation = self.rnd.choices(operations, weights)[0]
+            method, path, body = getattr(self, operation)()
+            start = time.perf_counter()
+            status, data = self._send(method, path, body)
+            self.latencies[operation].append(time.perf_counter() - start)
+            self.statuses[operation][status] += 1
+            if status == 200:
+                self._remember(operation, data)
+
+    def _send(
+            self,
+            method: str,
+            path: str,
+            body: Optional[Dict[str, Any]]
+    ) -> Tuple[int, Any]:
+        '''Метод отправки запроса через постоянное соединение (keep-alive).'''
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(
+                self.command.host, self.command.port, timeout=30
+            )
+        headers = {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        try:
+            self.connection.request(method, path, payload, headers)
+            response = self.connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            return 0, None
+        try:
+            return response.status, json.loads(content)
+        except ValueError:
+            return response.status, None
+
+    def _remember(self, operation: str, data: Any) -> None:
+        '''Метод сохранения id созданных объектов.'''
+        if operation == 'create_customer' and isinstance(data, dict):
+            self.customer_ids.append(data['id'])
+        elif operation == 'add_favorite' and isinstance(data, dict):
+            self.favorite_ids.append(data['id'])
+
+    def _customer_id(self) -> int:
+        '''Метод выбора случайного id пользователя.'''
+        return self.rnd.randint(self.command.min_id, self.command.max_id)
+
+    def _new_phone(self) -> str:
+        '''Метод генерации номера вне диапазона синтетических данных (9xx).'''
+        return f'78{self.rnd.randint(0, 999999999):09d}'
+
+    def list_customers(self) -> Request:
+        '''Список пользователей со случайным набором фильтров.'''
+        rnd = self.rnd
+        today = datetime.date.today()
+        filters: List[Dict[str, Any]] = [
+            {},
+            {'gender': rnd.choice(('M', 'F'))},
+            {'city_id': rnd.randint(1, 10)},
+            {'city_id': rnd.randint(1, 60), 'gender': rnd.choice(('M', 'F'))},
+            {
+                'birthday_min': f'{rnd.randint(1950, 2000)}-01-01',
+                'birthday_max': f'{rnd.randint(2001, 2006)}-12-31',
+            },
+            {'created_at_min': (today - datetime.timedelta(days=rnd.randint(1, 60))).isoformat()},
+            {'last_auth_at_min': (today - datetime.timedelta(days=rnd.randint(1, 7))).isoformat()},
+            {'firstname': rnd.choice(('Ан', 'Ал', 'Ма', 'Ива'))},
+            {'phone': f'{rnd.randint(900, 999)}'},
+            {'id': [self._customer_id() for _ in range(5)]},
+        ]
+        params = {'limit': PAGE_LIMIT, **rnd.choice(filters)}
+        return 'GET', f'/rest/v1/customers/?{urlencode(params, doseq=True)}', None
+
+    def get_customer(self) -> Request:
+        '''Просмотр пользователя.'''
+        return 'GET', f'/rest/v1/customers/{self._customer_id()}/', None
+
+    def create_customer(self) -> Request:
+        '''Создание пользователя.'''
+        body = {
+            'phone': self._new_phone(),
+            'firstname': 'Нагрузка',
+            'email': f'bench{self.rnd.randint(0, 10 ** 9)}@example.com',
+            'gender': self.rnd.choice(('M', 'F')),
+            'city_id': self.rnd.randint(1, 60),
+        }
+        return 'POST', '/rest/v1/customers/', body
+
+    def update_phone(self) -> Request:
+        '''Изменение телефона (созданных потоком пользователей).'''
+        if self.customer_ids:
+            customer_id = self.rnd.choice(self.customer_ids)
+        else:
+            customer_id = self._customer_id()
+        return 'PATCH', f'/rest/v1/customers/{customer_id}/phone', {'phone': self._new_phone()}
+
+    def add_favorite(self) -> Request:
+        '''Добавление избранного товара.'''
+        body = {'customer_id': self._customer_id(), 'item_id': self.rnd.randint(1, ITEMS_COUNT)}
+        return 'POST', '/rest/v1/favorites/', body
+
+    def list_favorites(self) -> Request:
+        '''Список избранных товаров пользователя.'''
+        params = {'limit': PAGE_LIMIT, 'customer_id': self._customer_id()}
+        return 'GET', f'/rest/v1/favorites/?{urlencode(params)}', None
+
+    def delete_favorite(self) -> Request:
+        '''Удаление избранного товара (добавленного потоком).'''
+        if self.favorite_ids:
+            favorite_id = self.favorite_ids.pop()
+        else:
+            favorite_id = self.rnd.randint(1, 10 ** 6)
+        return 'DELETE', '/rest/v1/favorites/', {'id': [favorite_id]}
+
+
+class Command(BaseCommand):
+    '''
+    Команда нагрузочного тестирования API.
+
+    Параллельно выполняет операции list_customers (с разными фильтрами), get_customer,
+    create_customer, update_phone, add_favorite, list_favorites и delete_favorite
+    против запущенного сервиса и сохраняет пропускную способность и перцентили
+    p50/p95/p99 по каждому методу в JSON-файл.
+
+    Примеры:
+        >>>> python manage.py bench_load --url http://127.0.0.1:8000 --duration 60
+    '''
+
+    help = 'Нагрузочное тестирование API с отчетом по методам в JSON.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        '''Аргументы команды.'''
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Адрес сервиса.')
+        parser.add_argument('--duration', type=float, default=60, help='Длительность в секундах.')
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help='Количество параллельных клиентов.')
+        parser.add_argument('--mix', default=DEFAULT_MIX,
+                            help='Доли операций: name=weight через запятую.')
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Начальное значение генератора случайных чисел.')
+        parser.add_argument('--output', default='bench_load.json', help='Файл отчета (JSON).')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        '''Запуск нагрузочного теста.'''
+        url = urlsplit(options['url'])
+        self.host = url.hostname or '127.0.0.1'
+        self.port = url.port or 80
+        self.mix = self._parse_mix(options['mix'])
+
+        ids = Customers.objects.aggregate(min_id=Min('id'), max_id=Max('id'))
+        if ids['min_id'] is None:
+            raise CommandError('Нет пользователей. Сгенерируйте данные: manage.py generate_data')
+        self.min_id, self.max_id = ids['min_id'], ids['max_id']
+
+        rnd = random.Random(options['seed'])
+        workers = [_Worker(self, rnd.randrange(2 ** 32)) for _ in range(options['concurrency'])]
+        started_at = datetime.datetime.now(datetime.timezone.utc)
+        start = time.monotonic()
+        self.stop_at = start + options['duration']
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.monotonic() - start
+
+        report = self._report(workers, elapsed)
+        report.update({
+            'started_at': started_at.isoformat(),
+            'url': options['url'],
+            'duration_s': round(elapsed, 3),
+            'concurrency': options['concurrency'],
+            'mix': self.mix,
+        })
+        with open(options['output'], 'w') as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+
+        self._print(report)
+        self.stdout.write(self.style.SUCCESS(f'Отчет сохранен в {options["output"]}'))
+
+    @staticmethod
+    def _parse_mix(mix: str) -> Dict[str, float]:
+        '''Метод разбора долей операций.'''
+        result = {}
+        for part in mix.split(','):
+            name, _, weight = part.partition('=')
+            name = name.strip()
+            if name not in OPERATIONS:
+                raise CommandError(f'Неизвестная операция: {name}')
+            result[name] = float(weight or 1)
+        return result
+
+    def _report(self, workers: List[_Worker], elapsed: float) -> Dict[str, Any]:
+        '''Метод расчета показателей по методам.'''
+        endpoints = {}
+        all_latencies: List[float] = []
+        total_errors = 0
+        for operation in self.mix:
+            latencies = sorted(
+                latency for worker in workers for latency in worker.latencies[operation]
+            )
+            statuses: Counter = Counter()
+            for worker in workers:
+                statuses.update(worker.statuses[operation])
+            # Ошибки - сбои соединения и ответы 5xx (4xx - ожидаемые ответы, например 404)
+            errors = sum(count for status, count in statuses.items() if not 0 < status < 500)
+            total_errors += errors
+            all_latencies.extend(latencies)
+            endpoints[operation] = {
+                'requests': len(latencies),
+                'errors': errors,
+                'rps': round(len(latencies) / elapsed, 2),
+                **self._percentiles(latencies),
+                'statuses': {str(status): count for status, count in sorted(statuses.items())},
+            }
+
+        all_latencies.sort()
+        total = {
+            'requests': len(all_latencies),
+            'errors': total_errors,
+            'rps': round(len(all_latencies) / elapsed, 2),
+            **self._percentiles(all_latencies),
+        }
+        return {'total': total, 'endpoints': endpoints}
+
+    @staticmethod
+    def _percentiles(latencies: List[float]) -> Dict[str, Optional[float]]:
+        '''Метод расчета перцентилей (nearest-rank) по отсортированным задержкам.'''
+        def percentile(value: float) -> Optional[float]:
+            if not latencies:
+                return None
+            index = max(0, math.ceil(value * len(latencies)) - 1)
+            return round(latencies[index] * 1000, 2)
+
+        mean = round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None
+        return {
+            'mean_ms': mean,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'max_ms': percentile(1),
+        }
+
+    def _print(self, report: Dict[str, Any]) -> None:
+        '''Метод вывода сводной таблицы.'''
+        line = '{:<18} {:>9} {:>7} {:>9} {:>9} {:>9} {:>9}'
+        self.stdout.write(line.format('метод', 'запросов', 'ошибок', 'rps', 'p50, мс',
+                                      'p95, мс', 'p99, мс'))
+        rows: List[Tuple[str, Dict[str, Any]]] = list(report['endpoints'].items())
+        rows.append(('total', report['total']))
+        for name, stats in rows:
+            self.stdout.write(line.format(
+                name, stats['requests'], stats['errors'], stats['rps'],
+                *(stats[key] if stats[key] is not None else '-'
+                  for key in ('p50_ms', 'p95_ms', 'p99_ms'))
+            ))
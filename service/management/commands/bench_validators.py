@@ -0,0 +1,146 @@
+'''Команда замера проверки данных пользователей: по строкам и по колонкам.'''
+import json
+import random
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+from customers import validators
+from customers.schemas import CustomerIn
+from django.core.management.base import BaseCommand, CommandParser
+from pydantic.networks import validate_email
+
+from .generate_data import EMAIL_DOMAINS, FEMALE_FIRSTNAMES, LASTNAMES, MALE_FIRSTNAMES
+
+# Доля строк с ошибкой (цифры в имени, короткий телефон, почта без домена)
+INVALID_SHARE = 0.05
+
+
+def _rows(count: int, seed: int) -> List[Dict[str, str]]:
+    '''Метод генерации строк пользователей в формате запроса создания (CustomerIn).'''
+    rnd = random.Random(seed)
+    rows = []
+    for number in range(count):
+        firstname = rnd.choice(MALE_FIRSTNAMES + FEMALE_FIRSTNAMES).lower()
+        lastname = rnd.choice(LASTNAMES).lower()
+        phone = f'8{rnd.randrange(9000000000, 10 ** 10)}'
+        email = f'User{number}@{rnd.choice(EMAIL_DOMAINS).upper()}'
+        if rnd.random() < INVALID_SHARE:
+            firstname, phone, email = firstname + '1', phone[:5], f'user{number}'
+        rows.append({'phone': phone, 'firstname': firstname, 'lastname': lastname,
+                     'email': email})
+    return rows
+
+
+def _check_row_pydantic(row: Dict[str, str]) -> None:
+    '''Метод проверки строки с почтой через pydantic EmailStr (без быстрой проверки).'''
+    for check, field in ((validators.normalize_phone, 'phone'),
+                         (validators.normalize_name, 'firstname'),
+                         (validators.normalize_name, 'lastname'),
+                         (lambda email: validate_email(email)[1], 'email')):
+        try:
+            check(row[field])
+        except ValueError:
+            pass
+
+
+def _check_row(row: Dict[str, str]) -> None:
+    '''Метод проверки строки функциями модуля validators.'''
+    for check, field in ((validators.normalize_phone, 'phone'),
+                         (validators.normalize_name, 'firstname'),
+                         (validators.normalize_name, 'lastname'),
+                         (validators.normalize_email, 'email')):
+        try:
+            check(row[field])
+        except ValueError:
+            pass
+
+
+def _check_schema(row: Dict[str, str]) -> None:
+    '''Метод проверки строки схемой запроса создания пользователя.'''
+    try:
+        CustomerIn(**row)
+    except ValueError:
+        pass
+
+
+class Command(BaseCommand):
+    '''
+    Команда замера проверки и нормализации телефонов, имен и почты.
+
+    Сравнивает для одних и тех же строк: проверку по строкам с почтой через pydantic
+    EmailStr, проверку по строкам функциями validators (быстрая проверка почты),
+    проверку колонками (normalize_phones, normalize_names, normalize_emails)
+    и полную проверку схемой CustomerIn.
+
+    Примеры:
+        >>>> python manage.py bench_validators --rows 100000 --repeat 5
+    '''
+
+    help = 'Замер проверки данных пользователей: по строкам (pydantic, validators) и колонкам.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        '''Аргументы команды.'''
+        parser.add_argument('--rows', type=int, default=100000, help='Количество строк.')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Количество повторов каждого замера.')
+        parser.add_argument('--seed', type=int, default=1, help='Зерно генератора данных.')
+        parser.add_argument('--output', default='bench_validators.json',
+                            help='Файл отчета (JSON).')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        '''Запуск замера.'''
+        rows = _rows(options['rows'], options['seed'])
+        cases: Dict[str, Callable[[], Any]] = {
+            'rows_pydantic': lambda: self._check_rows(_check_row_pydantic, rows),
+            'rows': lambda: self._check_rows(_check_row, rows),
+            'columns': lambda: self._check_columns(rows),
+            'schema': lambda: self._check_rows(_check_schema, rows),
+        }
+        seconds = {
+            name: self._time(case, options['repeat']) for name, case in cases.items()
+        }
+        report: Dict[str, Any] = {
+            'rows': len(rows),
+            'cases': {
+                name: {
+                    'seconds': round(value, 4),
+                    'rows_per_second': round(len(rows) / value),
+                    'speedup': round(seconds['rows_pydantic'] / value, 2),
+                }
+                for name, value in seconds.items()
+            },
+        }
+        with open(options['output'], 'w') as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+
+        for name, stats in report['cases'].items():
+            self.stdout.write(
+                f'{name:<14} {stats["seconds"]:>8} с {stats["rows_per_second"]:>10} строк/с '
+                f'x{stats["speedup"]}'
+            )
+        self.stdout.write(self.style.SUCCESS(f'Отчет сохранен в {options["output"]}'))
+
+    @staticmethod
+    def _check_rows(check: Callable[[Dict[str, str]], None], rows: List[Dict[str, str]]) -> None:
+        '''Метод проверки строк по одной.'''
+        for row in rows:
+            check(row)
+
+    @staticmethod
+    def _check_columns(rows: List[Dict[str, str]]) -> None:
+        '''Метод проверки колонок строк.'''
+        validators.normalize_phones([row['phone'] for row in rows])
+        validators.normalize_names([row['firstname'] for row in rows])
+        validators.normalize_names([row['lastname'] for row in rows])
+        validators.normalize_emails([row['email'] for row in rows])
+
+    @staticmethod
+    def _time(function: Callable[[], Any], repeat: int) -> float:
+        '''Метод замера медианного времени вызова в секундах.'''
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            durations.append(time.perf_counter() - start)
+        return statistics.median(durations)
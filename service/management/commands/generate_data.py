@@ -0,0 +1,234 @@
+'''Команда генерации синтетических данных для нагрузочного тестирования.'''
+import datetime
+import random
+import time
+from typing import Any, Dict, Iterator, List, Tuple
+
+from customers.models import Customers, Firstnames, Lastnames, Phones
+from django.core.management.base import BaseCommand, CommandParser
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+MALE_FIRSTNAMES = (
+    'Александр', 'Алексей', 'Андрей', 'Антон', 'Артем', 'Василий', 'Виктор', 'Владимир',
+    'Дмитрий', 'Евгений', 'Иван', 'Игорь', 'Илья', 'Кирилл', 'Константин', 'Максим',
+    'Михаил', 'Никита', 'Николай', 'Олег', 'Павел', 'Роман', 'Сергей', 'Юрий',
+)
+FEMALE_FIRSTNAMES = (
+    'Александра', 'Алина', 'Анастасия', 'Анна', 'Валентина', 'Виктория', 'Галина',
+    'Дарья', 'Екатерина', 'Елена', 'Ирина', 'Ксения', 'Людмила', 'Марина', 'Мария',
+    'Наталья', 'Ольга', 'Полина', 'Светлана', 'Софья', 'Татьяна', 'Юлия',
+)
+LASTNAMES = (
+    'Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов', 'Михайлов',
+    'Новиков', 'Федоров', 'Морозов', 'Волков', 'Алексеев', 'Лебедев', 'Семенов', 'Егоров',
+    'Павлов', 'Козлов', 'Степанов', 'Николаев', 'Орлов', 'Андреев', 'Макаров', 'Никитин',
+)
+EMAIL_DOMAINS = ('mail.ru', 'yandex.ru', 'gmail.com', 'bk.ru', 'inbox.ru', 'list.ru')
+# Множитель, взаимно простой с 10^9: дает уникальные номера для уникальных id телефонов
+PHONE_MULTIPLIER = 387420489
+# Количество городов и товаров в синтетических данных
+CITIES_COUNT = 60
+ITEMS_COUNT = 50000
+# Период регистрации пользователей
+SIGNUP_PERIOD_DAYS = 5 * 365
+
+
+class Command(BaseCommand):
+    '''
+    Команда генерации синтетических пользователей, телефонов и избранных товаров.
+
+    Данные загружаются через COPY, идентификаторы продолжают уже существующие.
+    Телефоны загружаются через временную таблицу: номера, которые уже заняты,
+    заменяются свободными, поэтому команду можно запускать повторно.
+
+    Примеры:
+        >>>> python manage.py generate_data --customers 1000000 --favorites 10000000
+    '''
+
+    help = 'Генерация синтетических данных для нагрузочного тестирования (через COPY).'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        '''Аргументы команды.'''
+        parser.add_argument('--customers', type=int, default=100000,
+                            help='Количество пользователей (с телефонами).')
+        parser.add_argument('--favorites', type=int, default=1000000,
+                            help='Количество избранных товаров.')
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Начальное значение генератора случайных чисел.')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        '''Генерация данных.'''
+        rnd = random.Random(options['seed'])
+        start = time.perf_counter()
+
+        with transaction.atomic():
+            firstnames = self._names(Firstnames, MALE_FIRSTNAMES + FEMALE_FIRSTNAMES)
+            lastnames = self._names(
+                Lastnames, LASTNAMES + tuple(f'{name}а' for name in LASTNAMES)
+            )
+
+            first_phone_id = (Phones.objects.aggregate(max_id=Max('id'))['max_id'] or 0) + 1
+            first_customer_id = (
+                Customers.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+            ) + 1
+
+            customers_count = options['customers']
+            self._load_phones(first_phone_id, customers_count)
+            self._copy(
+                'COPY customers (id, email, phone_id, firstname_id, lastname_id, birthday, '
+                'gender, city_id, created_at, last_auth_at) FROM STDIN',
+                self._customers(
+                    rnd, first_customer_id, first_phone_id, customers_count,
+                    firstnames, lastnames
+                )
+            )
+            self.stdout.write(f'Пользователи: {customers_count}')
+
+            self._copy(
+                'COPY favorites (customer_id, item_id, created_at) FROM STDIN',
+                self._favorites(rnd, first_customer_id, customers_count, options['favorites'])
+            )
+            self.stdout.write(f'Избранные товары: {options["favorites"]}')
+
+            # Последовательности id после загрузки с явными id
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), [Phones]):
+                    cursor.execute(sql)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE phones, customers, favorites')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные сгенерированы за {time.perf_counter() - start:.1f} с'
+        ))
+
+    @staticmethod
+    def _names(model: Any, names: Tuple[str, ...]) -> Dict[str, int]:
+        '''Метод получения id имен (фамилий) с добавлением отсутствующих.'''
+        result = {}
+        for name in names:
+            instance = model.objects.filter(name=name).first()
+            if instance is None:
+                instance = model.objects.create(name=name)
+            result[name] = instance.id
+        return result
+
+    @staticmethod
+    def _copy(sql: str, rows: Iterator[Tuple[Any, ...]]) -> None:
+        '''Метод загрузки строк в таблицу через COPY.'''
+        with connection.cursor() as cursor:
+            with cursor.cursor.copy(sql) as copy:
+                for row in rows:
+                    copy.write_row(row)
+
+    def _load_phones(self, first_id: int, count: int) -> None:
+        '''Метод загрузки телефонов с заменой номеров, которые уже есть в phones.'''
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE phones_staging (id bigint PRIMARY KEY, e164 bigint) '
+                'ON COMMIT DROP'
+            )
+            self._copy('COPY phones_staging (id, e164) FROM STDIN', self._phones(first_id, count))
+
+            # Номер вычисляется по индексу, индексы после first_id + count в пачке не заняты
+            next_index = first_id + count
+            while True:
+                cursor.execute(
+                    'SELECT s.id FROM phones_staging s JOIN phones p ON p.e164 = s.e164'
+                )
+                taken = [row[0] for row in cursor.fetchall()]
+                if not taken:
+                    break
+                cursor.executemany('UPDATE phones_staging SET e164 = %s WHERE id = %s', [
+                    (self._e164(next_index + offset), phone_id)
+                    for offset, phone_id in enumerate(taken)
+                ])
+                next_index += len(taken)
+                self.stdout.write(f'Заменено занятых номеров: {len(taken)}')
+
+            cursor.execute('INSERT INTO phones (id, e164) SELECT id, e164 FROM phones_staging')
+
+    @classmethod
+    def _phones(cls, first_id: int, count: int) -> Iterator[Tuple[Any, ...]]:
+        '''Метод генерации уникальных телефонов.'''
+        for phone_id in range(first_id, first_id + count):
+            yield phone_id, cls._e164(phone_id)
+
+    @staticmethod
+    def _e164(index: int) -> int:
+        '''Метод получения номера по индексу (разные индексы до 10^9 - разные номера).'''
+        return 79000000000 + index * PHONE_MULTIPLIER % 1000000000
+
+    @staticmethod
+    def _customers(
+            rnd: random.Random,
+            first_id: int,
+            first_phone_id: int,
+            count: int,
+            firstnames: Dict[str, int],
+            lastnames: Dict[str, int]
+    ) -> Iterator[Tuple[Any, ...]]:
+        '''Метод генерации пользователей (дата регистрации растет вместе с id).'''
+        now = timezone.now()
+        signup_start = now - datetime.timedelta(days=SIGNUP_PERIOD_DAYS)
+        step = datetime.timedelta(days=SIGNUP_PERIOD_DAYS) / max(count, 1)
+        cities: List[int] = list(range(1, CITIES_COUNT + 1))
+        # Крупные города встречаются чаще
+        city_weights = [1 / city for city in cities]
+
+        for offset in range(count):
+            gender = rnd.choice(('M', 'F'))
+            if gender == 'M':
+                firstname = rnd.choice(MALE_FIRSTNAMES)
+                lastname = rnd.choice(LASTNAMES)
+            else:
+                firstname = rnd.choice(FEMALE_FIRSTNAMES)
+                lastname = f'{rnd.choice(LASTNAMES)}а'
+
+            email = None
+            if rnd.random() < 0.7:
+                email = f'user{first_id + offset}@{rnd.choice(EMAIL_DOMAINS)}'
+            birthday = None
+            if rnd.random() < 0.8:
+                birthday = datetime.date(rnd.randint(1950, 2006), 1, 1) + datetime.timedelta(
+                    days=rnd.randint(0, 364)
+                )
+            created_at = signup_start + step * offset
+            last_auth_at = None
+            if rnd.random() < 0.6:
+                last_auth_at = created_at + (now - created_at) * rnd.random()
+
+            yield (
+                first_id + offset,
+                email,
+                first_phone_id + offset,
+                firstnames[firstname] if rnd.random() < 0.95 else None,
+                lastnames[lastname] if rnd.random() < 0.6 else None,
+                birthday,
+                gender if rnd.random() < 0.7 else None,
+                rnd.choices(cities, city_weights)[0] if rnd.random() < 0.9 else None,
+                created_at,
+                last_auth_at,
+            )
+
+    @staticmethod
+    def _favorites(
+            rnd: random.Random,
+            first_customer_id: int,
+            customers_count: int,
+            count: int
+    ) -> Iterator[Tuple[Any, ...]]:
+        '''Метод генерации избранных товаров для новых пользователей.'''
+        if not customers_count:
+            return
+        now = timezone.now()
+        for _ in range(count):
+            # Степенное распределение: у небольшой доли пользователей длинные списки избранного
+            yield (
+                first_customer_id + int(customers_count * rnd.random() ** 2),
+                rnd.randint(1, ITEMS_COUNT),
+                now - datetime.timedelta(seconds=rnd.randint(0, SIGNUP_PERIOD_DAYS * 86400)),
+            )
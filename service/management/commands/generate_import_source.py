@@ -0,0 +1,173 @@
+'''Команда генерации "грязных" данных ZkzClients для локального источника импорта.'''
+import random
+import time
+from typing import Any, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connections, transaction
+from service.sources import SOURCE_DATABASES
+
+# Первый ID записей (выше id синтетических пользователей generate_data)
+FIRST_ID = 10000000
+BATCH_SIZE = 5000
+# Начало периода регистрации (2015-01-01) в секундах
+CREATED_AT_START = 1420070400
+
+FIRSTNAMES = (
+    'Иван', 'Анна', 'Сергей', 'Мария', 'Дмитрий', 'Елена', 'Алексей', 'Ольга',
+    'Андрей', 'Наталья', 'Михаил', 'Татьяна', 'Никита', 'Юлия',
+)
+LASTNAMES = ('Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Петров', 'Соколов', 'Волков')
+DOMAINS = ('mail.ru', 'yandex.ru', 'gmail.com', 'bk.ru', 'inbox.ru')
+
+
+class Command(BaseCommand):
+    '''
+    Команда генерации таблицы ZkzClients с "грязными" данными в локальном источнике импорта.
+
+    Данные содержат дубликаты телефонов с разными префиксами (+7, 7, 8), телефоны
+    неверного формата, некорректные email и имена в разном регистре.
+
+    Таблица ZkzClients пересоздается. Для IMPORT_SOURCE=postgres это таблица в БД
+    сервиса (default), поэтому запуск требует подтверждения --force.
+
+    Примеры:
+        >>>> IMPORT_SOURCE=sqlite python manage.py generate_import_source --rows 100000
+        >>>> IMPORT_SOURCE=postgres python manage.py generate_import_source --force
+    '''
+
+    help = 'Генерация "грязных" данных ZkzClients для локального источника импорта.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        '''Аргументы команды.'''
+        parser.add_argument('--rows', type=int, default=100000, help='Количество записей.')
+        parser.add_argument('--duplicates', type=float, default=0.2,
+                            help='Доля записей с уже встречавшимся телефоном.')
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Начальное значение генератора случайных чисел.')
+        parser.add_argument('--force', action='store_true',
+                            help='Подтверждение пересоздания ZkzClients в БД сервиса.')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        '''Генерация данных.'''
+        if settings.IMPORT_SOURCE == 'mssql':
+            raise CommandError('Укажите локальный источник импорта: IMPORT_SOURCE=sqlite|postgres')
+
+        alias = SOURCE_DATABASES[settings.IMPORT_SOURCE]
+        if alias == 'default' and not options['force']:
+            raise CommandError(
+                'Таблица ZkzClients будет пересоздана в БД сервиса. '
+                'Для подтверждения укажите --force'
+            )
+
+        start = time.perf_counter()
+        rows = self._rows(random.Random(options['seed']), options['rows'], options['duplicates'])
+
+        with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS ZkzClients')
+            cursor.execute("""
+                CREATE TABLE ZkzClients (
+                    ID integer PRIMARY KEY,
+                    phone_main varchar(50),
+                    FirstFIO varchar(255),
+                    email_main varchar(255),
+                    created_at bigint
+                )
+            """)
+            batch: List[Tuple[Any, ...]] = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) == BATCH_SIZE:
+                    self._insert(cursor, batch)
+                    batch = []
+            self._insert(cursor, batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'ZkzClients: {options["rows"]} записей за {time.perf_counter() - start:.1f} с'
+        ))
+
+    @staticmethod
+    def _insert(cursor: Any, batch: List[Tuple[Any, ...]]) -> None:
+        '''Метод добавления пачки записей.'''
+        if batch:
+            cursor.executemany('INSERT INTO ZkzClients VALUES (%s, %s, %s, %s, %s)', batch)
+
+    def _rows(
+            self,
+            rnd: random.Random,
+            count: int,
+            duplicates: float
+    ) -> Iterator[Tuple[Any, ...]]:
+        '''Метод генерации записей.'''
+        numbers: List[str] = []
+        for offset in range(count):
+            if numbers and rnd.random() < duplicates:
+                number = rnd.choice(numbers)
+            else:
+                number = f'9{rnd.randint(0, 999999999):09d}'
+                numbers.append(number)
+
+            yield (
+                FIRST_ID + offset,
+                self._phone(rnd, number),
+                self._name(rnd),
+                self._email(rnd, offset),
+                CREATED_AT_START + offset * 60 + rnd.randint(0, 59),
+            )
+
+    @staticmethod
+    def _phone(rnd: random.Random, number: str) -> Optional[str]:
+        '''Метод генерации телефона в одном из встречающихся форматов.'''
+        variant = rnd.random()
+        if variant < 0.4:
+            return f'+7{number}'
+        if variant < 0.7:
+            return f'7{number}'
+        if variant < 0.9:
+            return f'8{number}'
+        # Неверные форматы (не попадают в импорт)
+        return rnd.choice((
+            number,
+            f'+7 ({number[:3]}) {number[3:6]}-{number[6:8]}-{number[8:]}',
+            f'+38{number}',
+            '',
+            None,
+        ))
+
+    @staticmethod
+    def _name(rnd: random.Random) -> Optional[str]:
+        '''Метод генерации имени в разном регистре и формате.'''
+        name = rnd.choice(FIRSTNAMES)
+        variant = rnd.random()
+        if variant < 0.6:
+            return name
+        if variant < 0.75:
+            return name.lower()
+        if variant < 0.85:
+            return name.upper()
+        if variant < 0.95:
+            # ФИО целиком, иногда длиннее 50 символов
+            fio = f'{rnd.choice(LASTNAMES)} {name} {rnd.choice(FIRSTNAMES)}ович'
+            return ' '.join([fio] * rnd.randint(1, 3))
+        return None
+
+    @staticmethod
+    def _email(rnd: random.Random, offset: int) -> Optional[str]:
+        '''Метод генерации email (корректных, с пробелами и регистром, некорректных).'''
+        login = f'user{offset}'
+        domain = rnd.choice(DOMAINS)
+        variant = rnd.random()
+        if variant < 0.5:
+            return f'{login}@{domain}'
+        if variant < 0.6:
+            return f' {login.title()} @{domain.upper()} '
+        if variant < 0.75:
+            return rnd.choice((
+                f'{login}@mail',
+                f'{login}.{domain}',
+                f'{login}@post.{domain}',
+                f'{login}@{domain}.museum',
+                f'{login}@@{domain}',
+            ))
+        return rnd.choice(('', None))
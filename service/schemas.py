@@ -0,0 +1,16 @@
+'''Модуль для описания схем представления данных служебных методов.'''
+import datetime
+from typing import Any, Optional
+
+from ninja import Schema
+
+
+class SlowQueryOut(Schema):
+    '''Схема OUT для медленного запроса в БД.'''
+
+    sql: str
+    params: str
+    duration_ms: float
+    captured_at: datetime.datetime
+    pid: int
+    plan: Optional[Any] = None
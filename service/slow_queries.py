@@ -0,0 +1,144 @@
+'''Модуль для захвата планов выполнения (EXPLAIN) медленных запросов в БД.'''
+from collections import deque
+from contextlib import contextmanager
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, Iterator, List
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Запросы, для которых возможен EXPLAIN
+EXPLAINABLE_STATEMENTS = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+# Максимальная длина параметров запроса в логах
+PARAMS_MAX_LENGTH = 1000
+
+# Последние медленные запросы воркера
+_plans: Deque[Dict[str, Any]] = deque(maxlen=settings.SLOW_QUERY_PLANS_LIMIT)
+_lock = threading.Lock()
+_last_explain_at = 0.0
+_last_log_at = 0.0
+# Медленные запросы, не записанные в лог с последней записи
+_suppressed = 0
+# Признак выполнения EXPLAIN в текущем потоке (защита от рекурсии)
+_state = threading.local()
+
+
+def install(sender: Any, connection: Any, **kwargs: Any) -> None:
+    '''
+    Обработчик сигнала открытия соединения: подключает обертку к соединениям API_DATABASES.
+
+    Обертка добавляется в начало списка execute_wrappers, чтобы не мешать оберткам,
+    которые подключаются и снимаются через connection.execute_wrapper().
+    '''
+    if connection.alias not in settings.API_DATABASES:
+        return
+    if slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, slow_query_wrapper)
+
+
+def slow_query_wrapper(execute: Callable[..., Any], sql: str, params: Any, many: bool,
+                       context: Dict[str, Any]) -> Any:
+    '''Обертка выполнения запроса в БД, фиксирующая запросы дольше SLOW_QUERY_MS.'''
+    if many or getattr(_state, 'active', False):
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - start
+
+    if duration * 1000 >= settings.SLOW_QUERY_MS:
+        _capture(context['connection'], sql, params, duration)
+    return result
+
+
+def _capture(connection: Any, sql: str, params: Any, duration: float) -> None:
+    '''Метод сохранения медленного запроса и его плана выполнения.'''
+    global _last_explain_at, _last_log_at, _suppressed
+
+    record = {
+        'sql': sql,
+        'params': repr(params)[:PARAMS_MAX_LENGTH],
+        'duration_ms': round(duration * 1000, 2),
+        'captured_at': timezone.now(),
+        'pid': os.getpid(),
+        'plan': None,
+    }
+
+    # Не чаще одного EXPLAIN за SLOW_QUERY_EXPLAIN_INTERVAL секунд на воркер
+    statement = sql.lstrip().split(None, 1)
+    explain = bool(statement) and statement[0].upper() in EXPLAINABLE_STATEMENTS
+    with _lock:
+        now = time.monotonic()
+        explain = explain and now - _last_explain_at >= settings.SLOW_QUERY_EXPLAIN_INTERVAL
+        if explain:
+            _last_explain_at = now
+        # Не чаще одной записи в лог за SLOW_QUERY_LOG_INTERVAL секунд на воркер
+        log = now - _last_log_at >= settings.SLOW_QUERY_LOG_INTERVAL
+        if log:
+            _last_log_at = now
+            suppressed, _suppressed = _suppressed, 0
+        else:
+            _suppressed += 1
+
+    if explain:
+        record['plan'] = _explain(connection, sql, params)
+
+    _plans.append(record)
+    if log:
+        logger.warning(json.dumps({
+            'event': 'slow_query',
+            **record,
+            'captured_at': record['captured_at'].isoformat(),
+            # Медленные запросы после предыдущей записи, не попавшие в лог
+            'suppressed': suppressed,
+        }, ensure_ascii=False))
+
+
+@contextmanager
+def _without_wrappers(connection: Any) -> Iterator[None]:
+    '''Контекст выполнения запросов без оберток соединения (метрики, профилирование).'''
+    wrappers = connection.execute_wrappers
+    connection.execute_wrappers = []
+    try:
+        yield
+    finally:
+        connection.execute_wrappers = wrappers
+
+
+def _explain(connection: Any, sql: str, params: Any) -> Any:
+    '''Метод получения плана выполнения запроса без его выполнения (ANALYZE off).'''
+    _state.active = True
+    try:
+        # EXPLAIN не учитывается в метриках и профилировании запроса API
+        with _without_wrappers(connection):
+            # Точка сохранения не дает ошибке EXPLAIN прервать текущую транзакцию
+            with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN (ANALYZE off, FORMAT JSON) {sql}', params)
+                plan = cursor.fetchone()[0]
+    except DatabaseError:
+        logger.exception('Не удалось получить план запроса')
+        return None
+    finally:
+        _state.active = False
+
+    return json.loads(plan) if isinstance(plan, str) else plan
+
+
+def last_plans(limit: int) -> List[Dict[str, Any]]:
+    '''
+    Метод получения последних медленных запросов воркера.
+
+    Аргументы:
+        limit (int): количество запросов.
+
+    Возвращаемый результат:
+        (List[Dict]): медленные запросы, начиная с последнего.
+    '''
+    return list(reversed(_plans))[:limit]
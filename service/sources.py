@@ -0,0 +1,250 @@
+'''Модуль для источников данных импорта пользователей (таблица ZkzClients).'''
+import datetime
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Protocol
+
+from django.conf import settings
+from django.db import connections
+from servicecustomers import utils
+
+# Псевдонимы БД источников импорта
+SOURCE_DATABASES = {
+    'mssql': 'mssql_db',
+    'sqlite': 'import_source',
+    'postgres': 'default',
+}
+
+# Начало отсчета времени created_at (секунды) в ZkzClients
+EPOCH = datetime.datetime(1970, 1, 1)
+# Телефоны, импортируемые из ZkzClients (аналог условия запроса источника
+# phone_main LIKE '+7__________' OR phone_main LIKE '7__________' OR phone_main LIKE '8__________')
+IMPORT_PHONE_RE = re.compile(r'(?:\+7|7|8).{10}', re.DOTALL)
+
+
+class ImportSource(Protocol):
+    '''Интерфейс источника данных импорта.'''
+
+    def fetch_customers(self) -> List[Dict[str, Any]]:
+        '''Метод получения пользователей (дедуплицированных по телефону, по возрастанию ID).'''
+        ...
+
+
+def dedup_customers(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    '''
+    Метод дедупликации пользователей по телефону в сервисе (IMPORT_DEDUP=local).
+
+    Результат совпадает с дедупликацией в запросе источника: записи с телефоном
+    по маске IMPORT_PHONE_RE, для каждых последних 10 символов телефона - запись
+    с максимальным ID. Записи обрабатываются потоком: в памяти хранится
+    по одной записи на телефон, то есть только результат.
+
+    Аргументы:
+        rows (Iterable[Dict]): записи ZkzClients в любом порядке.
+
+    Возвращаемый результат:
+        (List[Dict]): записи с phone_main из последних 10 символов, упорядоченные по ID.
+
+    Примеры:
+        >>>> dedup_customers([{'ID': 1, 'phone_main': '89025163138'},
+                              {'ID': 2, 'phone_main': '+79025163138'},
+                              {'ID': 3, 'phone_main': '123'}])
+        [{'ID': 2, 'phone_main': '9025163138'}]
+    '''
+    latest: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        phone = row['phone_main']
+        if phone is None or IMPORT_PHONE_RE.fullmatch(phone) is None:
+            continue
+        key = phone[-10:]
+        current = latest.get(key)
+        if current is None or row['ID'] > current['ID']:
+            row['phone_main'] = key
+            latest[key] = row
+    return sorted(latest.values(), key=lambda row: row['ID'])
+
+
+def _keyset(
+        fetch_page: Callable[[Optional[int], int], List[Dict[str, Any]]],
+        page_size: int
+) -> Iterator[Dict[str, Any]]:
+    '''
+    Метод чтения таблицы страницами по возрастанию ID (keyset).
+
+    Следующая страница - записи с ID больше последнего прочитанного: каждая страница -
+    короткий запрос по первичному ключу без OFFSET.
+
+    Аргументы:
+        fetch_page (Callable): запрос страницы (последний прочитанный ID или None, размер).
+        page_size (int): количество записей в странице.
+
+    Возвращаемый результат:
+        (Iterator[Dict]): записи по возрастанию ID.
+    '''
+    last_id = None
+    while True:
+        page = fetch_page(last_id, page_size)
+        yield from page
+        if len(page) < page_size:
+            return
+        last_id = page[-1]['ID']
+
+
+class MSSQLSource:
+    '''Источник импорта - таблица ZkzClients в MSSQL.'''
+
+    def __init__(self, alias: str = 'mssql_db', dedup: str = 'source') -> None:
+        '''Инициализация источника.'''
+        self.alias = alias
+        self.dedup = dedup
+
+    def fetch_customers(self) -> List[Dict[str, Any]]:
+        '''
+        Метод получения пользователей из ZkzClients.
+
+        Телефоны дедуплицируются по последним 10 цифрам: для каждого номера
+        берется запись с максимальным ID. При dedup='local' таблица читается
+        страницами по ID без группировки, дедупликация выполняется в сервисе.
+
+        Возвращаемый результат:
+            (List[Dict]): записи с полями ID, phone_main (10 цифр), FirstFIO, email_main,
+                created_at, created_at_format_datetime, упорядоченные по ID.
+        '''
+        if self.dedup == 'local':
+            return dedup_customers(_keyset(self._fetch_page, settings.IMPORT_FETCH_SIZE))
+
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute("""
+                SELECT
+                    ID,
+                    right(phone_main, 10) as phone_main,
+                    FirstFIO,
+                    email_main,
+                    created_at,
+                    DATEADD(s, created_at, '1970-01-01') as created_at_format_datetime
+                FROM ZkzClients c WITH (NOLOCK)
+                WHERE c.ID IN
+                    (SELECT max(a.ID)
+                    FROM (SELECT
+                        ID,
+                        phone_main,
+                        right(phone_main, 10) as phone_main_substring,
+                        FirstFIO,
+                        email_main,
+                        max(created_at) OVER (PARTITION BY phone_main)  AS rating_in_section
+                    FROM ZkzClients WITH (NOLOCK)
+                    WHERE phone_main LIKE '+7__________' OR
+                    phone_main LIKE '7__________' OR
+                    phone_main LIKE '8__________'
+                    ) a
+                    JOIN ZkzClients b WITH (NOLOCK)
+                    ON a.ID = b.ID
+                    GROUP BY a.phone_main_substring)
+                ORDER BY ID
+            """)
+            return utils.fetch_named(cursor)
+
+    def _fetch_page(self, last_id: Optional[int], size: int) -> List[Dict[str, Any]]:
+        '''Метод получения страницы ZkzClients без дедупликации (ID больше last_id).'''
+        where, params = ('', [size]) if last_id is None else ('WHERE ID > %s', [size, last_id])
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute(f"""
+                SELECT TOP (%s)
+                    ID,
+                    phone_main,
+                    FirstFIO,
+                    email_main,
+                    created_at,
+                    DATEADD(s, created_at, '1970-01-01') as created_at_format_datetime
+                FROM ZkzClients WITH (NOLOCK)
+                {where}
+                ORDER BY ID
+            """, params)
+            return utils.fetch_named(cursor)
+
+
+class LocalSource:
+    '''
+    Локальный источник импорта - таблица ZkzClients с теми же колонками в SQLite или Postgres.
+
+    Используется для разработки и замеров импорта без доступа к MSSQL.
+    Возвращает тот же набор записей, что и MSSQLSource.
+    '''
+
+    def __init__(self, alias: str, dedup: str = 'source') -> None:
+        '''Инициализация источника.'''
+        self.alias = alias
+        self.dedup = dedup
+
+    def fetch_customers(self) -> List[Dict[str, Any]]:
+        '''
+        Метод получения пользователей из ZkzClients (переносимый SQL для SQLite и Postgres).
+
+        Возвращаемый результат:
+            (List[Dict]): записи в формате MSSQLSource.fetch_customers.
+        '''
+        if self.dedup == 'local':
+            rows = dedup_customers(_keyset(self._fetch_page, settings.IMPORT_FETCH_SIZE))
+        else:
+            rows = self._fetch_deduplicated()
+
+        for row in rows:
+            # Аналог DATEADD(s, created_at, '1970-01-01') в MSSQL
+            row['created_at_format_datetime'] = None
+            if row['created_at'] is not None:
+                row['created_at_format_datetime'] = EPOCH + datetime.timedelta(
+                    seconds=row['created_at']
+                )
+        return rows
+
+    def _fetch_deduplicated(self) -> List[Dict[str, Any]]:
+        '''Метод получения пользователей ZkzClients с дедупликацией в запросе.'''
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute("""
+                SELECT
+                    ID AS "ID",
+                    substr(phone_main, length(phone_main) - 9) AS "phone_main",
+                    FirstFIO AS "FirstFIO",
+                    email_main AS "email_main",
+                    created_at AS "created_at"
+                FROM ZkzClients
+                WHERE ID IN
+                    (SELECT max(ID)
+                    FROM ZkzClients
+                    WHERE phone_main LIKE '+7__________' OR
+                    phone_main LIKE '7__________' OR
+                    phone_main LIKE '8__________'
+                    GROUP BY substr(phone_main, length(phone_main) - 9))
+                ORDER BY ID
+            """)
+            return utils.fetch_named(cursor)
+
+    def _fetch_page(self, last_id: Optional[int], size: int) -> List[Dict[str, Any]]:
+        '''Метод получения страницы ZkzClients без дедупликации (ID больше last_id).'''
+        where, params = ('', [size]) if last_id is None else ('WHERE ID > %s', [last_id, size])
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute(f"""
+                SELECT
+                    ID AS "ID",
+                    phone_main AS "phone_main",
+                    FirstFIO AS "FirstFIO",
+                    email_main AS "email_main",
+                    created_at AS "created_at"
+                FROM ZkzClients
+                {where}
+                ORDER BY ID
+                LIMIT %s
+            """, params)
+            return utils.fetch_named(cursor)
+
+
+def get_source() -> ImportSource:
+    '''
+    Метод получения источника импорта по настройкам IMPORT_SOURCE и IMPORT_DEDUP.
+
+    Возвращаемый результат:
+        (MSSQLSource | LocalSource): источник данных импорта.
+    '''
+    alias = SOURCE_DATABASES[settings.IMPORT_SOURCE]
+    if settings.IMPORT_SOURCE == 'mssql':
+        return MSSQLSource(alias, settings.IMPORT_DEDUP)
+    return LocalSource(alias, settings.IMPORT_DEDUP)
@@ -0,0 +1,201 @@
+'''Тесты служебных методов и команд: импорта, медленных запросов, генерации данных.'''
+from collections import deque
+import io
+from typing import Any, Dict, List
+from unittest import mock
+
+from customers.models import Customers, Phones
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import Client, override_settings, SimpleTestCase, TestCase
+
+from . import slow_queries
+from .importer import run_import
+from .management.commands.bench_import import Command as BenchImportCommand
+from .management.commands.generate_data import Command as GenerateDataCommand
+from .management.commands.generate_import_source import FIRST_ID
+from .sources import dedup_customers, LocalSource
+
+
+class DedupCustomersTests(SimpleTestCase):
+    '''Тесты дедупликации пользователей по телефону в сервисе.'''
+
+    def test_dedup(self) -> None:
+        '''Для номера остается запись с максимальным ID, неверные телефоны пропускаются.'''
+        rows: List[Dict[str, Any]] = [
+            {'ID': 5, 'phone_main': '89025163138'},
+            {'ID': 2, 'phone_main': '+79025163138'},
+            {'ID': 3, 'phone_main': '123'},
+            {'ID': 4, 'phone_main': None},
+            {'ID': 1, 'phone_main': '79025163139'},
+            {'ID': 6, 'phone_main': '+38902516313'},
+        ]
+        self.assertEqual(dedup_customers(rows), [
+            {'ID': 1, 'phone_main': '9025163139'},
+            {'ID': 5, 'phone_main': '9025163138'},
+        ])
+
+
+@override_settings(IMPORT_SOURCE='postgres', IMPORT_FETCH_SIZE=7)
+class LocalSourceTests(TestCase):
+    '''Тесты совпадения дедупликации в сервисе и в запросе источника (ZkzClients в Postgres).'''
+
+    def setUp(self) -> None:
+        '''Генерация ZkzClients с повторами телефонов и неверными форматами.'''
+        call_command('generate_import_source', rows=2000, duplicates=0.3, seed=1, force=True,
+                     stdout=io.StringIO())
+        # Маска источника пропускает любые символы после кода
+        with connection.cursor() as cursor:
+            cursor.executemany('INSERT INTO ZkzClients VALUES (%s, %s, %s, %s, %s)', [
+                (1, '+7902516313x', 'Иван', None, 0),
+                (2, '8902-516-31', 'Иван', None, 60),
+                (3, '7 902516313', None, 'user@mail.ru', None),
+            ])
+
+    def test_dedup_local(self) -> None:
+        '''Записи и их порядок совпадают при дедупликации в сервисе и в запросе.'''
+        source_rows = LocalSource('default', 'source').fetch_customers()
+        local_rows = LocalSource('default', 'local').fetch_customers()
+        self.assertGreater(len(source_rows), 1000)
+        self.assertEqual([row['phone_main'] for row in source_rows[:3]],
+                         ['902516313x', '902-516-31', ' 902516313'])
+        self.assertEqual(local_rows, source_rows)
+
+
+class ImportTests(TestCase):
+    '''Тесты сохранения пользователей источника импорта.'''
+
+    def test_import(self) -> None:
+        '''Данные нормализуются по правилам источника, записи с неверным телефоном пропускаются.'''
+        source = mock.Mock()
+        source.fetch_customers.return_value = [
+            {'ID': 1, 'phone_main': '9025163138', 'FirstFIO': 'иван',
+             'email_main': 'Ving@Mail.ru ', 'created_at_format_datetime': None},
+            {'ID': 2, 'phone_main': '902516313x', 'FirstFIO': 'петр',
+             'email_main': None, 'created_at_format_datetime': None},
+            {'ID': 3, 'phone_main': '9025163139', 'FirstFIO': 'иван',
+             'email_main': 'ving', 'created_at_format_datetime': None},
+        ]
+        self.assertEqual(run_import(source), 2)
+        customers = Customers.objects.order_by('id').values_list(
+            'id', 'phone__e164', 'firstname__name', 'email'
+        )
+        self.assertEqual(list(customers), [(1, 79025163138, 'Иван', 'ving@mail.ru'),
+                                           (3, 79025163139, 'Иван', None)])
+
+
+@override_settings(SLOW_QUERY_MS=10, SLOW_QUERY_EXPLAIN_INTERVAL=60, SLOW_QUERY_LOG_INTERVAL=0,
+                   SERVICE_ADMIN_TOKEN='secret')
+class SlowQueriesTests(TestCase):
+    '''Тесты захвата планов медленных запросов в БД.'''
+
+    def setUp(self) -> None:
+        '''Сброс последних запросов и ограничений частоты воркера.'''
+        for name, value in (('_plans', deque(maxlen=10)), ('_last_explain_at', 0.0),
+                            ('_last_log_at', 0.0), ('_suppressed', 0)):
+            patcher = mock.patch.object(slow_queries, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def execute(*statements: str) -> None:
+        '''Метод выполнения запросов в БД с оберткой захвата медленных запросов.'''
+        with connection.execute_wrapper(slow_queries.slow_query_wrapper), \
+                connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def test_threshold(self) -> None:
+        '''Сохраняются только запросы дольше SLOW_QUERY_MS, с планом выполнения.'''
+        with self.assertLogs('service.slow_queries', 'WARNING'):
+            self.execute('SELECT 1', 'SELECT pg_sleep(0.02)')
+        plans = slow_queries.last_plans(10)
+        self.assertEqual([plan['sql'] for plan in plans], ['SELECT pg_sleep(0.02)'])
+        self.assertGreaterEqual(plans[0]['duration_ms'], 10)
+        self.assertEqual(plans[0]['plan'][0]['Plan']['Node Type'], 'Result')
+
+    def test_explain_interval(self) -> None:
+        '''EXPLAIN выполняется не чаще одного раза за SLOW_QUERY_EXPLAIN_INTERVAL.'''
+        wrapped = slow_queries._explain
+        with self.assertLogs('service.slow_queries', 'WARNING'), \
+                mock.patch.object(slow_queries, '_explain', wraps=wrapped) as explain:
+            self.execute('SELECT pg_sleep(0.02)', 'SELECT pg_sleep(0.02)')
+        self.assertEqual(explain.call_count, 1)
+        plans = slow_queries.last_plans(10)
+        self.assertEqual(len(plans), 2)
+        self.assertIsNone(plans[0]['plan'])
+        self.assertIsNotNone(plans[1]['plan'])
+
+    def test_not_explainable(self) -> None:
+        '''Для запросов, отличных от SELECT/WITH/INSERT/UPDATE/DELETE, EXPLAIN не выполняется.'''
+        with self.assertLogs('service.slow_queries', 'WARNING'), \
+                mock.patch.object(slow_queries, '_explain') as explain, \
+                override_settings(SLOW_QUERY_MS=0):
+            self.execute("SET LOCAL statement_timeout = '1min'")
+        explain.assert_not_called()
+        plans = slow_queries.last_plans(10)
+        self.assertEqual(len(plans), 1)
+        self.assertIsNone(plans[0]['plan'])
+
+    def test_admin_token(self) -> None:
+        '''Метод доступен только с верным токеном администратора.'''
+        with self.assertLogs('service.slow_queries', 'WARNING'):
+            self.execute('SELECT pg_sleep(0.02)')
+        url = '/grpc/v1/service/slow_queries/'
+        client = Client()
+        self.assertEqual(client.get(url).status_code, 401)
+        self.assertEqual(client.get(url, HTTP_X_ADMIN_TOKEN='wrong').status_code, 401)
+        response = client.get(url, HTTP_X_ADMIN_TOKEN='secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([plan['sql'] for plan in response.json()], ['SELECT pg_sleep(0.02)'])
+
+    @override_settings(SERVICE_ADMIN_TOKEN='')
+    def test_admin_token_not_set(self) -> None:
+        '''Без заданного токена метод недоступен, в том числе с пустым заголовком.'''
+        response = Client().get('/grpc/v1/service/slow_queries/', HTTP_X_ADMIN_TOKEN='')
+        self.assertEqual(response.status_code, 401)
+
+
+class GenerateDataTests(TestCase):
+    '''Тесты генерации синтетических данных.'''
+
+    def test_taken_numbers(self) -> None:
+        '''Номера, которые уже есть в phones, заменяются свободными, загрузка не падает.'''
+        # Номера, которые получили бы следующие id телефонов
+        Phones.objects.bulk_create([
+            Phones(id=phone_id, e164=GenerateDataCommand._e164(phone_id + 2))
+            for phone_id in (1, 2)
+        ])
+        stdout = io.StringIO()
+        call_command('generate_data', customers=5, favorites=10, seed=1, stdout=stdout)
+        self.assertIn('Заменено занятых номеров: 2', stdout.getvalue())
+        numbers = list(Phones.objects.values_list('e164', flat=True))
+        self.assertEqual(len(numbers), 7)
+        self.assertEqual(len(set(numbers)), 7)
+
+
+@override_settings(IMPORT_SOURCE='postgres')
+class BenchImportTests(TestCase):
+    '''Тесты очистки данных замера импорта.'''
+
+    def test_force_required(self) -> None:
+        '''Без подтверждения --force замер не запускается.'''
+        with self.assertRaises(CommandError):
+            call_command('bench_import', scales='10', stdout=io.StringIO())
+
+    def test_cleanup(self) -> None:
+        '''Удаляются только пользователи и телефоны, созданные замером.'''
+        kept = Customers.objects.create(id=FIRST_ID, phone=Phones.objects.create(e164=79025163100))
+        phone = Phones.objects.create(e164=79025163102)
+        existing, last_phone_id = BenchImportCommand._snapshot()
+        # Импорт: новый телефон и телефон, который был до замера
+        Customers.objects.create(id=FIRST_ID + 1, phone=Phones.objects.create(e164=79025163101))
+        Customers.objects.create(id=FIRST_ID + 2, phone=phone)
+
+        created = BenchImportCommand._created(existing)
+        self.assertEqual(created, [FIRST_ID + 1, FIRST_ID + 2])
+        BenchImportCommand._cleanup(created, last_phone_id)
+        self.assertEqual(list(Customers.objects.values_list('id', flat=True)), [kept.id])
+        self.assertEqual(sorted(Phones.objects.values_list('e164', flat=True)),
+                         [79025163100, 79025163102])
@@ -1,30 +1,175 @@
 '''Модуль инициализации uvicorn сервера для приложения.'''
 import asyncio
+import math
 import os
+import shutil
 import sys
+import time
+from typing import Optional
 
-API_WORKERS = os.environ['API_WORKERS']
+# Директория cgroup контейнера: квота CPU в cpu.max (cgroup v2)
+# или в cpu/cpu.cfs_quota_us и cpu/cpu.cfs_period_us (cgroup v1)
+CGROUP_DIR = '/sys/fs/cgroup'
+# Максимальная пауза перед перезапуском завершившейся фоновой задачи в секундах
+MAX_RESTART_DELAY = 60
+
+
+def _read_cgroup(*path: str) -> Optional[str]:
+    '''Метод чтения файла cgroup (None, если файла нет).'''
+    try:
+        with open(os.path.join(CGROUP_DIR, *path)) as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+
+def _cgroup_cpus() -> Optional[int]:
+    '''
+    Метод получения ограничения CPU контейнера по квоте cgroup (--cpus в Docker, limits.cpu).
+
+    Возвращаемый результат:
+        (Optional[int]): количество CPU с округлением вверх или None, если квоты нет.
+    '''
+    cpu_max = _read_cgroup('cpu.max')
+    if cpu_max is not None:
+        # "max 100000" - без ограничения, "150000 100000" - 1.5 CPU
+        quota, _, period = cpu_max.partition(' ')
+    else:
+        quota = _read_cgroup('cpu', 'cpu.cfs_quota_us') or '-1'
+        period = _read_cgroup('cpu', 'cpu.cfs_period_us') or '0'
+    try:
+        quota_us, period_us = int(quota), int(period)
+    except ValueError:
+        return None
+    if quota_us <= 0 or period_us <= 0:
+        return None
+    return math.ceil(quota_us / period_us)
+
+
+def _default_workers() -> int:
+    '''
+    Метод получения количества воркеров по умолчанию: количество доступных процессу CPU.
+
+    Учитываются и привязка процесса к CPU, и квота CPU cgroup: в контейнере с
+    ограничением --cpus процессу видны все CPU узла, а время выполнения ограничено квотой.
+    '''
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    quota_cpus = _cgroup_cpus()
+    if quota_cpus is not None:
+        cpus = min(cpus, quota_cpus)
+    return max(cpus, 1)
+
+
+API_WORKERS = os.environ.get('API_WORKERS') or str(_default_workers())
+# Применение миграций при запуске: auto - только при наличии непримененных,
+# always - всегда (manage.py migrate), skip - не применять
+STARTUP_MIGRATE = os.environ.get('STARTUP_MIGRATE', 'auto')
+# Общая директория метрик Prometheus для всех воркеров gunicorn
+METRICS_DIR = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/servicecustomers-metrics')
+
+
+def _has_pending_migrations() -> bool:
+    '''
+    Метод проверки наличия непримененных миграций в БД (без запуска manage.py).
+
+    Возвращаемый результат:
+        (bool): True - есть непримененные миграции.
+    '''
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'servicecustomers.settings')
+    import django
+    from django.db import connections
+    from django.db.migrations.executor import MigrationExecutor
+
+    django.setup()
+    connection = connections['default']
+    try:
+        executor = MigrationExecutor(connection)
+        return bool(executor.migration_plan(executor.loader.graph.leaf_nodes()))
+    finally:
+        connection.close()
+
+
+async def _supervise(*args: str) -> None:
+    '''
+    Метод запуска фоновой задачи (команды manage.py) с перезапуском при завершении.
+
+    Команды --loop сами повторяют запуск после ошибок, поэтому завершение процесса
+    (нехватка памяти, ошибка загрузки приложения) не ожидается: процесс перезапускается
+    после паузы 2, 4, 8... секунд, но не более MAX_RESTART_DELAY. Пауза сбрасывается,
+    если процесс проработал дольше MAX_RESTART_DELAY. При отмене процесс завершается.
+
+    Аргументы:
+        args (str): команда manage.py и ее аргументы.
+
+    Возвращаемый результат:
+        None
+    '''
+    failures = 0
+    while True:
+        started_at = time.monotonic()
+        process = await asyncio.create_subprocess_exec('python', 'manage.py', *args)
+        try:
+            returncode = await process.wait()
+        except asyncio.CancelledError:
+            process.terminate()
+            await process.wait()
+            raise
+        if time.monotonic() - started_at > MAX_RESTART_DELAY:
+            failures = 0
+        failures += 1
+        delay = min(2 ** failures, MAX_RESTART_DELAY)
+        print(f'Фоновая задача {args[0]} завершилась с кодом {returncode}, '
+              f'перезапуск через {delay} с', file=sys.stderr, flush=True)
+        await asyncio.sleep(delay)
 
 
 async def main():
     '''Входная функция.'''
+    # Очистка метрик предыдущего запуска
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    os.makedirs(METRICS_DIR)
+
     # Применение миграций в БД
-    migrations_process = await asyncio.create_subprocess_exec(
-        'python',
-        'manage.py',
-        'migrate'
-    )
+    migrate = STARTUP_MIGRATE == 'always'
+    if STARTUP_MIGRATE == 'auto':
+        try:
+            # Запросы Django в БД недоступны в цикле событий
+            migrate = await asyncio.to_thread(_has_pending_migrations)
+        except Exception:
+            # Ошибку подключения к БД и др. покажет manage.py migrate
+            migrate = True
+    if migrate:
+        migrations_process = await asyncio.create_subprocess_exec(
+            'python',
+            'manage.py',
+            'migrate'
+        )
 
-    await migrations_process.wait()
+        await migrations_process.wait()
 
-    # Запуск сервера API
+    # Запуск сервера API (приложение загружается в мастере до запуска воркеров: --preload)
     api_server = await asyncio.create_subprocess_exec(
         'python', '-m', 'gunicorn', 'servicecustomers.asgi:application',
-        '-b', '0.0.0.0:8000', '-w', str(API_WORKERS),
+        '-c', 'python:servicecustomers.gunicorn_conf',
+        '-b', '0.0.0.0:8000', '-w', API_WORKERS, '--preload',
         '-k', 'uvicorn.workers.UvicornWorker'
     )
 
+    # Фоновые задачи: очистка удаленных пользователей, обновление статистики
+    # пользователей, очистка ленты изменений (перезапускаются при завершении)
+    background_tasks = [
+        asyncio.create_task(_supervise('purge_customers', '--loop')),
+        asyncio.create_task(_supervise('refresh_customer_stats', '--loop')),
+        asyncio.create_task(_supervise('purge_changes', '--loop')),
+    ]
+
     await api_server.wait()
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
 
 if __name__ == '__main__':
     try:
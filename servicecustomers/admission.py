@@ -0,0 +1,186 @@
+'''Модуль для ограничения количества одновременных запросов к методам API (admission control).'''
+import asyncio
+from collections import deque
+import threading
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from asgiref.sync import markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.utils.cache import patch_vary_headers
+
+from . import codecs, metrics, utils
+
+# Причины отказа: очередь метода заполнена (429), не дождались обработки (503)
+REJECT_STATUSES = {'queue_full': 429, 'queue_timeout': 503}
+REJECT_MESSAGES = {
+    'queue_full': 'Слишком много одновременных запросов к методу, повторите позже',
+    'queue_timeout': 'Сервис перегружен, повторите позже',
+}
+
+
+def parse_limits(value: str) -> Dict[str, Tuple[int, int]]:
+    '''
+    Метод разбора ограничений методов API из настройки API_ROUTE_LIMITS.
+
+    Аргументы:
+        value (str): ограничения через запятую в формате метод=одновременно:очередь.
+
+    Возвращаемый результат:
+        (Dict[str, Tuple[int, int]]): метод -> (запросов одновременно, запросов в очереди).
+
+    Примеры:
+        >>>> parse_limits('list_customers=4:8,import_customers=1:0')
+        {'list_customers': (4, 8), 'import_customers': (1, 0)}
+    '''
+    limits = {}
+    for item in value.split(','):
+        route, _, limit = item.strip().partition('=')
+        if not route:
+            continue
+        concurrency, _, queue = limit.partition(':')
+        limits[route] = (int(concurrency), int(queue or 0))
+    return limits
+
+
+class RouteLimiter:
+    '''
+    Ограничитель одновременных запросов к одному методу API в воркере.
+
+    Запрос обрабатывается сразу, если обрабатывается меньше concurrency запросов,
+    иначе ждет в очереди (FIFO) не более timeout секунд. Если в очереди уже
+    queue запросов, запрос отклоняется без ожидания.
+    '''
+
+    def __init__(self, route: str, concurrency: int, queue: int) -> None:
+        '''Инициализация ограничителя.'''
+        self.route = route
+        self.concurrency = concurrency
+        self.queue = queue
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        # В WSGI-режиме запросы обрабатываются в разных потоках и циклах событий
+        self.lock = threading.Lock()
+
+    async def acquire(self, timeout: float) -> Optional[str]:
+        '''
+        Метод получения разрешения на обработку запроса.
+
+        Аргументы:
+            timeout (float): максимальное время ожидания в очереди в секундах.
+
+        Возвращаемый результат:
+            (str | None): причина отказа (queue_full, queue_timeout) или None.
+        '''
+        waiter = asyncio.get_running_loop().create_future()
+        with self.lock:
+            if self.in_flight < self.concurrency and not self.waiters:
+                self._set_in_flight(self.in_flight + 1)
+                return None
+            if len(self.waiters) >= self.queue:
+                return 'queue_full'
+            self.waiters.append(waiter)
+
+        metrics.ADMISSION_QUEUED.labels(self.route).inc()
+        try:
+            # Освободившееся место передается ожидающему без изменения in_flight (release)
+            await asyncio.wait_for(waiter, timeout)
+            return None
+        except BaseException as error:
+            with self.lock:
+                if waiter in self.waiters:
+                    self.waiters.remove(waiter)
+            # Место, переданное одновременно с истечением ожидания или отключением
+            # клиента, освобождается
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            if isinstance(error, asyncio.TimeoutError):
+                return 'queue_timeout'
+            raise
+        finally:
+            metrics.ADMISSION_QUEUED.labels(self.route).dec()
+
+    def release(self) -> None:
+        '''Метод освобождения места: передается первому ожидающему в очереди.'''
+        with self.lock:
+            if not self.waiters:
+                self._set_in_flight(self.in_flight - 1)
+                return
+            waiter = self.waiters.popleft()
+        waiter.get_loop().call_soon_threadsafe(self._wake, waiter)
+
+    def _wake(self, waiter: asyncio.Future) -> None:
+        '''Метод передачи места ожидающему (в его цикле событий).'''
+        if waiter.done():
+            # Ожидание уже прервано: место передается следующему
+            self.release()
+        else:
+            waiter.set_result(None)
+
+    def _set_in_flight(self, value: int) -> None:
+        '''Метод изменения количества обрабатываемых запросов.'''
+        self.in_flight = value
+        metrics.ADMISSION_IN_FLIGHT.labels(self.route).set(value)
+
+
+class AdmissionControlMiddleware:
+    '''
+    Middleware для ограничения одновременных запросов к методам API (API_ROUTE_LIMITS).
+
+    Ограничения действуют в каждом воркере отдельно. Запрос сверх ограничения ждет
+    в очереди метода, а при заполненной очереди или истечении API_QUEUE_TIMEOUT
+    сразу отклоняется с 429/503 и заголовком Retry-After, не нагружая БД.
+    Методы без ограничений обрабатываются как обычно.
+
+    Работает в цикле событий ASGI-сервера до передачи запроса в синхронную цепочку
+    обработки, поэтому подключается первым: ожидающие и отклоненные запросы
+    не занимают поток обработки.
+    '''
+
+    sync_capable = False
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], Awaitable[HttpResponse]]) -> None:
+        '''Инициализация middleware.'''
+        limits = parse_limits(settings.API_ROUTE_LIMITS)
+        if not limits:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.limiters = {
+            route: RouteLimiter(route, concurrency, queue)
+            for route, (concurrency, queue) in limits.items()
+        }
+        markcoroutinefunction(self)
+
+    async def __call__(self, request: HttpRequest) -> HttpResponse:
+        '''Обработка запроса с учетом ограничения метода.'''
+        route = utils.route_name(request)
+        limiter = self.limiters.get(route)
+        if limiter is None:
+            return await self.get_response(request)
+
+        reason = await limiter.acquire(settings.API_QUEUE_TIMEOUT)
+        if reason is not None:
+            metrics.ADMISSION_REJECTED.labels(route, reason).inc()
+            return self._reject(request, reason)
+        try:
+            return await self.get_response(request)
+        finally:
+            limiter.release()
+
+    @staticmethod
+    def _reject(request: HttpRequest, reason: str) -> HttpResponse:
+        '''Метод формирования ответа об отказе в обработке в формате, запрошенном клиентом.'''
+        data = {'success': False, 'message': REJECT_MESSAGES[reason], 'data': None}
+        status = REJECT_STATUSES[reason]
+        response: HttpResponse
+        if codecs.accepts_msgpack(request):
+            response = HttpResponse(
+                codecs.packb(data), status=status, content_type=codecs.MSGPACK_MEDIA_TYPE
+            )
+        else:
+            response = JsonResponse(data, status=status, json_dumps_params={'ensure_ascii': False})
+        patch_vary_headers(response, ['Accept'])
+        response['Retry-After'] = str(settings.API_RETRY_AFTER)
+        return response
@@ -1,12 +1,18 @@
 '''Модуль для группировки маршрутизаторов разных приложений.'''
+from changes.api import router as changes_router
 from customers.api import router as customers_router
+from django.db import OperationalError
 from favorites.api import router as favorites_router
-from ninja import NinjaAPI
 from service.api import router as service_router
 
-api = NinjaAPI(
+from . import db_router
+from .codecs import MessagePackParser, NegotiatingNinjaAPI
+
+# Ответ в формате MessagePack при Accept: application/msgpack, иначе JSON
+api = NegotiatingNinjaAPI(
     title='ServiceCustomers',
-    description='CRUD операции по пользователям сервиса и избранным товарам.'
+    description='CRUD операции по пользователям сервиса и избранным товарам.',
+    parser=MessagePackParser()
 )
 
 
@@ -16,6 +22,16 @@ def error_handler(request, exc):
     return api.create_response(request, {'message': 'Internal server error'}, status=500)
 
 
+@api.exception_handler(OperationalError)
+def db_error_handler(request, exc):
+    '''Обработчик ошибок соединения с БД: ошибка реплики передается на повтор в основной БД.'''
+    if db_router.reading_replica():
+        # Повтор выполняет ReplicaRoutingMiddleware.process_exception
+        raise exc
+    return error_handler(request, exc)
+
+
 api.add_router('/grpc/v1/service/', service_router, tags=['Служебные'])
 api.add_router('/rest/v1/customers/', customers_router, tags=['Клиенты'])
 api.add_router('/rest/v1/favorites/', favorites_router, tags=['Избранные товары'])
+api.add_router('/rest/v1/changes/', changes_router, tags=['Изменения'])
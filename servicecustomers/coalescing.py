@@ -0,0 +1,112 @@
+'''Модуль для объединения одинаковых одновременных запросов чтения (single-flight).'''
+import asyncio
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from asgiref.sync import markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpRequest, HttpResponse
+
+from . import metrics, utils
+from .db_router import primary_requested
+
+READ_METHODS = ('GET', 'HEAD')
+
+# Ключ запроса: метод, маршрут, путь, параметры, формат ответа, чтение с основной БД
+Key = Tuple[str, str, str, Tuple[Tuple[str, Tuple[str, ...]], ...], str, bool]
+
+
+class RequestCoalescingMiddleware:
+    '''
+    Middleware для объединения одинаковых одновременных запросов чтения в воркере.
+
+    Пока выполняется запрос к методу из COALESCE_ROUTES, одинаковые запросы
+    (тот же метод API, путь и параметры) не выполняются, а ждут его завершения
+    и получают копию ответа: один запрос в БД и одна сериализация вместо нескольких.
+    Готовые ответы не кэшируются: запрос, пришедший после завершения, выполняется заново.
+
+    Работает в цикле событий ASGI-сервера до передачи запроса в синхронную цепочку
+    обработки, где одинаковые запросы иначе ждали бы поток обработки друг за другом.
+    '''
+
+    sync_capable = False
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], Awaitable[HttpResponse]]) -> None:
+        '''Инициализация middleware.'''
+        if not settings.COALESCE_ROUTES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        # Выполняющиеся запросы: ключ -> ожидающие ответа одинаковые запросы
+        self.in_flight: Dict[Key, List[asyncio.Future]] = {}
+        # В WSGI-режиме запросы обрабатываются в разных потоках и циклах событий
+        self.lock = threading.Lock()
+        markcoroutinefunction(self)
+
+    async def __call__(self, request: HttpRequest) -> HttpResponse:
+        '''Обработка запроса: выполнение или ожидание одинакового выполняющегося запроса.'''
+        key = self._key(request)
+        if key is None:
+            return await self.get_response(request)
+
+        waiter = None
+        with self.lock:
+            if key in self.in_flight:
+                waiter = asyncio.get_running_loop().create_future()
+                self.in_flight[key].append(waiter)
+            else:
+                self.in_flight[key] = []
+
+        if waiter is not None:
+            leader_response = await waiter
+            if leader_response is None:
+                # Первый запрос не завершился (отключение клиента): выполняется сам
+                return await self.get_response(request)
+            metrics.COALESCED_REQUESTS.labels(key[1]).inc()
+            return self._copy(leader_response)
+
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        finally:
+            with self.lock:
+                waiters = self.in_flight.pop(key)
+            shared = response if response is not None and not response.streaming else None
+            for follower in waiters:
+                follower.get_loop().call_soon_threadsafe(self._resolve, follower, shared)
+
+    @staticmethod
+    def _key(request: HttpRequest) -> Optional[Key]:
+        '''Метод получения ключа запроса (None - запрос не объединяется).'''
+        if request.method not in READ_METHODS:
+            return None
+        route = utils.route_name(request)
+        if route not in settings.COALESCE_ROUTES:
+            return None
+        # Порядок разных параметров не влияет на ответ, порядок значений одного - может
+        params = tuple(sorted((name, tuple(values)) for name, values in request.GET.lists()))
+        return (
+            request.method,
+            route,
+            request.path,
+            params,
+            request.headers.get('Accept', ''),
+            # Клиент после записи читает с основной БД (см. ReplicaRoutingMiddleware)
+            primary_requested(request),
+        )
+
+    @staticmethod
+    def _resolve(waiter: asyncio.Future, response: Optional[HttpResponse]) -> None:
+        '''Метод передачи ответа ожидающему запросу (в его цикле событий).'''
+        if not waiter.done():
+            waiter.set_result(response)
+
+    @staticmethod
+    def _copy(response: HttpResponse) -> HttpResponse:
+        '''Метод копирования ответа (без cookie) для ожидавшего запроса.'''
+        copy = HttpResponse(response.content, status=response.status_code)
+        for header, value in response.items():
+            copy[header] = value
+        return copy
@@ -0,0 +1,97 @@
+'''Модуль для формата MessagePack в методах API (выбор формата по заголовкам запроса).'''
+from typing import Any, cast, Optional
+
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import patch_vary_headers
+import msgpack
+from ninja import NinjaAPI
+from ninja.parser import Parser
+from ninja.responses import NinjaJSONEncoder
+from ninja.types import DictStrAny
+
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+# Названия типа MessagePack, встречающиеся у клиентов
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, 'application/x-msgpack', 'application/vnd.msgpack')
+# Типы, не поддерживаемые MessagePack (даты, Decimal, UUID), кодируются так же, как в JSON
+_encoder = NinjaJSONEncoder()
+
+
+def packb(data: Any) -> bytes:
+    '''
+    Метод кодирования данных ответа в MessagePack.
+
+    Даты и время кодируются строками, как в JSON-ответах.
+
+    Аргументы:
+        data (Any): данные ответа (результат схемы ответа).
+
+    Возвращаемый результат:
+        (bytes): данные в формате MessagePack.
+
+    Примеры:
+        >>>> msgpack.unpackb(packb({'id': 1, 'created_at': datetime.datetime(2024, 1, 9)}))
+        {'id': 1, 'created_at': '2024-01-09T00:00:00'}
+    '''
+    return cast(bytes, msgpack.packb(data, default=_encoder.default))
+
+
+def accepts_msgpack(request: HttpRequest) -> bool:
+    '''
+    Метод проверки, запрашивает ли клиент ответ в формате MessagePack (заголовок Accept).
+
+    Аргументы:
+        request (HttpRequest): информация о запросе.
+
+    Возвращаемый результат:
+        (bool): True - ответ в формате MessagePack, иначе JSON.
+    '''
+    accept = request.headers.get('Accept', '')
+    return any(
+        media_range.split(';')[0].strip().lower() in MSGPACK_MEDIA_TYPES
+        for media_range in accept.split(',')
+    )
+
+
+class MessagePackParser(Parser):
+    '''Парсер тела запроса: MessagePack при Content-Type MessagePack, иначе JSON.'''
+
+    def parse_body(self, request: HttpRequest) -> DictStrAny:
+        '''Метод разбора тела запроса.'''
+        if request.content_type in MSGPACK_MEDIA_TYPES:
+            return cast(DictStrAny, msgpack.unpackb(request.body))
+        return super().parse_body(request)
+
+
+class NegotiatingNinjaAPI(NinjaAPI):
+    '''
+    API ninja с выбором формата ответа по заголовку Accept: MessagePack или JSON.
+
+    Формат выбирается для всех методов и ответов, в том числе ошибок валидации,
+    поэтому методы API не зависят от формата.
+    '''
+
+    def create_response(
+            self,
+            request: HttpRequest,
+            data: Any,
+            *,
+            status: Optional[int] = None,
+            temporal_response: Optional[HttpResponse] = None,
+    ) -> HttpResponse:
+        '''Метод формирования ответа в формате, запрошенном клиентом.'''
+        if temporal_response:
+            status = temporal_response.status_code
+        assert status
+
+        if not accepts_msgpack(request):
+            response = super().create_response(
+                request, data, status=status, temporal_response=temporal_response
+            )
+        elif temporal_response:
+            response = temporal_response
+            response.content = packb(data)
+            response['Content-Type'] = MSGPACK_MEDIA_TYPE
+        else:
+            response = HttpResponse(packb(data), status=status, content_type=MSGPACK_MEDIA_TYPE)
+        patch_vary_headers(response, ['Accept'])
+        return response
@@ -0,0 +1,139 @@
+'''Модуль для маршрутизации чтения методов API на реплику Postgres.'''
+from contextvars import ContextVar
+import logging
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections, OperationalError
+from django.http import HttpRequest, HttpResponse
+
+from . import metrics, utils
+
+logger = logging.getLogger(__name__)
+
+# Cookie клиента, выполнившего запись: до истечения клиент читает с основной БД
+STICKY_COOKIE = 'db_primary'
+# Заголовок ответа на запись (время чтения с основной БД в секундах) и запроса
+# клиента без cookie (сервиса), который возвращает его в течение этого времени
+STICKY_HEADER = 'X-DB-Primary'
+READ_METHODS = ('GET', 'HEAD')
+# БД, между объектами которых допустимы связи (реплика содержит те же данные)
+ROUTED_DATABASES = ('default', 'replica')
+
+# Признак чтения с реплики в текущем запросе к API
+_use_replica: ContextVar[bool] = ContextVar('use_replica', default=False)
+
+
+def primary_requested(request: HttpRequest) -> bool:
+    '''
+    Метод проверки, что клиент после записи читает с основной БД.
+
+    Аргументы:
+        request (HttpRequest): информация о запросе.
+
+    Возвращаемый результат:
+        (bool): True, если в запросе есть cookie db_primary или заголовок X-DB-Primary.
+    '''
+    return STICKY_COOKIE in request.COOKIES or bool(request.headers.get(STICKY_HEADER))
+
+
+def reading_replica() -> bool:
+    '''
+    Метод проверки, что запросы на чтение в текущем запросе к API выполняются на реплике.
+
+    Возвращаемый результат:
+        (bool): True, если чтение выполняется на реплике.
+    '''
+    return _use_replica.get()
+
+
+class ReplicaRouter:
+    '''
+    Роутер БД: чтение в методах REPLICA_ROUTES выполняется на реплике.
+
+    Запись и чтение в остальных методах, командах и импорте выполняются
+    на основной БД (default).
+    '''
+
+    def db_for_read(self, model: Any, **hints: Any) -> Optional[str]:
+        '''Метод выбора БД для чтения.'''
+        if _use_replica.get():
+            return 'replica'
+        return None
+
+    def db_for_write(self, model: Any, **hints: Any) -> Optional[str]:
+        '''Метод выбора БД для записи (всегда основная БД).'''
+        return 'default'
+
+    def allow_relation(self, obj1: Any, obj2: Any, **hints: Any) -> Optional[bool]:
+        '''Метод проверки допустимости связи объектов из основной БД и реплики.'''
+        if obj1._state.db in ROUTED_DATABASES and obj2._state.db in ROUTED_DATABASES:
+            return True
+        return None
+
+    def allow_migrate(self, db: str, app_label: str, model_name: Optional[str] = None,
+                      **hints: Any) -> Optional[bool]:
+        '''Метод проверки применения миграций (реплика получает изменения от основной БД).'''
+        if db == 'replica':
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    '''
+    Middleware для чтения с реплики в методах API только для чтения (REPLICA_ROUTES).
+
+    После успешной записи клиенту выставляется cookie db_primary на
+    REPLICA_STICKY_SECONDS секунд: пока она действует, клиент читает с основной БД
+    и видит свои изменения несмотря на отставание реплики. Клиенты без cookie (сервисы)
+    получают в ответе заголовок X-DB-Primary и передают его в запросах в течение
+    указанного в нем времени.
+
+    Если чтение с реплики завершилось ошибкой соединения (реплика недоступна,
+    запрос отменен из-за конфликта с восстановлением), метод повторяется на основной БД.
+
+    Используется только при настроенной реплике (POSTGRES_REPLICA_HOST).
+    '''
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        '''Инициализация middleware.'''
+        if 'replica' not in settings.DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        '''Обработка запроса с выбором БД для чтения.'''
+        read_only = utils.route_name(request) in settings.REPLICA_ROUTES
+        use_replica = read_only and not primary_requested(request)
+        token = _use_replica.set(use_replica)
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+
+        # Методы чтения с телом запроса (POST) не считаются записью
+        write = request.method not in READ_METHODS and not read_only
+        if write and response.status_code < 400:
+            response.set_cookie(
+                STICKY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax'
+            )
+            response[STICKY_HEADER] = str(settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    def process_exception(self, request: HttpRequest,
+                          exception: Exception) -> Optional[HttpResponse]:
+        '''Метод повтора метода чтения на основной БД после ошибки соединения с репликой.'''
+        if not isinstance(exception, OperationalError) or not _use_replica.get():
+            return None
+
+        route = utils.route_name(request)
+        logger.warning('Ошибка чтения с реплики в %s, повтор на основной БД: %s', route, exception)
+        metrics.REPLICA_FALLBACKS.labels(route).inc()
+        # Соединение с ошибкой не используется повторно
+        connections['replica'].close()
+        # Признак сбрасывается в __call__ после обработки запроса
+        _use_replica.set(False)
+        match = request.resolver_match
+        return match.func(request, *match.args, **match.kwargs)
@@ -0,0 +1,27 @@
+'''Конфигурация gunicorn для запуска API.'''
+import gc
+import os
+from typing import Any
+
+from prometheus_client import multiprocess
+
+
+def on_starting(server: Any) -> None:
+    '''
+    Хук запуска мастера: при --preload загружает маршруты API до запуска воркеров.
+
+    Модули, загруженные в мастере, воркеры получают общими страницами памяти (fork).
+    Объекты переносятся в постоянное поколение сборщика мусора, чтобы сборка
+    в воркерах не копировала общие страницы.
+    '''
+    if server.cfg.preload_app:
+        from django.urls import get_resolver
+
+        get_resolver().url_patterns
+        gc.freeze()
+
+
+def child_exit(server: Any, worker: Any) -> None:
+    '''Хук завершения воркера: удаляет его живые метрики (gauge) из общей директории.'''
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,71 @@
+'''Модуль для фоновых команд, которые выполняются однократно или в цикле (--loop).'''
+import logging
+import time
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+# Максимальная пауза перед повтором после ошибки в режиме --loop в секундах
+MAX_RETRY_DELAY = 60
+
+
+class LoopCommand(BaseCommand):
+    '''
+    Базовая команда фоновой задачи с режимом --loop.
+
+    Наследник реализует run_once() и задает interval_setting - название настройки
+    с паузой между запусками в секундах. В режиме --loop ошибка (переключение БД,
+    блокировка) не останавливает задачу: она логируется, а повтор выполняется
+    после паузы 2, 4, 8... секунд, но не более MAX_RETRY_DELAY.
+
+    Примеры:
+        >>>> class Command(LoopCommand):
+        >>>>     interval_setting = 'CHANGES_PURGE_INTERVAL'
+        >>>>
+        >>>>     def run_once(self, **options: Any) -> None:
+        >>>>         ...
+    '''
+
+    # Название настройки с паузой между запусками в режиме --loop
+    interval_setting = ''
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        '''Аргументы команды.'''
+        parser.add_argument('--loop', action='store_true',
+                            help=f'Запускать каждые {self.interval_setting} секунд.')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        '''Однократный запуск задачи или запуск в цикле (--loop).'''
+        if not options['loop']:
+            self.run_once(**options)
+            return
+
+        failures = 0
+        while True:
+            try:
+                self.run_once(**options)
+                failures = 0
+                delay = getattr(settings, self.interval_setting)
+            except Exception:
+                failures += 1
+                delay = min(2 ** failures, MAX_RETRY_DELAY)
+                logger.exception('Ошибка команды %s, повтор через %s с',
+                                 self.__module__.rsplit('.', 1)[-1], delay)
+            # Соединение с ошибкой закрывается, следующий запуск откроет новое
+            close_old_connections()
+            time.sleep(delay)
+
+    def run_once(self, **options: Any) -> None:
+        '''
+        Метод однократного выполнения задачи.
+
+        Аргументы:
+            options (Dict): аргументы команды.
+
+        Возвращаемый результат:
+            None
+        '''
+        raise NotImplementedError
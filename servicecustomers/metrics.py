@@ -0,0 +1,185 @@
+'''Модуль для сбора метрик сервиса в формате Prometheus.'''
+from contextlib import ExitStack
+import os
+import time
+from typing import Any, Callable, Dict
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpRequest, HttpResponse
+from prometheus_client import (
+    CollectorRegistry, CONTENT_TYPE_LATEST, Counter, Gauge, generate_latest, Histogram,
+    multiprocess, REGISTRY
+)
+
+from . import utils
+
+# Границы корзин для количества запросов в БД за один HTTP-запрос
+DB_QUERIES_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+REQUESTS = Counter(
+    'api_requests_total',
+    'Количество запросов к API',
+    ['route', 'method', 'status']
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'api_requests_in_progress',
+    'Количество запросов к API в обработке (каждый держит не более одного соединения с БД)',
+    ['route'],
+    multiprocess_mode='livesum'
+)
+REQUEST_DURATION = Histogram(
+    'api_request_duration_seconds',
+    'Время обработки запроса к API',
+    ['route']
+)
+DB_QUERIES = Histogram(
+    'api_db_queries',
+    'Количество запросов в БД за один запрос к API',
+    ['route'],
+    buckets=DB_QUERIES_BUCKETS
+)
+DB_DURATION = Histogram(
+    'api_db_duration_seconds',
+    'Суммарное время запросов в БД за один запрос к API',
+    ['route']
+)
+DB_CONNECTIONS_CREATED = Counter(
+    'db_connections_created_total',
+    'Количество открытых соединений с БД',
+    ['alias']
+)
+# Заполняется слоями кэширования (cache - название кэша, result - hit/miss)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total',
+    'Количество обращений к кэшам',
+    ['cache', 'result']
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    'api_admission_in_flight',
+    'Количество запросов в обработке по методам с ограничением (API_ROUTE_LIMITS)',
+    ['route'],
+    multiprocess_mode='livesum'
+)
+ADMISSION_QUEUED = Gauge(
+    'api_admission_queued',
+    'Количество запросов в очереди по методам с ограничением (API_ROUTE_LIMITS)',
+    ['route'],
+    multiprocess_mode='livesum'
+)
+ADMISSION_REJECTED = Counter(
+    'api_admission_rejected_total',
+    'Количество запросов, отклоненных ограничением методов (reason - queue_full/queue_timeout)',
+    ['route', 'reason']
+)
+COALESCED_REQUESTS = Counter(
+    'api_coalesced_requests_total',
+    'Количество запросов, получивших копию ответа одинакового выполняющегося запроса',
+    ['route']
+)
+REPLICA_FALLBACKS = Counter(
+    'api_replica_fallbacks_total',
+    'Количество запросов, повторенных на основной БД после ошибки чтения с реплики',
+    ['route']
+)
+TOUCH_BUFFERED = Gauge(
+    'customers_touch_buffered',
+    'Количество пользователей с несохраненной датой авторизации в буферах воркеров',
+    multiprocess_mode='livesum'
+)
+TOUCH_FLUSHED = Counter(
+    'customers_touch_flushed_total',
+    'Количество сохраненных в БД дат авторизации из буферов воркеров'
+)
+TOUCH_DIRECT = Counter(
+    'customers_touch_direct_total',
+    'Количество дат авторизации, сохраненных в БД сразу из-за заполненного буфера'
+)
+TOUCH_DROPPED = Counter(
+    'customers_touch_dropped_total',
+    'Количество дат авторизации, потерянных после ошибки сохранения (буфер заполнен)'
+)
+IMPORT_ROWS = Counter(
+    'import_rows_total',
+    'Количество строк, обработанных импортом пользователей'
+)
+IMPORT_DURATION = Histogram(
+    'import_duration_seconds',
+    'Время выполнения импорта пользователей',
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+)
+
+
+def _on_connection_created(sender: Any, connection: Any, **kwargs: Any) -> None:
+    '''Обработчик сигнала открытия соединения с БД.'''
+    DB_CONNECTIONS_CREATED.labels(connection.alias).inc()
+
+
+connection_created.connect(_on_connection_created)
+
+
+class MetricsMiddleware:
+    '''Middleware для сбора метрик запросов к API и запросов в БД по маршрутам.'''
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        '''Инициализация middleware.'''
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        '''Обработка запроса с замером времени и запросов в БД.'''
+        db_stats = {'count': 0, 'duration': 0.0}
+        route = utils.route_name(request)
+        in_progress = REQUESTS_IN_PROGRESS.labels(route)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in settings.API_DATABASES:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(self._db_wrapper(db_stats))
+                    )
+                response = self.get_response(request)
+        finally:
+            in_progress.dec()
+
+        REQUEST_DURATION.labels(route).observe(time.perf_counter() - start)
+        REQUESTS.labels(route, request.method, response.status_code).inc()
+        DB_QUERIES.labels(route).observe(db_stats['count'])
+        DB_DURATION.labels(route).observe(db_stats['duration'])
+        return response
+
+    @staticmethod
+    def _db_wrapper(db_stats: Dict[str, Any]) -> Callable[..., Any]:
+        '''Метод создания обертки для подсчета запросов в БД.'''
+        def wrapper(execute: Callable[..., Any], sql: str, params: Any, many: bool,
+                    context: Dict[str, Any]) -> Any:
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                db_stats['count'] += 1
+                db_stats['duration'] += time.perf_counter() - start
+
+        return wrapper
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    '''
+    Метод выдачи метрик в текстовом формате Prometheus.
+
+    При заданной переменной окружения PROMETHEUS_MULTIPROC_DIR метрики собираются
+    со всех воркеров gunicorn.
+
+    Аргументы:
+        request (HttpRequest): информация о запросе.
+
+    Возвращаемый результат:
+        (HttpResponse): метрики в текстовом формате Prometheus.
+    '''
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
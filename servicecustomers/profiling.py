@@ -0,0 +1,100 @@
+'''Модуль для профилирования запросов в БД в рамках одного запроса к API.'''
+from collections import defaultdict
+from contextlib import ExitStack
+import logging
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+
+from . import utils
+
+logger = logging.getLogger(__name__)
+
+
+class QueryProfilingMiddleware:
+    '''
+    Middleware для профилирования запросов в БД.
+
+    Записывает каждый SQL-запрос с его длительностью, добавляет в ответ заголовки
+    Server-Timing и X-DB-Queries, отмечает повторяющиеся одинаковые запросы (N+1)
+    и логирует медленные запросы к API с разбивкой по SQL.
+
+    Включается настройкой QUERY_PROFILING. При выключенной настройке Django
+    исключает middleware из цепочки обработки (MiddlewareNotUsed).
+    '''
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        '''Инициализация middleware.'''
+        if not settings.QUERY_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_seconds = settings.QUERY_PROFILING_SLOW_MS / 1000
+        self.duplicates_threshold = settings.QUERY_PROFILING_DUPLICATES
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        '''Обработка запроса с записью всех запросов в БД.'''
+        queries: List[Tuple[str, float]] = []
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in settings.API_DATABASES:
+                stack.enter_context(connections[alias].execute_wrapper(self._db_wrapper(queries)))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        db_duration = sum(query_duration for _, query_duration in queries)
+        # Группировка по тексту SQL (параметры передаются отдельно от текста запроса)
+        breakdown: Dict[str, List[float]] = defaultdict(list)
+        for sql, query_duration in queries:
+            breakdown[sql].append(query_duration)
+        duplicates = {
+            sql: durations for sql, durations in breakdown.items()
+            if len(durations) >= self.duplicates_threshold
+        }
+
+        response['Server-Timing'] = (
+            f'db;dur={db_duration * 1000:.2f};desc="{len(queries)} queries", '
+            f'total;dur={duration * 1000:.2f}'
+        )
+        response['X-DB-Queries'] = str(len(queries))
+        if duplicates:
+            response['X-DB-Duplicate-Queries'] = str(len(duplicates))
+
+        route = utils.route_name(request)
+        for sql, durations in duplicates.items():
+            logger.warning(
+                'Повторяющийся запрос (N+1) в %s: %d раз, %.2f мс: %s',
+                route, len(durations), sum(durations) * 1000, sql
+            )
+        if duration >= self.slow_seconds:
+            logger.warning(
+                'Медленный запрос %s %s (%s): %.2f мс, БД: %d запросов, %.2f мс\n%s',
+                request.method, request.path, route, duration * 1000,
+                len(queries), db_duration * 1000, self._format_breakdown(breakdown)
+            )
+
+        return response
+
+    @staticmethod
+    def _db_wrapper(queries: List[Tuple[str, float]]) -> Callable[..., Any]:
+        '''Метод создания обертки для записи запросов в БД.'''
+        def wrapper(execute: Callable[..., Any], sql: str, params: Any, many: bool,
+                    context: Dict[str, Any]) -> Any:
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries.append((sql, time.perf_counter() - start))
+
+        return wrapper
+
+    @staticmethod
+    def _format_breakdown(breakdown: Dict[str, List[float]]) -> str:
+        '''Метод форматирования разбивки запросов в БД (по убыванию суммарного времени).'''
+        lines = []
+        for sql, durations in sorted(breakdown.items(), key=lambda item: -sum(item[1])):
+            lines.append(f'  {len(durations)} x {sum(durations) * 1000:.2f} мс: {sql}')
+        return '\n'.join(lines)
@@ -1,6 +1,7 @@
 '''Настройки для проекта serviceCustomers.'''
 import os
 from pathlib import Path
+from typing import Any, Dict
 
 BASE_DIR = Path(__file__).resolve().parent
 
@@ -17,10 +18,16 @@ INSTALLED_APPS = [
     'customers',
     'service',
     'favorites',
+    'changes',
 
 ]
 
 MIDDLEWARE = [
+    'servicecustomers.coalescing.RequestCoalescingMiddleware',
+    'servicecustomers.admission.AdmissionControlMiddleware',
+    'servicecustomers.metrics.MetricsMiddleware',
+    'servicecustomers.profiling.QueryProfilingMiddleware',
+    'servicecustomers.db_router.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -28,10 +35,75 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'servicecustomers.urls'
 
+# Профилирование запросов в БД (заголовки Server-Timing, X-DB-Queries, поиск N+1)
+QUERY_PROFILING = os.environ.get('QUERY_PROFILING', 'false').lower() == 'true'
+# Порог медленного запроса к API в миллисекундах
+QUERY_PROFILING_SLOW_MS = int(os.environ.get('QUERY_PROFILING_SLOW_MS', 500))
+# Количество одинаковых SQL-запросов, начиная с которого запрос считается N+1
+QUERY_PROFILING_DUPLICATES = int(os.environ.get('QUERY_PROFILING_DUPLICATES', 3))
+
+# Порог медленного запроса в БД в миллисекундах для захвата плана (0 - выключено)
+SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 0))
+# Минимальный интервал между EXPLAIN в одном воркере в секундах
+SLOW_QUERY_EXPLAIN_INTERVAL = int(os.environ.get('SLOW_QUERY_EXPLAIN_INTERVAL', 10))
+# Минимальный интервал между записями медленных запросов в лог в одном воркере в секундах
+SLOW_QUERY_LOG_INTERVAL = float(os.environ.get('SLOW_QUERY_LOG_INTERVAL', 1))
+# Количество последних медленных запросов, хранимых воркером
+SLOW_QUERY_PLANS_LIMIT = int(os.environ.get('SLOW_QUERY_PLANS_LIMIT', 50))
+
+# Очистка удаленных пользователей: размер пачки и интервал между запусками в секундах
+CUSTOMERS_PURGE_BATCH_SIZE = int(os.environ.get('CUSTOMERS_PURGE_BATCH_SIZE', 1000))
+CUSTOMERS_PURGE_INTERVAL = int(os.environ.get('CUSTOMERS_PURGE_INTERVAL', 60))
+
+# Очистка ленты изменений: срок хранения изменений в днях и интервал между запусками в секундах
+CHANGES_RETENTION_DAYS = int(os.environ.get('CHANGES_RETENTION_DAYS', 7))
+CHANGES_PURGE_INTERVAL = int(os.environ.get('CHANGES_PURGE_INTERVAL', 3600))
+
+# Интервал обновления статистики пользователей (customer_stats) в секундах
+CUSTOMERS_STATS_REFRESH_INTERVAL = int(os.environ.get('CUSTOMERS_STATS_REFRESH_INTERVAL', 300))
+
+# Буфер дат авторизации (метод touch): интервал сохранения в БД в секундах
+# и количество пользователей, при котором буфер сохраняется досрочно (предел буфера)
+CUSTOMERS_TOUCH_FLUSH_INTERVAL = float(os.environ.get('CUSTOMERS_TOUCH_FLUSH_INTERVAL', 5))
+CUSTOMERS_TOUCH_BUFFER_SIZE = int(os.environ.get('CUSTOMERS_TOUCH_BUFFER_SIZE', 10000))
+
+# Методы API только для чтения, одинаковые одновременные запросы к которым выполняются
+# в воркере один раз (через запятую, пусто - выключено)
+COALESCE_ROUTES = tuple(filter(None, os.environ.get(
+    'COALESCE_ROUTES',
+    'list_customers,get_customer,get_customer_by_phone,customer_stats,list_favorites'
+).split(',')))
+
+# Ограничения одновременных запросов к методам API в воркере:
+# метод=запросов одновременно:запросов в очереди через запятую (пусто - без ограничений,
+# по умолчанию), например list_customers=4:8,import_customers=1:0
+API_ROUTE_LIMITS = os.environ.get('API_ROUTE_LIMITS', '')
+# Максимальное время ожидания запроса в очереди метода в секундах
+API_QUEUE_TIMEOUT = float(os.environ.get('API_QUEUE_TIMEOUT', 1))
+# Значение заголовка Retry-After (секунды) в ответах 429/503 при превышении ограничения
+API_RETRY_AFTER = int(os.environ.get('API_RETRY_AFTER', 1))
+
+# Кэш данных пользователей в памяти воркера (метод get_customers_batch)
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'customers': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'customers',
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CUSTOMERS_CACHE_MAX_ENTRIES', 50000))},
+    },
+}
+# Время хранения данных пользователя в кэше в секундах
+CUSTOMERS_CACHE_SECONDS = int(os.environ.get('CUSTOMERS_CACHE_SECONDS', 5))
+# Максимальное количество id в запросе get_customers_batch
+CUSTOMERS_BATCH_MAX_IDS = int(os.environ.get('CUSTOMERS_BATCH_MAX_IDS', 100))
+
+# Токен администратора для служебных методов (заголовок X-Admin-Token)
+SERVICE_ADMIN_TOKEN = os.environ.get('SERVICE_ADMIN_TOKEN')
+
 
 WSGI_APPLICATION = 'servicecustomers.wsgi.application'
 
-DATABASES = {
+DATABASES: Dict[str, Dict[str, Any]] = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
         'HOST': os.environ['POSTGRES_HOST'],
@@ -41,7 +113,37 @@ DATABASES = {
         'PASSWORD': os.environ['POSTGRES_PASSWORD']
 
     },
-    'mssql_db': {
+}
+
+# Реплика Postgres для чтения (необязательная): методы REPLICA_ROUTES читают с реплики
+if os.environ.get('POSTGRES_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['POSTGRES_REPLICA_HOST'],
+        'PORT': os.environ.get('POSTGRES_REPLICA_PORT', os.environ['POSTGRES_PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['servicecustomers.db_router.ReplicaRouter']
+# Методы API только для чтения (в том числе POST), которые обслуживаются репликой.
+# get_customers_batch читает с основной БД: его результат сохраняется в кэш воркера
+REPLICA_ROUTES = ('list_customers', 'get_customer', 'customer_stats', 'list_favorites')
+# Время в секундах после записи, в течение которого клиент читает с основной БД
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+# БД, к которым обращаются методы API (метрики, профилирование, медленные запросы)
+API_DATABASES = [alias for alias in ('default', 'replica') if alias in DATABASES]
+
+# Источник данных импорта пользователей (таблица ZkzClients):
+# mssql - MSSQL БД, sqlite - локальный файл SQLite, postgres - таблица в БД default
+IMPORT_SOURCE = os.environ.get('IMPORT_SOURCE', 'mssql')
+# Дедупликация пользователей импорта по телефону: source - запросом в источнике,
+# local - в сервисе (источник читается страницами по ID без группировки)
+IMPORT_DEDUP = os.environ.get('IMPORT_DEDUP', 'source')
+# Количество записей в странице чтения источника при IMPORT_DEDUP=local
+IMPORT_FETCH_SIZE = int(os.environ.get('IMPORT_FETCH_SIZE', 10000))
+
+if IMPORT_SOURCE == 'mssql':
+    DATABASES['mssql_db'] = {
         'ENGINE': 'mssql',
         'HOST': os.environ['MSSQL_HOST'],
         'PORT': os.environ['MSSQL_PORT'],
@@ -59,7 +161,11 @@ DATABASES = {
         }
 
     }
-}
+elif IMPORT_SOURCE == 'sqlite':
+    DATABASES['import_source'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('IMPORT_SOURCE_PATH', str(BASE_DIR.parent / 'import_source.sqlite3')),
+    }
 
 
 TEMPLATES = [
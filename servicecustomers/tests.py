@@ -0,0 +1,568 @@
+'''Тесты middleware и служебных модулей сервиса.'''
+import asyncio
+import datetime
+import importlib
+import io
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional
+from unittest import mock
+
+from customers.models import Phones
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import connection, DatabaseError, OperationalError
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.test import Client, override_settings, RequestFactory, SimpleTestCase, TestCase
+import msgpack
+from prometheus_client import REGISTRY
+from prometheus_client.mmap_dict import mmap_key, MmapedDict
+
+from . import codecs, db_router, utils
+from .admission import parse_limits, RouteLimiter
+from .coalescing import RequestCoalescingMiddleware
+from .loop import LoopCommand
+from .profiling import QueryProfilingMiddleware
+
+
+class RouteLimiterTests(SimpleTestCase):
+    '''Тесты ограничителя одновременных запросов к методу (admission control).'''
+
+    def test_parse_limits(self) -> None:
+        '''Разбор настройки API_ROUTE_LIMITS, пустая строка - без ограничений.'''
+        self.assertEqual(parse_limits('list_customers=4:8, import_customers=1'),
+                         {'list_customers': (4, 8), 'import_customers': (1, 0)})
+        self.assertEqual(parse_limits(''), {})
+
+    def test_queue(self) -> None:
+        '''Запрос сверх ограничения ждет в очереди, при заполненной очереди - отказ.'''
+        async def scenario() -> None:
+            limiter = RouteLimiter('list_customers', 1, 1)
+            self.assertIsNone(await limiter.acquire(1))
+            waiting = asyncio.create_task(limiter.acquire(1))
+            await asyncio.sleep(0)
+            self.assertEqual(await limiter.acquire(1), 'queue_full')
+            self.assertFalse(waiting.done())
+
+            # Место передается ожидающему без освобождения
+            limiter.release()
+            self.assertIsNone(await waiting)
+            self.assertEqual(limiter.in_flight, 1)
+            limiter.release()
+            self.assertEqual(limiter.in_flight, 0)
+
+        asyncio.run(scenario())
+
+    def test_queue_timeout(self) -> None:
+        '''Не дождавшийся обработки запрос отклоняется и покидает очередь.'''
+        async def scenario() -> None:
+            limiter = RouteLimiter('list_customers', 1, 1)
+            await limiter.acquire(1)
+            self.assertEqual(await limiter.acquire(0.01), 'queue_timeout')
+            self.assertEqual(len(limiter.waiters), 0)
+            limiter.release()
+            self.assertEqual(limiter.in_flight, 0)
+
+        asyncio.run(scenario())
+
+    def test_cancelled_waiter(self) -> None:
+        '''Место, переданное отключившемуся клиенту, освобождается.'''
+        async def scenario() -> None:
+            limiter = RouteLimiter('list_customers', 1, 2)
+            await limiter.acquire(1)
+            cancelled = asyncio.create_task(limiter.acquire(1))
+            waiting = asyncio.create_task(limiter.acquire(1))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            limiter.release()
+            self.assertIsNone(await waiting)
+            limiter.release()
+            self.assertEqual(limiter.in_flight, 0)
+
+        asyncio.run(scenario())
+
+
+@override_settings(API_ROUTE_LIMITS='get_customer=0:0', API_RETRY_AFTER=5)
+class AdmissionMiddlewareTests(SimpleTestCase):
+    '''Тесты отказа в обработке запроса сверх ограничения метода.'''
+
+    def test_reject_json(self) -> None:
+        '''Отказ - 429 с Retry-After без обращения к БД.'''
+        response = Client().get('/rest/v1/customers/1/')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '5')
+        self.assertEqual(response.json(), {
+            'success': False,
+            'message': 'Слишком много одновременных запросов к методу, повторите позже',
+            'data': None,
+        })
+
+    def test_reject_msgpack(self) -> None:
+        '''Отказ в формате MessagePack, если он указан в Accept.'''
+        response = Client().get('/rest/v1/customers/1/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertIn('Accept', response['Vary'])
+        self.assertEqual(msgpack.unpackb(response.content)['success'], False)
+
+
+@override_settings(COALESCE_ROUTES=('list_customers',))
+class CoalescingTests(SimpleTestCase):
+    '''Тесты объединения одинаковых одновременных запросов чтения.'''
+
+    def setUp(self) -> None:
+        '''Подготовка фабрики запросов и списка вызовов обработчика.'''
+        self.factory = RequestFactory()
+        self.calls: List[str] = []
+
+    def middleware(self, release: asyncio.Event) -> RequestCoalescingMiddleware:
+        '''Метод создания middleware с обработчиком, который завершается по сигналу release.'''
+        async def get_response(request: HttpRequest) -> HttpResponse:
+            self.calls.append(request.get_full_path())
+            await release.wait()
+            response = HttpResponse(f'ответ {len(self.calls)}')
+            response.set_cookie('db_primary', '1')
+            return response
+
+        return RequestCoalescingMiddleware(get_response)
+
+    def run_requests(self, *requests: HttpRequest) -> List[HttpResponse]:
+        '''Метод одновременного выполнения запросов через middleware.'''
+        async def scenario() -> List[HttpResponse]:
+            release = asyncio.Event()
+            middleware = self.middleware(release)
+            tasks = [asyncio.create_task(middleware(request)) for request in requests]
+            await asyncio.sleep(0.01)
+            release.set()
+            return list(await asyncio.gather(*tasks))
+
+        return asyncio.run(scenario())
+
+    def test_identical_requests(self) -> None:
+        '''Одинаковые запросы выполняются один раз, ответ копируется без cookie.'''
+        responses = self.run_requests(
+            self.factory.get('/rest/v1/customers/', {'limit': 2, 'gender': 'M'}),
+            self.factory.get('/rest/v1/customers/', {'gender': 'M', 'limit': 2}),
+            self.factory.get('/rest/v1/customers/', {'limit': 2, 'gender': 'M'}),
+        )
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual({response.content for response in responses}, {'ответ 1'.encode()})
+        self.assertIn('db_primary', responses[0].cookies)
+        self.assertNotIn('db_primary', responses[1].cookies)
+
+    def test_different_requests(self) -> None:
+        '''Запросы с разными параметрами, форматом, записью и другими методами не объединяются.'''
+        sticky = self.factory.get('/rest/v1/customers/', {'limit': 2})
+        sticky.COOKIES['db_primary'] = '1'
+        self.run_requests(
+            self.factory.get('/rest/v1/customers/', {'limit': 2}),
+            self.factory.get('/rest/v1/customers/', {'limit': 3}),
+            self.factory.get('/rest/v1/customers/', {'limit': 2},
+                             HTTP_ACCEPT='application/msgpack'),
+            sticky,
+            self.factory.post('/rest/v1/customers/'),
+            self.factory.get('/rest/v1/customers/1/'),
+        )
+        self.assertEqual(len(self.calls), 6)
+
+    def test_leader_cancelled(self) -> None:
+        '''Если первый запрос прерван, ожидающий выполняет запрос сам.'''
+        async def scenario() -> HttpResponse:
+            release = asyncio.Event()
+            middleware = self.middleware(release)
+            leader = asyncio.create_task(middleware(self.factory.get('/rest/v1/customers/')))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(middleware(self.factory.get('/rest/v1/customers/')))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            await asyncio.sleep(0.01)
+            release.set()
+            return await follower
+
+        response = asyncio.run(scenario())
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(response.content, 'ответ 2'.encode())
+
+
+class CodecsTests(SimpleTestCase):
+    '''Тесты выбора формата MessagePack по заголовкам запроса.'''
+
+    def test_accepts_msgpack(self) -> None:
+        '''Формат MessagePack выбирается по любому из его типов в Accept, без учета регистра.'''
+        factory = RequestFactory()
+        for accept, expected in (
+                ('application/msgpack', True),
+                ('application/json;q=0.9, Application/X-MsgPack', True),
+                ('application/vnd.msgpack; q=1', True),
+                ('application/json', False),
+                ('*/*', False),
+                ('', False)):
+            request = factory.get('/', HTTP_ACCEPT=accept)
+            self.assertEqual(codecs.accepts_msgpack(request), expected, accept)
+
+    def test_packb(self) -> None:
+        '''Даты кодируются строками, как в JSON-ответах.'''
+        data = {'id': 1, 'created_at': datetime.datetime(2024, 1, 9, 8, 38),
+                'birthday': datetime.date(2000, 12, 20)}
+        self.assertEqual(msgpack.unpackb(codecs.packb(data)), {
+            'id': 1, 'created_at': '2024-01-09T08:38:00', 'birthday': '2000-12-20'
+        })
+
+
+class NegotiationTests(TestCase):
+    '''Тесты формата запросов и ответов методов API.'''
+
+    def test_msgpack(self) -> None:
+        '''Тело MessagePack принимается, ответ - в формате из Accept.'''
+        client = Client()
+        response = client.post(
+            '/rest/v1/customers/', msgpack.packb({'phone': '79025163138', 'firstname': 'иван'}),
+            content_type='application/msgpack', HTTP_ACCEPT='application/msgpack'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertIn('Accept', response['Vary'])
+        customer = msgpack.unpackb(response.content)
+        self.assertEqual(customer['firstname'], 'Иван')
+
+        response = client.get(f'/rest/v1/customers/{customer["id"]}/')
+        self.assertEqual(response['Content-Type'], 'application/json; charset=utf-8')
+        self.assertEqual(response.json(), customer)
+
+    def test_msgpack_errors(self) -> None:
+        '''Ошибки валидации и 404 возвращаются в MessagePack.'''
+        client = Client(HTTP_ACCEPT='application/msgpack')
+        response = client.post(
+            '/rest/v1/customers/', json.dumps({'phone': '123'}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 422)
+        self.assertIn('detail', msgpack.unpackb(response.content))
+        response = client.get('/rest/v1/customers/1/')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+
+
+class MetricsTests(TestCase):
+    '''Тесты метрик запросов к API.'''
+
+    @staticmethod
+    def sample(name: str, **labels: str) -> float:
+        '''Метод получения значения метрики из реестра процесса (0, если ее нет).'''
+        return REGISTRY.get_sample_value(name, labels) or 0.0
+
+    def test_route_labels(self) -> None:
+        '''Метки - название маршрута, а не путь с ID, запросы в БД подсчитываются.'''
+        labels = {'route': 'get_customer', 'method': 'GET', 'status': '404'}
+        requests = self.sample('api_requests_total', **labels)
+        observed = self.sample('api_db_queries_count', route='get_customer')
+        queries = self.sample('api_db_queries_sum', route='get_customer')
+
+        client = Client()
+        for customer_id in (1, 2):
+            self.assertEqual(client.get(f'/rest/v1/customers/{customer_id}/').status_code, 404)
+
+        self.assertEqual(self.sample('api_requests_total', **labels), requests + 2)
+        self.assertEqual(self.sample('api_db_queries_count', route='get_customer'), observed + 2)
+        # Поиск пользователя - один запрос в БД на каждый запрос к API
+        self.assertEqual(self.sample('api_db_queries_sum', route='get_customer'), queries + 2)
+        output = client.get('/metrics').content.decode()
+        self.assertIn('route="get_customer"', output)
+        self.assertNotIn('/rest/v1/customers/1/', output)
+
+    @override_settings(COALESCE_ROUTES=('get_customer',), QUERY_PROFILING=True,
+                       API_ROUTE_LIMITS='get_customer=8')
+    def test_resolve_once(self) -> None:
+        '''URL разбирается один раз за запрос, независимо от количества middleware.'''
+        with mock.patch('servicecustomers.utils.resolve', wraps=utils.resolve) as resolve:
+            response = Client().get('/rest/v1/customers/1/')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(resolve.call_count, 1)
+
+    def test_multiprocess_registry(self) -> None:
+        '''При PROMETHEUS_MULTIPROC_DIR выдаются метрики всех воркеров из файлов каталога.'''
+        with tempfile.TemporaryDirectory() as directory:
+            values = MmapedDict(os.path.join(directory, 'counter_1.db'))
+            values.write_value(mmap_key(
+                'api_requests', 'api_requests_total', ['route', 'method', 'status'],
+                ['list_customers', 'GET', '200'], 'Количество запросов к API'
+            ), 7, 0)
+            values.close()
+            with mock.patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': directory}):
+                response = Client().get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        output = response.content.decode()
+        self.assertIn(
+            'api_requests_total{method="GET",route="list_customers",status="200"} 7.0', output
+        )
+        # Метрики текущего процесса (реестр по умолчанию) не выдаются
+        self.assertNotIn('db_connections_created_total', output)
+
+
+@override_settings(QUERY_PROFILING=True, QUERY_PROFILING_SLOW_MS=60000,
+                   QUERY_PROFILING_DUPLICATES=3)
+class QueryProfilingTests(TestCase):
+    '''Тесты профилирования запросов в БД в рамках запроса к API.'''
+
+    @staticmethod
+    def middleware(repeats: int) -> QueryProfilingMiddleware:
+        '''Метод создания middleware с обработчиком, выполняющим repeats одинаковых запросов.'''
+        def get_response(request: HttpRequest) -> HttpResponse:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                for customer_id in range(repeats):
+                    cursor.execute('SELECT id FROM customers WHERE id = %s', [customer_id])
+            return HttpResponse()
+
+        return QueryProfilingMiddleware(get_response)
+
+    def test_headers(self) -> None:
+        '''Количество и время запросов в заголовках, без повторов - без заголовка N+1.'''
+        request = RequestFactory().get('/rest/v1/customers/1/')
+        with self.assertNoLogs('servicecustomers.profiling'):
+            response = self.middleware(2)(request)
+        self.assertEqual(response['X-DB-Queries'], '3')
+        self.assertRegex(response['Server-Timing'],
+                         r'^db;dur=[\d.]+;desc="3 queries", total;dur=[\d.]+$')
+        self.assertNotIn('X-DB-Duplicate-Queries', response)
+
+    def test_duplicates(self) -> None:
+        '''Одинаковый SQL с разными параметрами от порога повторов отмечается как N+1.'''
+        request = RequestFactory().get('/rest/v1/customers/1/')
+        with self.assertLogs('servicecustomers.profiling', 'WARNING') as logs:
+            response = self.middleware(5)(request)
+        self.assertEqual(response['X-DB-Queries'], '6')
+        self.assertEqual(response['X-DB-Duplicate-Queries'], '1')
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('(N+1) в get_customer: 5 раз', logs.output[0])
+
+    @override_settings(QUERY_PROFILING_SLOW_MS=0)
+    def test_slow(self) -> None:
+        '''Медленный запрос к API логируется с разбивкой по SQL.'''
+        request = RequestFactory().get('/rest/v1/customers/1/')
+        with self.assertLogs('servicecustomers.profiling', 'WARNING') as logs:
+            self.middleware(1)(request)
+        self.assertIn('Медленный запрос GET /rest/v1/customers/1/ (get_customer)',
+                      logs.output[0])
+        self.assertIn('1 x', logs.output[0])
+
+    @override_settings(QUERY_PROFILING=False)
+    def test_disabled(self) -> None:
+        '''При выключенной настройке middleware исключается из цепочки, заголовков нет.'''
+        with self.assertRaises(MiddlewareNotUsed):
+            self.middleware(1)
+        response = Client().get('/rest/v1/customers/1/')
+        self.assertNotIn('X-DB-Queries', response)
+        self.assertNotIn('Server-Timing', response)
+
+
+class StopLoop(Exception):
+    '''Исключение для остановки команды в режиме --loop.'''
+
+
+class LoopCommandTests(SimpleTestCase):
+    '''Тесты фоновых команд в режиме --loop (purge_customers, purge_changes и др.).'''
+
+    def command(self, *results: Any) -> LoopCommand:
+        '''Метод создания команды, run_once которой возвращает results или выбрасывает их.'''
+        command = LoopCommand()
+        command.interval_setting = 'CHANGES_PURGE_INTERVAL'
+        setattr(command, 'run_once', mock.Mock(side_effect=results))
+        return command
+
+    @override_settings(CHANGES_PURGE_INTERVAL=300)
+    def test_retry(self) -> None:
+        '''Ошибка логируется, повтор - через 2, 4... секунд, после успеха - через интервал.'''
+        command = self.command(DatabaseError('failover'), DatabaseError('failover'), None,
+                               DatabaseError('failover'))
+        sleep = mock.patch('time.sleep', side_effect=[None, None, None, StopLoop])
+        close = mock.patch('servicecustomers.loop.close_old_connections')
+        with sleep as sleep_mock, close as close_mock, self.assertLogs(level='ERROR') as logs:
+            with self.assertRaises(StopLoop):
+                call_command(command, loop=True, stdout=io.StringIO())
+
+        self.assertEqual(sleep_mock.call_args_list,
+                         [mock.call(2), mock.call(4), mock.call(300), mock.call(2)])
+        # Соединение с ошибкой закрывается перед каждым повтором
+        self.assertEqual(close_mock.call_count, 4)
+        self.assertEqual(len(logs.records), 3)
+
+    def test_max_delay(self) -> None:
+        '''Пауза перед повтором не превышает MAX_RETRY_DELAY.'''
+        command = self.command(*[DatabaseError('failover')] * 8)
+        sleep = mock.patch('time.sleep', side_effect=[None] * 7 + [StopLoop])
+        with sleep as sleep_mock, self.assertLogs(level='ERROR'):
+            with self.assertRaises(StopLoop):
+                call_command(command, loop=True, stdout=io.StringIO())
+        self.assertEqual(sleep_mock.call_args_list[-3:], [mock.call(60)] * 3)
+
+    def test_once(self) -> None:
+        '''Без --loop задача выполняется один раз, ошибка не перехватывается.'''
+        command = self.command(None)
+        with mock.patch('time.sleep') as sleep_mock:
+            call_command(command, stdout=io.StringIO())
+        sleep_mock.assert_not_called()
+        self.assertEqual(getattr(command, 'run_once').call_count, 1)
+
+        with self.assertRaises(DatabaseError):
+            call_command(self.command(DatabaseError('failover')), stdout=io.StringIO())
+
+
+class ServiceMainTests(SimpleTestCase):
+    '''Тесты запуска сервиса (python -m servicecustomers): воркеры и фоновые задачи.'''
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        '''Импорт модуля запуска без изменения PROMETHEUS_MULTIPROC_DIR тестов.'''
+        super().setUpClass()
+        with mock.patch.dict(os.environ):
+            cls.main = importlib.import_module('servicecustomers.__main__')
+
+    def cgroup_cpus(self, files: Dict[str, str]) -> Optional[int]:
+        '''Метод получения ограничения CPU по файлам cgroup во временной директории.'''
+        with tempfile.TemporaryDirectory() as directory:
+            os.makedirs(os.path.join(directory, 'cpu'))
+            for name, value in files.items():
+                with open(os.path.join(directory, name), 'w') as file:
+                    file.write(f'{value}\n')
+            with mock.patch.object(self.main, 'CGROUP_DIR', directory):
+                return self.main._cgroup_cpus()
+
+    def test_cgroup_cpus(self) -> None:
+        '''Квота CPU cgroup v2 и v1 округляется вверх, без квоты - None.'''
+        self.assertEqual(self.cgroup_cpus({'cpu.max': '150000 100000'}), 2)
+        self.assertEqual(self.cgroup_cpus({'cpu.max': '100000 100000'}), 1)
+        self.assertIsNone(self.cgroup_cpus({'cpu.max': 'max 100000'}))
+        self.assertEqual(self.cgroup_cpus({'cpu/cpu.cfs_quota_us': '50000',
+                                           'cpu/cpu.cfs_period_us': '100000'}), 1)
+        self.assertIsNone(self.cgroup_cpus({'cpu/cpu.cfs_quota_us': '-1',
+                                            'cpu/cpu.cfs_period_us': '100000'}))
+        self.assertIsNone(self.cgroup_cpus({}))
+
+    def test_default_workers(self) -> None:
+        '''Воркеров - по меньшему из количества CPU процесса и квоты CPU.'''
+        affinity = mock.patch('os.sched_getaffinity', return_value=set(range(8)), create=True)
+        for quota, workers in ((2, 2), (16, 8), (None, 8)):
+            with affinity, mock.patch.object(self.main, '_cgroup_cpus', return_value=quota):
+                self.assertEqual(self.main._default_workers(), workers)
+
+    def supervise(self, *returncodes: Any, sleep: Any = ()) -> mock.AsyncMock:
+        '''Метод запуска фоновой задачи, процессы которой завершаются с returncodes.'''
+        process = mock.Mock(wait=mock.AsyncMock(side_effect=returncodes))
+        exec_patch = mock.patch('asyncio.create_subprocess_exec', return_value=process)
+        sleep_patch = mock.patch('asyncio.sleep', side_effect=sleep)
+        self.process = process
+        with exec_patch as exec_mock, sleep_patch as self.sleep_mock, \
+                mock.patch('sys.stderr', io.StringIO()) as self.stderr:
+            with self.assertRaises((StopLoop, asyncio.CancelledError)):
+                asyncio.run(self.main._supervise('purge_changes', '--loop'))
+        return exec_mock
+
+    def test_restart(self) -> None:
+        '''Завершившийся процесс перезапускается после паузы 2, 4... секунд.'''
+        exec_mock = self.supervise(1, -9, sleep=[None, StopLoop])
+        self.assertEqual(exec_mock.call_args_list,
+                         [mock.call('python', 'manage.py', 'purge_changes', '--loop')] * 2)
+        self.assertEqual(self.sleep_mock.call_args_list, [mock.call(2), mock.call(4)])
+        self.assertIn('purge_changes завершилась с кодом -9', self.stderr.getvalue())
+
+    def test_cancel(self) -> None:
+        '''При остановке сервиса процесс фоновой задачи завершается.'''
+        self.supervise(asyncio.CancelledError(), 0)
+        self.process.terminate.assert_called_once()
+        self.sleep_mock.assert_not_called()
+
+
+@mock.patch.dict(settings.DATABASES, {'replica': settings.DATABASES['default']})
+class ReplicaRoutingTests(TestCase):
+    '''Тесты выбора БД для чтения (основная БД или реплика).'''
+
+    def route(self, request: HttpRequest) -> bool:
+        '''Метод обработки запроса middleware с признаком чтения с реплики в обработчике.'''
+        def get_response(request: HttpRequest) -> HttpResponse:
+            self.replica = db_router.reading_replica()
+            return HttpResponse()
+
+        self.response = db_router.ReplicaRoutingMiddleware(get_response)(request)
+        return self.replica
+
+    def test_router(self) -> None:
+        '''Запись - всегда в основную БД, чтение - на реплике только в методах чтения.'''
+        router = db_router.ReplicaRouter()
+        self.assertEqual(router.db_for_write(Phones), 'default')
+        self.assertIsNone(router.db_for_read(Phones))
+        token = db_router._use_replica.set(True)
+        try:
+            self.assertEqual(router.db_for_read(Phones), 'replica')
+            self.assertEqual(router.db_for_write(Phones), 'default')
+        finally:
+            db_router._use_replica.reset(token)
+        self.assertFalse(router.allow_migrate('replica', 'customers'))
+
+    def test_read_routes(self) -> None:
+        '''Методы REPLICA_ROUTES читают с реплики, остальные методы - с основной БД.'''
+        factory = RequestFactory()
+        self.assertTrue(self.route(factory.get('/rest/v1/customers/1/')))
+        self.assertTrue(self.route(factory.get('/rest/v1/favorites/', {'customer_id': 1})))
+        self.assertFalse(self.route(factory.get('/rest/v1/customers/by-phone/79025163138')))
+        self.assertFalse(self.route(factory.post('/rest/v1/customers/')))
+        self.assertFalse(db_router.reading_replica())
+
+    @override_settings(REPLICA_STICKY_SECONDS=7)
+    def test_sticky(self) -> None:
+        '''После записи клиент получает cookie и заголовок, с ними читает с основной БД.'''
+        factory = RequestFactory()
+        self.route(factory.post('/rest/v1/customers/'))
+        self.assertEqual(self.response[db_router.STICKY_HEADER], '7')
+        self.assertEqual(self.response.cookies[db_router.STICKY_COOKIE]['max-age'], 7)
+
+        self.route(factory.get('/rest/v1/customers/1/'))
+        self.assertNotIn(db_router.STICKY_HEADER, self.response)
+        self.assertNotIn(db_router.STICKY_COOKIE, self.response.cookies)
+
+        sticky = factory.get('/rest/v1/customers/1/')
+        sticky.COOKIES[db_router.STICKY_COOKIE] = '1'
+        self.assertFalse(self.route(sticky))
+        self.assertFalse(self.route(factory.get('/rest/v1/customers/1/', HTTP_X_DB_PRIMARY='7')))
+
+    def test_replica_error(self) -> None:
+        '''После ошибки соединения с репликой метод чтения повторяется на основной БД.'''
+        customer = Client().post(
+            '/rest/v1/customers/', json.dumps({'phone': '79025163138'}),
+            content_type='application/json'
+        ).json()
+        databases = []
+
+        def read(*args: Any, **kwargs: Any) -> Any:
+            databases.append('replica' if db_router.reading_replica() else 'default')
+            if db_router.reading_replica():
+                raise OperationalError('replica is down')
+            return get_object_or_404(*args, **kwargs)
+
+        # Реплики в тестах нет: чтение выполняется на основной БД, ошибка реплики - имитация
+        read_patch = mock.patch('customers.api.get_object_or_404', side_effect=read)
+        router_patch = mock.patch.object(db_router.ReplicaRouter, 'db_for_read',
+                                         return_value=None)
+        connections_patch = mock.patch('servicecustomers.db_router.connections')
+        with read_patch, router_patch, connections_patch as connections_mock, \
+                self.assertLogs('servicecustomers.db_router', 'WARNING'):
+            response = Client().get(f'/rest/v1/customers/{customer["id"]}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), customer)
+        self.assertEqual(databases, ['replica', 'default'])
+        connections_mock.__getitem__.return_value.close.assert_called_once()
+
+    def test_other_errors(self) -> None:
+        '''Ошибки основной БД и ошибки, отличные от ошибок соединения, не повторяются.'''
+        middleware = db_router.ReplicaRoutingMiddleware(HttpResponse)
+        request = RequestFactory().get('/rest/v1/customers/1/')
+        self.assertIsNone(middleware.process_exception(request, OperationalError()))
+        token = db_router._use_replica.set(True)
+        try:
+            self.assertIsNone(middleware.process_exception(request, ValueError()))
+        finally:
+            db_router._use_replica.reset(token)
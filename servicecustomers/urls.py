@@ -2,7 +2,9 @@
 from django.urls import path
 
 from .api import api
+from .metrics import metrics_view
 
 urlpatterns = [
+    path('metrics', metrics_view, name='metrics'),
     path('', api.urls),
 ]
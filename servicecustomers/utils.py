@@ -1,10 +1,15 @@
 '''Модуль для общих методов сущностей сервиса.'''
-from typing import Any, Dict, List
+from typing import Any, Dict, List, TYPE_CHECKING
 
-import pyodbc
+from django.http import HttpRequest
+from django.urls import resolve, Resolver404
 
+# pyodbc нужен только импорту из MSSQL: воркеры API его не загружают
+if TYPE_CHECKING:
+    import pyodbc
 
-def fetch_named(cursor: pyodbc.Cursor) -> List[Dict[str, Any]]:
+
+def fetch_named(cursor: 'pyodbc.Cursor') -> List[Dict[str, Any]]:
     '''
     Метод преобразования данных из запроса в массив dict-ов.
 
@@ -27,3 +32,44 @@ def fetch_named(cursor: pyodbc.Cursor) -> List[Dict[str, Any]]:
         result.append(dict(zip(columns, row)))
 
     return result
+
+
+def route_name(request: HttpRequest) -> str:
+    '''
+    Метод определения названия маршрута API (имени функции-обработчика ninja) для запроса.
+
+    Маршрут определяется один раз и сохраняется в запросе (request._route_name):
+    middleware метрик, профилирования, ограничений и реплики не разбирают URL повторно.
+
+    Аргументы:
+        request (HttpRequest): информация о запросе.
+
+    Возвращаемый результат:
+        (str): название маршрута, например list_customers или get_customer.
+    '''
+    name = getattr(request, '_route_name', None)
+    if name is None:
+        name = _resolve_route_name(request)
+        setattr(request, '_route_name', name)
+    return name
+
+
+def _resolve_route_name(request: HttpRequest) -> str:
+    '''Внутренний метод определения названия маршрута по URL и методу запроса.'''
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return 'not_found'
+
+    # Один путь ninja может обслуживать несколько методов (GET и POST),
+    # поэтому обработчик определяется по методу запроса
+    path_view = getattr(match.func, '__self__', None)
+    find_operation = getattr(path_view, '_find_operation', None)
+    if find_operation is not None:
+        operation = find_operation(request)
+        if operation is not None:
+            return str(operation.view_func.__name__)
+
+    return str(match.url_name or 'unknown')